@@ -12,7 +12,7 @@ from sentry.api.base import EnvironmentMixin, ReleaseAnalyticsMixin, region_silo
 from sentry.api.bases import NoProjects
 from sentry.api.bases.organization import OrganizationReleasesBaseEndpoint
 from sentry.api.exceptions import ConflictError, InvalidRepository
-from sentry.api.paginator import MergingOffsetPaginator, OffsetPaginator
+from sentry.api.paginator import KeysetPaginator, MergingOffsetPaginator, OffsetPaginator
 from sentry.api.release_search import RELEASE_FREE_TEXT_KEY, parse_search_query
 from sentry.api.serializers import serialize
 from sentry.api.serializers.rest_framework import (
@@ -44,6 +44,7 @@ from sentry.signals import release_created
 from sentry.snuba.sessions import STATS_PERIODS
 from sentry.types.activity import ActivityType
 from sentry.utils.cache import cache
+from sentry.utils.cursors import Cursor, KeysetCursor
 from sentry.utils.sdk import bind_organization_context, configure_scope
 
 ERR_INVALID_STATS_PERIOD = "Invalid %s. Valid choices are %s"
@@ -258,6 +259,7 @@ class OrganizationReleasesEndpoint(
 
         paginator_cls = OffsetPaginator
         paginator_kwargs = {}
+        cursor_cls = Cursor
 
         try:
             filter_params = self.get_filter_params(request, organization, date_filter_optional=True)
@@ -304,6 +306,11 @@ class OrganizationReleasesEndpoint(
         if sort == "date":
             queryset = queryset.order_by("-date")
             paginator_kwargs["order_by"] = "-date"
+            if not flatten:
+                # Flattened results repeat a release once per project, so
+                # (date, id) is only a unique keyset when not flattening.
+                paginator_cls = KeysetPaginator
+                cursor_cls = KeysetCursor
         elif sort == "build":
             queryset = queryset.filter(build_number__isnull=False).order_by("-build_number")
             paginator_kwargs["order_by"] = "-build_number"
@@ -390,6 +397,7 @@ class OrganizationReleasesEndpoint(
             request=request,
             queryset=queryset,
             paginator_cls=paginator_cls,
+            cursor_cls=cursor_cls,
             on_results=lambda x: serialize(
                 x,
                 request.user,
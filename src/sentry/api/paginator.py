@@ -1,15 +1,18 @@
 import bisect
 import functools
 import math
-from datetime import datetime
+from datetime import datetime, timedelta
 from urllib.parse import quote, unquote
 
 from django.core.exceptions import EmptyResultSet, ObjectDoesNotExist
-from django.db import connections
+from django.db import connections, models
+from django.db.models import Q
+from django.db.models.expressions import Col
 from django.db.models.functions import Lower
 from django.utils import timezone
 
-from sentry.utils.cursors import Cursor, CursorResult, build_cursor
+from sentry.utils import json
+from sentry.utils.cursors import Cursor, CursorResult, KeysetCursor, build_cursor
 
 quote_name = connections["default"].ops.quote_name
 
@@ -217,6 +220,194 @@ class DateTimePaginator(BasePaginator):
         )
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class KeysetPaginator(BasePaginator):
+    """
+    Paginates by a composite ``(key, id)`` keyset instead of an offset.
+
+    The cursor encodes the sort value and id of the last row of the page
+    (see ``KeysetCursor``), and the next page is fetched with a row value
+    comparison such as ``(key, id) > (%s, %s)`` ordered by ``key, id``, which
+    an index on ``(key, id)`` can serve directly no matter how deep the page
+    is. The sort key must not be nullable.
+
+    With ``approximate_hits`` the total number of hits is taken from the query
+    planner's row estimate instead of a ``COUNT`` query.
+    """
+
+    tie_breaker = "id"
+
+    def __init__(
+        self,
+        queryset,
+        order_by,
+        max_limit=MAX_LIMIT,
+        on_results=None,
+        post_query_filter=None,
+        approximate_hits=False,
+    ):
+        super().__init__(
+            queryset,
+            order_by=order_by,
+            max_limit=max_limit,
+            on_results=on_results,
+            post_query_filter=post_query_filter,
+        )
+        if not self.key:
+            raise ValueError("KeysetPaginator requires an order_by key")
+        self.approximate_hits = approximate_hits
+
+    def _get_key_field(self):
+        annotation = self.queryset.query.annotations.get(self.key)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(self.key)
+
+    def _get_key_column(self):
+        """
+        Returns the SQL of the sort key column and its params, or ``None`` if
+        the key is an expression that cannot be compared as a plain column.
+        """
+        query = self.queryset.query
+        if self.key in query.extra:
+            col_query, col_params = query.extra[self.key]
+            return col_query, list(col_params)
+
+        annotation = query.annotations.get(self.key)
+        if annotation is not None:
+            if not isinstance(annotation, Col):
+                return None
+            return f"{quote_name(annotation.alias)}.{quote_name(annotation.target.column)}", []
+
+        field = self.queryset.model._meta.get_field(self.key)
+        return f"{quote_name(self.queryset.model._meta.db_table)}.{quote_name(field.column)}", []
+
+    def get_item_key(self, item, for_prev=False):
+        value = getattr(item, self.key)
+        if isinstance(value, datetime):
+            delta = value - EPOCH
+            value = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        return f"{value},{getattr(item, self.tie_breaker)}"
+
+    def value_from_cursor(self, cursor):
+        value, _, item_id = str(cursor.value).rpartition(",")
+        try:
+            item_id = int(item_id)
+            field = self._get_key_field()
+            if isinstance(field, models.DateTimeField):
+                return EPOCH + timedelta(microseconds=int(value)), item_id
+            if isinstance(field, (models.IntegerField, models.AutoField)):
+                return int(value), item_id
+            if isinstance(field, models.FloatField):
+                return float(value), item_id
+        except ValueError:
+            raise BadPaginationError("Invalid cursor value")
+        return value, item_id
+
+    def build_queryset(self, value, is_prev):
+        asc = self._is_asc(is_prev)
+        prefix = "" if asc else "-"
+        queryset = self.queryset.order_by(f"{prefix}{self.key}", f"{prefix}{self.tie_breaker}")
+
+        if value:
+            key_value, item_id = value
+            column = self._get_key_column()
+            if column is None:
+                lookup = "gt" if asc else "lt"
+                return queryset.filter(
+                    Q(**{f"{self.key}__{lookup}": key_value})
+                    | Q(**{self.key: key_value, f"{self.tie_breaker}__{lookup}": item_id})
+                )
+
+            col_query, col_params = column
+            table = quote_name(queryset.model._meta.db_table)
+            tie_breaker = quote_name(self.tie_breaker)
+            operator = ">" if asc else "<"
+            queryset = queryset.extra(
+                where=[f"({col_query}, {table}.{tie_breaker}) {operator} (%s, %s)"],
+                params=col_params + [key_value, item_id],
+            )
+
+        return queryset
+
+    def get_result(self, limit=100, cursor=None, count_hits=False, known_hits=None, max_hits=None):
+        if cursor is None:
+            cursor = KeysetCursor(0, 0, 0)
+
+        limit = min(limit, self.max_limit)
+
+        cursor_value = self.value_from_cursor(cursor) if cursor.value else None
+        queryset = self.build_queryset(cursor_value, cursor.is_prev)
+
+        if max_hits is None:
+            max_hits = MAX_HITS_LIMIT
+        if count_hits:
+            if self.approximate_hits:
+                hits = self.estimate_hits(max_hits)
+            else:
+                hits = self.count_hits(max_hits)
+        elif known_hits is not None:
+            hits = known_hits
+        else:
+            hits = None
+
+        # Fetch one extra row to know whether there is another page in the
+        # direction we are paginating.
+        results = list(queryset[: limit + 1])
+        has_more = len(results) > limit
+        results = results[:limit]
+
+        if cursor.is_prev:
+            results.reverse()
+            has_prev, has_next = has_more, bool(cursor.value)
+        else:
+            has_prev, has_next = bool(cursor.value), has_more
+
+        if results:
+            next_value = self.get_item_key(results[-1])
+            prev_value = self.get_item_key(results[0], for_prev=True)
+        else:
+            next_value = prev_value = cursor.value
+
+        if self.on_results:
+            results = self.on_results(results)
+
+        cursor_result = CursorResult(
+            results=results,
+            next=KeysetCursor(next_value, 0, False, has_next),
+            prev=KeysetCursor(prev_value, 0, True, has_prev),
+            hits=hits,
+            max_hits=max_hits if count_hits else None,
+        )
+
+        if self.post_query_filter:
+            cursor_result.results = self.post_query_filter(cursor_result.results)
+
+        return cursor_result
+
+    def estimate_hits(self, max_hits):
+        """
+        Returns the planner's estimate of the number of rows in the queryset,
+        capped at ``max_hits``.
+        """
+        if not max_hits:
+            return 0
+        hits_query = self.queryset.values("id").query
+        hits_query.clear_ordering(force_empty=True)
+        try:
+            h_sql, h_params = hits_query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        cursor = connections[self.queryset.using_replica().db].cursor()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {h_sql}", h_params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return min(int(plan[0]["Plan"]["Plan Rows"]), max_hits)
+
+
 # TODO(dcramer): previous cursors are too complex at the moment for many things
 # and are only useful for polling situations. The OffsetPaginator ignores them
 # entirely and uses standard paging
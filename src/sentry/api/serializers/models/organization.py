@@ -248,8 +248,9 @@ class OrganizationSerializer(Serializer):  # type: ignore
                 org_features.remove(feature_name)
 
         # Remaining features should not be checked via the entity handler
-        for feature_name in org_features:
-            if features.has(feature_name, obj, actor=user, skip_entity=True):
+        remaining_features = features.has_many(org_features, obj, actor=user, skip_entity=True)
+        for feature_name, active in remaining_features.items():
+            if active:
                 # Remove the organization scope prefix
                 feature_list.add(feature_name[len(_ORGANIZATION_SCOPE_PREFIX) :])
 
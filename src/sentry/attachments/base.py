@@ -1,3 +1,4 @@
+import io
 import zlib
 
 from sentry.utils import metrics
@@ -14,6 +15,90 @@ class MissingAttachmentChunks(Exception):
     pass
 
 
+class CachedAttachmentReader(io.RawIOBase):
+    """
+    A readable, binary file object over the chunks of a cached attachment.
+
+    Chunks are fetched from the cache and decompressed lazily as the file is
+    read, so at most one compressed chunk and the requested number of bytes
+    are held in memory at a time. Seeking backwards starts reading from the
+    first chunk again.
+    """
+
+    def __init__(self, cache, chunk_keys):
+        self._cache = cache
+        self._chunk_keys = list(chunk_keys)
+        self._rewind()
+
+    def _rewind(self):
+        self._next_chunk = 0
+        self._decompressor = None
+        self._tail = b""
+        self._pos = 0
+
+    def _load_chunk(self):
+        if self._next_chunk >= len(self._chunk_keys):
+            return False
+
+        raw_data = self._cache.get(self._chunk_keys[self._next_chunk], raw=True)
+        if raw_data is None:
+            raise MissingAttachmentChunks()
+
+        self._next_chunk += 1
+        self._decompressor = zlib.decompressobj()
+        self._tail = raw_data
+        return True
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, b):
+        view = memoryview(b).cast("B")
+        if not view:
+            return 0
+
+        while True:
+            if self._decompressor is not None:
+                # Limit the output so that large chunks are not decompressed
+                # at once. The remaining input is kept in ``unconsumed_tail``.
+                data = self._decompressor.decompress(self._tail, len(view))
+                self._tail = self._decompressor.unconsumed_tail
+                if data:
+                    view[: len(data)] = data
+                    self._pos += len(data)
+                    return len(data)
+                if not self._tail:
+                    self._decompressor = None
+
+            if not self._load_chunk():
+                return 0
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("can only seek relative to the start or position")
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+
+        if offset < self._pos:
+            self._rewind()
+
+        buf = bytearray(min(offset - self._pos, io.DEFAULT_BUFFER_SIZE))
+        while self._pos < offset:
+            view = memoryview(buf)[: offset - self._pos]
+            if not self.readinto(view):
+                break
+
+        return self._pos
+
+
 class CachedAttachment:
     def __init__(
         self,
@@ -63,6 +148,20 @@ class CachedAttachment:
         assert self._data is not UNINITIALIZED_DATA
         return self._data
 
+    def open(self):
+        """
+        Return a readable binary file object with the contents of this
+        attachment.
+
+        Unless the data has been loaded already, the file streams the data
+        from the attachment cache chunk by chunk instead of loading all of it
+        into memory. Reading raises ``MissingAttachmentChunks`` if a chunk is
+        no longer in the cache.
+        """
+        if self._data is not UNINITIALIZED_DATA or self._cache is None:
+            return io.BytesIO(self.data)
+        return io.BufferedReader(self._cache.open_data(self))
+
     def delete(self):
         for key in self.chunk_keys:
             self._cache.inner.delete(key)
@@ -162,6 +261,9 @@ class BaseAttachmentCache:
 
         return b"".join(data)
 
+    def open_data(self, attachment):
+        return CachedAttachmentReader(self.inner, attachment.chunk_keys)
+
     def delete(self, key):
         for attachment in self.get(key):
             attachment.delete()
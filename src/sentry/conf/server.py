@@ -1528,6 +1528,9 @@ SENTRY_METRICS_INDEXER_SPANNER_OPTIONS = {}
 
 # Rate limits during string indexing for our metrics product.
 # Which cluster to use. Example: {"cluster": "default"}
+# Setting "lease_fraction" (and optionally "lease_seconds") makes the limiter
+# reserve quota from Redis in bulk and spend it locally, see
+# sentry.ratelimits.sliding_windows. Example: {"cluster": "default", "lease_fraction": 0.01}
 SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS_PERFORMANCE = (
     SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS
@@ -1837,6 +1840,11 @@ SENTRY_TEAM_ROLES = (
 SENTRY_OPTIONS = {}
 SENTRY_DEFAULT_OPTIONS = {}
 
+# Seconds between bulk refreshes of all options into the local cache of each
+# process, run after requests and tasks. Set it below the TTL of options (10
+# seconds by default) to serve option reads from memory. Disabled if None.
+SENTRY_OPTIONS_REFRESH_INTERVAL = None
+
 # You should not change this setting after your database has been created
 # unless you have altered all schemas first
 SENTRY_USE_BIG_INTS = False
@@ -1,7 +1,8 @@
 import codecs
 import csv
 import logging
-import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha1
 
 import celery
@@ -18,6 +19,7 @@ from django.core.files.base import ContentFile
 from django.db import IntegrityError, router
 from django.utils import timezone
 
+from sentry import options
 from sentry.models import (
     DEFAULT_BLOB_SIZE,
     MAX_FILE_SIZE,
@@ -108,37 +110,64 @@ def assemble_download(
 
             processor = get_processor(data_export, environment_id)
 
-            with tempfile.TemporaryFile(mode="w+b") as tf:
+            blob_writer = ExportBlobWriter(data_export, bytes_written)
+            fetcher = ExportRowFetcher(
+                processor, data_export, prefetch=options.get("data-export.prefetch-rows")
+            )
+            start_time = time.monotonic()
+
+            # the row offset relative to the start of the current task
+            # this offset tells you the number of rows written during this batch fragment
+            fragment_offset = 0
+
+            # the absolute row offset from the beginning of the export
+            next_offset = offset + fragment_offset
+
+            rows = []
+
+            try:
                 # XXX(python3):
                 #
                 # In python3 we write unicode strings (which is all the csv
                 # module is able to do, it will NOT write bytes like in py2).
                 # Because of this we use the codec getwriter to transform our
-                # file handle to a stream writer that will encode to utf8.
-                tfw = codecs.getwriter("utf-8")(tf)
+                # blob writer to a stream writer that will encode to utf8.
+                tfw = codecs.getwriter("utf-8")(blob_writer)
 
                 writer = csv.DictWriter(tfw, processor.header_fields, extrasaction="ignore")
                 if first_page:
                     writer.writeheader()
 
-                # the position in the file at the end of the headers
-                starting_pos = tf.tell()
-
-                # the row offset relative to the start of the current task
-                # this offset tells you the number of rows written during this batch fragment
-                fragment_offset = 0
+                # the position in the export at the end of the headers
+                starting_pos = blob_writer.tell()
 
-                # the absolute row offset from the beginning of the export
-                next_offset = offset + fragment_offset
+                # the number of bytes written for the previous batch fragment
+                fragment_bytes = 0
 
-                rows = []
-
-                for _ in range(MAX_FRAGMENTS_PER_BATCH):
+                for fragment in range(MAX_FRAGMENTS_PER_BATCH):
                     # the number of rows to export in the next batch fragment
                     fragment_row_count = min(batch_size, max(export_limit - next_offset, 1))
 
-                    rows = process_rows(processor, data_export, fragment_row_count, next_offset)
+                    rows = fetcher.fetch(fragment_row_count, next_offset)
+
+                    # Start fetching the next batch fragment while this one is written, unless
+                    # this one is likely to be the last one of the batch.
+                    following_offset = next_offset + len(rows)
+                    if (
+                        len(rows) >= batch_size
+                        and fragment + 1 < MAX_FRAGMENTS_PER_BATCH
+                        and following_offset < export_limit
+                        and blob_writer.tell() - starting_pos + 2 * fragment_bytes
+                        < MAX_BATCH_SIZE
+                    ):
+                        fetcher.prefetch(
+                            min(batch_size, max(export_limit - following_offset, 1)),
+                            following_offset,
+                        )
+
+                    fragment_start = blob_writer.tell()
                     writer.writerows(rows)
+                    fragment_bytes = blob_writer.tell() - fragment_start
 
                     fragment_offset += len(rows)
                     next_offset = offset + fragment_offset
@@ -147,13 +176,28 @@ def assemble_download(
                         not rows
                         or len(rows) < batch_size
                         # the batch may exceed MAX_BATCH_SIZE but immediately stops
-                        or tf.tell() - starting_pos >= MAX_BATCH_SIZE
+                        or blob_writer.tell() - starting_pos >= MAX_BATCH_SIZE
                     ):
                         break
 
-                tf.seek(0)
-                new_bytes_written = store_export_chunk_as_blob(data_export, bytes_written, tf)
-                bytes_written += new_bytes_written
+                new_bytes_written = blob_writer.close()
+            except ExportDataFileTooBig:
+                blob_writer.abort()
+                new_bytes_written = 0
+            except Exception:
+                # The task is retried from `offset`, so forget what was uploaded.
+                blob_writer.abort()
+                raise
+            finally:
+                fetcher.close()
+
+            bytes_written += new_bytes_written
+
+            duration = time.monotonic() - start_time
+            if fragment_offset and duration > 0:
+                metrics.timing(
+                    "dataexport.rows_per_second", fragment_offset / duration, sample_rate=1.0
+                )
         except ExportError as error:
             if error.recoverable and export_retries > 0:
                 assemble_download.apply_async(
@@ -267,40 +311,140 @@ def process_discover(processor, limit, offset):
     return processor.handle_fields(raw_data_unicode)
 
 
+@handle_snuba_errors(logger)
+def fetch_discover(processor, limit, offset):
+    return processor.data_fn(limit=limit, offset=offset)["data"]
+
+
+class ExportRowFetcher:
+    """
+    Fetches the rows of batch fragments of an export.
+
+    With ``prefetch``, the discover query of the next batch fragment can be
+    started in a background thread while the current one is written. Rows are
+    still converted in the calling thread.
+    """
+
+    def __init__(self, processor, data_export, prefetch=False):
+        self.processor = processor
+        self.data_export = data_export
+        self.prefetch_enabled = prefetch and data_export.query_type == ExportQueryType.DISCOVER
+        self._executor = None
+        self._pending = None
+
+    def prefetch(self, limit, offset):
+        if not self.prefetch_enabled:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = (
+            (limit, offset),
+            self._executor.submit(fetch_discover, self.processor, limit, offset),
+        )
+
+    def fetch(self, limit, offset):
+        pending, self._pending = self._pending, None
+        if pending is None or pending[0] != (limit, offset):
+            if pending is not None:
+                pending[1].cancel()
+            return process_rows(self.processor, self.data_export, limit, offset)
+
+        try:
+            raw_data = pending[1].result()
+            return self.processor.handle_fields(raw_data)
+        except ExportError as error:
+            error_str = str(error)
+            metrics.incr("dataexport.error", tags={"error": error_str}, sample_rate=1.0)
+            logger.info(f"dataexport.error: {error_str}")
+            capture_exception(error)
+            raise
+
+    def close(self):
+        self._pending = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
 class ExportDataFileTooBig(Exception):
     pass
 
 
-def store_export_chunk_as_blob(data_export, bytes_written, fileobj, blob_size=DEFAULT_BLOB_SIZE):
-    try:
+class ExportBlobWriter:
+    """
+    A writable file-like object that uploads everything written to it as
+    blobs of an export, starting ``bytes_written`` bytes into the export.
+
+    Full blobs are uploaded as soon as they are written, so an export batch
+    never has to be buffered in a temporary file.
+    """
+
+    def __init__(self, data_export, bytes_written, blob_size=DEFAULT_BLOB_SIZE):
+        self.data_export = data_export
+        self.bytes_written = bytes_written
+        self.blob_size = blob_size
+        self.size = 0
+        self.uploaded = 0
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+
+        # there is a maximum file size allowed, so we need to make sure we don't exceed it
+        # NOTE: there seems to be issues with downloading files larger than 1 GB on slower
+        # networks, limit the export to 1 GB for now to improve reliability
+        if self.bytes_written + self.size >= min(MAX_FILE_SIZE, 2**30):
+            raise ExportDataFileTooBig()
+
+        while len(self.buffer) >= self.blob_size:
+            self._upload(bytes(self.buffer[: self.blob_size]))
+            del self.buffer[: self.blob_size]
+
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """
+        Uploads the remaining data and returns the number of bytes written.
+        """
+        if self.buffer:
+            self._upload(bytes(self.buffer))
+            self.buffer.clear()
+        return self.size
+
+    def abort(self):
+        """
+        Removes all blobs uploaded by this writer from the export.
+        """
+        self.buffer.clear()
+        if self.uploaded:
+            ExportedDataBlob.objects.filter(
+                data_export=self.data_export, offset__gte=self.bytes_written
+            ).delete()
+            self.uploaded = 0
+
+    def _upload(self, contents):
+        # adapted from `putfile` in  `src/sentry/models/file.py`
         with atomic_transaction(
             using=(
                 router.db_for_write(FileBlob),
                 router.db_for_write(ExportedDataBlob),
             )
         ):
-            # adapted from `putfile` in  `src/sentry/models/file.py`
-            bytes_offset = 0
-            while True:
-                contents = fileobj.read(blob_size)
-                if not contents:
-                    return bytes_offset
-
-                blob_fileobj = ContentFile(contents)
-                blob = FileBlob.from_file(blob_fileobj, logger=logger)
-                ExportedDataBlob.objects.get_or_create(
-                    data_export=data_export, blob_id=blob.id, offset=bytes_written + bytes_offset
-                )
-
-                bytes_offset += blob.size
-
-                # there is a maximum file size allowed, so we need to make sure we don't exceed it
-                # NOTE: there seems to be issues with downloading files larger than 1 GB on slower
-                # networks, limit the export to 1 GB for now to improve reliability
-                if bytes_written + bytes_offset >= min(MAX_FILE_SIZE, 2**30):
-                    raise ExportDataFileTooBig()
-    except ExportDataFileTooBig:
-        return 0
+            blob = FileBlob.from_file(ContentFile(contents), logger=logger)
+            ExportedDataBlob.objects.get_or_create(
+                data_export=self.data_export,
+                blob_id=blob.id,
+                offset=self.bytes_written + self.uploaded,
+            )
+        self.uploaded += blob.size
 
 
 @instrumented_task(name="sentry.data_export.tasks.merge_blobs", queue="data_export", acks_late=True)
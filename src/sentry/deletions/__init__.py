@@ -36,8 +36,9 @@ The deletions system provides two base classes to cover common scenarios:
 - ``ModelDeletionTask`` fetches records and deletes each instance individually. This strategy is
   good for models that rely on django signals or have child relations. This strategy is also the
   default used when a deletion task isn't specified for a model.
-- ``BulkModelDeletionTask`` Deletes records in bulk using a single query. This strategy is well
-  suited to removing records that don't have any relations.
+- ``BulkModelDeletionTask`` Deletes records in bulk, in batches of ids selected in id order. This
+  strategy is well suited to removing records that don't have any relations and don't rely on
+  django signals. Register models with this task to declare them as cascade-free.
 
 If your model has child relations that need to be cleaned up you should implement a custom
 deletion task. Doing so requires a few steps:
@@ -114,8 +115,10 @@ def load_defaults():
     default_manager.register(models.GroupEnvironment, BulkModelDeletionTask)
     default_manager.register(models.GroupHash, BulkModelDeletionTask)
     default_manager.register(models.GroupHistory, BulkModelDeletionTask)
+    default_manager.register(models.GroupInbox, BulkModelDeletionTask)
     default_manager.register(models.GroupLink, BulkModelDeletionTask)
     default_manager.register(models.GroupMeta, BulkModelDeletionTask)
+    default_manager.register(models.GroupOwner, BulkModelDeletionTask)
     default_manager.register(models.GroupRedirect, BulkModelDeletionTask)
     default_manager.register(models.GroupRelease, BulkModelDeletionTask)
     default_manager.register(models.GroupResolution, BulkModelDeletionTask)
@@ -144,6 +147,7 @@ def load_defaults():
         models.RepositoryProjectPathConfig, defaults.RepositoryProjectPathConfigDeletionTask
     )
     default_manager.register(models.SavedSearch, BulkModelDeletionTask)
+    default_manager.register(models.RuleFireHistory, BulkModelDeletionTask)
     default_manager.register(models.Team, defaults.TeamDeletionTask)
     default_manager.register(models.UserReport, BulkModelDeletionTask)
 
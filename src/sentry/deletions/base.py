@@ -1,9 +1,11 @@
 import logging
 import re
+import time
 
+from sentry import options
 from sentry.constants import ObjectStatus
 from sentry.utils import metrics
-from sentry.utils.query import bulk_delete_objects
+from sentry.utils.query import bulk_delete_objects_by_id
 
 _leaf_re = re.compile(r"^(UserReport|Event|Group)(.+)")
 
@@ -148,6 +150,20 @@ class BaseDeletionTask:
     def mark_deletion_in_progress(self, instance_list):
         pass
 
+    def throttle(self, rows, duration, rows_per_second):
+        """
+        Sleeps long enough that deleting ``rows`` rows, which took
+        ``duration`` seconds, doesn't exceed ``rows_per_second``. A falsy
+        budget disables throttling.
+        """
+        if not rows_per_second:
+            return
+
+        delay = rows / rows_per_second - duration
+        if delay > 0:
+            metrics.timing("deletions.throttled", delay, tags={"task": type(self).__name__})
+            time.sleep(delay)
+
 
 class ModelDeletionTask(BaseDeletionTask):
     DEFAULT_QUERY_LIMIT = None
@@ -255,6 +271,11 @@ class BulkModelDeletionTask(ModelDeletionTask):
     An efficient mechanism for deleting larger volumes of rows in one pass,
     but will hard fail if the relations have resident foreign relations.
 
+    Rows are selected in id order, continuing after the last deleted id, and
+    deleted by primary key in batches of ``chunk_size``. The
+    ``deletions.bulk.rows-per-second`` option limits how fast a single task
+    deletes rows.
+
     Note: Does NOT support child relations.
     """
 
@@ -264,22 +285,31 @@ class BulkModelDeletionTask(ModelDeletionTask):
         super().__init__(manager, model, query, **kwargs)
 
         self.partition_key = partition_key
+        # Highest id deleted so far, so that every batch continues where the
+        # previous one stopped instead of scanning deleted rows again.
+        self.last_id = 0
 
     def chunk(self):
         return self.delete_instance_bulk()
 
     def delete_instance_bulk(self):
+        model_name = self.model.__name__
+        start = time.monotonic()
+
+        queryset = getattr(self.model, self.manager_name).filter(
+            id__gt=self.last_id, **self.query, **(self.partition_key or {})
+        )
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[: self.chunk_size])
+        if not ids:
+            return False
+
         try:
-            return bulk_delete_objects(
-                model=self.model,
-                limit=self.chunk_size,
-                transaction_id=self.transaction_id,
-                partition_key=self.partition_key,
-                **self.query,
-            )
+            with metrics.timer("deletions.bulk.delete_batch", tags={"model": model_name}):
+                deleted = bulk_delete_objects_by_id(
+                    self.model, ids, partition_key=self.partition_key
+                )
         finally:
             # Don't log Group and Event child object deletions.
-            model_name = self.model.__name__
             if not _leaf_re.search(model_name):
                 self.logger.info(
                     "object.delete.bulk_executed",
@@ -292,3 +322,10 @@ class BulkModelDeletionTask(ModelDeletionTask):
                         **self.query,
                     ),
                 )
+
+        self.last_id = ids[-1]
+        metrics.incr("deletions.bulk.rows_deleted", amount=deleted, tags={"model": model_name})
+        self.throttle(
+            deleted, time.monotonic() - start, options.get("deletions.bulk.rows-per-second")
+        )
+        return True
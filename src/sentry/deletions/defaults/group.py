@@ -1,7 +1,13 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from sentry import eventstore, models, nodestore
+from django.db import connections
+
+from sentry import eventstore, models, nodestore, options
 from sentry.eventstore.models import Event
+from sentry.utils import metrics
+from sentry.utils.query import bulk_delete_objects_by_id
 
 from ..base import BaseDeletionTask, BaseRelation, ModelDeletionTask, ModelRelation
 
@@ -42,6 +48,10 @@ _GROUP_RELATED_MODELS = DIRECT_GROUP_RELATED_MODELS + (
 class EventDataDeletionTask(BaseDeletionTask):
     """
     Deletes nodestore data, EventAttachment and UserReports for group
+
+    With a ``deletions.event-data.concurrency`` above 1, the next page of
+    events is fetched from Snuba while the current page is deleted, and
+    nodestore deletes are split across that many threads.
     """
 
     DEFAULT_CHUNK_SIZE = 10000
@@ -50,22 +60,48 @@ class EventDataDeletionTask(BaseDeletionTask):
         self.group_id = group_id
         self.project_id = project_id
         self.last_event = None
+        self._executor = None
+        self._next_events = None
         super().__init__(manager, **kwargs)
 
-    def chunk(self):
+    def get_executor(self, concurrency):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix=type(self).__name__
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._next_events = None
+
+    def submit(self, executor, fn, *args):
+        def run():
+            try:
+                return fn(*args)
+            finally:
+                # Worker threads go away with the executor, so they must not
+                # leave database connections behind.
+                connections.close_all()
+
+        return executor.submit(run)
+
+    def fetch_events(self, last_event):
         conditions = []
-        if self.last_event is not None:
+        if last_event is not None:
             conditions.extend(
                 [
-                    ["timestamp", "<=", self.last_event.timestamp],
+                    ["timestamp", "<=", last_event.timestamp],
                     [
-                        ["timestamp", "<", self.last_event.timestamp],
-                        ["event_id", "<", self.last_event.event_id],
+                        ["timestamp", "<", last_event.timestamp],
+                        ["event_id", "<", last_event.event_id],
                     ],
                 ]
             )
 
-        events = eventstore.get_unfetched_events(
+        return eventstore.get_unfetched_events(
             filter=eventstore.Filter(
                 conditions=conditions, project_ids=[self.project_id], group_ids=[self.group_id]
             ),
@@ -74,26 +110,66 @@ class EventDataDeletionTask(BaseDeletionTask):
             orderby=["-timestamp", "-event_id"],
         )
 
+    def chunk(self):
+        has_more = False
+        try:
+            has_more = self._delete_chunk()
+            return has_more
+        finally:
+            # Also stop the executor if deleting the chunk failed, the task is
+            # not retried on the same instance.
+            if not has_more:
+                self.shutdown()
+
+    def _delete_chunk(self):
+        concurrency = options.get("deletions.event-data.concurrency")
+        start = time.monotonic()
+
+        if self._next_events is not None:
+            events = self._next_events.result()
+            self._next_events = None
+        else:
+            events = self.fetch_events(self.last_event)
+
         if not events:
             return False
 
         self.last_event = events[-1]
 
-        # Remove from nodestore
         node_ids = [Event.generate_node_id(self.project_id, event.event_id) for event in events]
-        nodestore.delete_multi(node_ids)
+        if concurrency > 1:
+            executor = self.get_executor(concurrency)
+            # Deletes don't change the events that come after the last one
+            # in the sort order, so the next page can be fetched right away.
+            self._next_events = self.submit(executor, self.fetch_events, self.last_event)
+            batch_size = -(-len(node_ids) // (concurrency - 1))
+            futures = [
+                self.submit(executor, nodestore.delete_multi, node_ids[i : i + batch_size])
+                for i in range(0, len(node_ids), batch_size)
+            ]
+        else:
+            futures = []
+            nodestore.delete_multi(node_ids)
 
         # Remove EventAttachment and UserReport *again* as those may not have a
         # group ID, therefore there may be dangling ones after "regular" model
         # deletion.
         event_ids = [event.event_id for event in events]
-        models.EventAttachment.objects.filter(
-            event_id__in=event_ids, project_id=self.project_id
-        ).delete()
-        models.UserReport.objects.filter(
-            event_id__in=event_ids, project_id=self.project_id
-        ).delete()
+        for model in (models.EventAttachment, models.UserReport):
+            ids = list(
+                model.objects.filter(
+                    event_id__in=event_ids, project_id=self.project_id
+                ).values_list("id", flat=True)
+            )
+            bulk_delete_objects_by_id(model, ids)
 
+        for future in futures:
+            future.result()
+
+        metrics.incr("deletions.event_data.events_deleted", amount=len(events))
+        self.throttle(
+            len(events), time.monotonic() - start, options.get("deletions.event-data.rate-limit")
+        )
         return True
 
 
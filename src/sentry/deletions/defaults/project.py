@@ -55,13 +55,18 @@ class ProjectDeletionTask(ModelDeletionTask):
             ]
         )
 
-        model_list = (models.GroupMeta, models.GroupResolution, models.GroupSnooze)
+        model_list = (models.GroupMeta, models.GroupResolution)
         relations.extend(
             [
-                ModelRelation(m, {"group__project": instance.id}, ModelDeletionTask)
+                ModelRelation(m, {"group__project": instance.id}, BulkModelDeletionTask)
                 for m in model_list
             ]
         )
+        # GroupSnooze clears its cache in a post_delete signal, which bulk
+        # deletions would skip.
+        relations.append(
+            ModelRelation(models.GroupSnooze, {"group__project": instance.id}, ModelDeletionTask)
+        )
 
         # Release needs to handle deletes after Group is cleaned up as the foreign
         # key is protected
@@ -8,6 +8,7 @@ from redis.exceptions import ResponseError
 
 from sentry.digests import Record, ScheduleEntry
 from sentry.digests.backends.base import Backend, InvalidState
+from sentry.utils import metrics
 from sentry.utils.locking.backends.redis import RedisLockBackend
 from sentry.utils.locking.lock import Lock
 from sentry.utils.locking.manager import LockManager
@@ -84,6 +85,14 @@ class RedisBackend(Backend):
         # too early.
         self.ttl = options.pop("ttl", 60 * 60)
 
+        # Sets the maximum number of timelines that are moved between the
+        # schedule sets by a single script invocation during scheduling and
+        # maintenance. Partitions are processed in batches of this size until
+        # a batch comes back short, so that a large backlog doesn't block a
+        # Redis server for the duration of one huge script. A value of zero
+        # disables batching.
+        self.schedule_batch_size = options.pop("schedule_batch_size", 1000)
+
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -146,7 +155,14 @@ class RedisBackend(Backend):
         partitions: Iterable[Tuple[bytes, float]] = script(
             self.cluster.get_local_client(host),
             ["-"],
-            ["SCHEDULE", self.namespace, self.ttl, timestamp, deadline],
+            [
+                "SCHEDULE",
+                self.namespace,
+                self.ttl,
+                timestamp,
+                deadline,
+                self.schedule_batch_size,
+            ],
         )
         return partitions
 
@@ -158,19 +174,35 @@ class RedisBackend(Backend):
 
         for host in self.cluster.hosts:
             try:
-                for key, timestamp in self.__schedule_partition(host, deadline, timestamp):
-                    yield ScheduleEntry(key.decode("utf-8"), float(timestamp))
+                while True:
+                    with metrics.timer("digests.schedule.batch", tags={"host": host}):
+                        entries = self.__schedule_partition(host, deadline, timestamp)
+                    metrics.incr("digests.schedule.timelines", amount=len(entries))
+                    for key, entry_timestamp in entries:
+                        yield ScheduleEntry(key.decode("utf-8"), float(entry_timestamp))
+                    if not self.schedule_batch_size or len(entries) < self.schedule_batch_size:
+                        break
             except Exception as error:
                 logger.error(
                     f"Failed to perform scheduling for partition {host} due to error: {error}",
                     exc_info=True,
                 )
 
-    def __maintenance_partition(self, host: int, deadline: float, timestamp: float) -> Any:
-        return script(
-            self.cluster.get_local_client(host),
-            ["-"],
-            ["MAINTENANCE", self.namespace, self.ttl, timestamp, deadline],
+    def __maintenance_partition(self, host: int, deadline: float, timestamp: float) -> int:
+        return int(
+            script(
+                self.cluster.get_local_client(host),
+                ["-"],
+                [
+                    "MAINTENANCE",
+                    self.namespace,
+                    self.ttl,
+                    timestamp,
+                    deadline,
+                    self.schedule_batch_size,
+                ],
+            )
+            or 0
         )
 
     def maintenance(self, deadline: float, timestamp: Optional[float] = None) -> None:
@@ -179,7 +211,12 @@ class RedisBackend(Backend):
 
         for host in self.cluster.hosts:
             try:
-                self.__maintenance_partition(host, deadline, timestamp)
+                while True:
+                    with metrics.timer("digests.maintenance.batch", tags={"host": host}):
+                        moved = self.__maintenance_partition(host, deadline, timestamp)
+                    metrics.incr("digests.maintenance.timelines", amount=moved)
+                    if not self.schedule_batch_size or moved < self.schedule_batch_size:
+                        break
             except Exception as error:
                 logger.error(
                     f"Failed to perform maintenance on digest partition {host} due to error: {error}",
@@ -230,6 +267,7 @@ class RedisBackend(Backend):
             # missing (it was presumably evicted by Redis) so we don't need to
             # return it here.
             filtered_records = [record for record in records if record.value is not None]
+            metrics.incr("digests.digest.records", amount=len(filtered_records))
             if len(records) != len(filtered_records):
                 logger.warning(
                     "Filtered out missing records when fetching digest",
@@ -60,13 +60,16 @@ def fetch_state(project: Project, records: Sequence[Record]) -> Mapping[str, Any
     start = records[-1].datetime
     end = records[0].datetime
 
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
+    # Records of the same group or rule repeat their IDs, so deduplicate them
+    # before loading everything in one query per model.
+    group_ids = {record.value.event.group_id for record in records}
+    rule_ids = set(itertools.chain.from_iterable(record.value.rules for record in records))
+
+    groups = Group.objects.in_bulk(group_ids)
     return {
         "project": project,
         "groups": groups,
-        "rules": Rule.objects.in_bulk(
-            itertools.chain.from_iterable(record.value.rules for record in records)
-        ),
+        "rules": Rule.objects.in_bulk(rule_ids),
         "event_counts": tsdb.get_sums(tsdb.models.group, list(groups.keys()), start, end),
         "user_counts": tsdb.get_distinct_counts_totals(
             tsdb.models.users_affected_by_group, list(groups.keys()), start, end
@@ -4,13 +4,16 @@ from collections import Counter, defaultdict
 from datetime import datetime
 from typing import Any
 from typing import Counter as CounterType
-from typing import Iterable, Mapping, Sequence
+from typing import Iterable, Iterator, Mapping, Sequence
 
 from sentry.digests import Digest, Record
 from sentry.eventstore.models import Event
 from sentry.models import Group, Project, ProjectOwnership, Rule, Team
 from sentry.notifications.types import ActionTargetType
-from sentry.notifications.utils.participants import get_send_to
+from sentry.notifications.utils.participants import (
+    determine_eligible_recipients,
+    get_recipients_by_provider,
+)
 from sentry.services.hybrid_cloud.user import APIUser
 from sentry.types.integrations import ExternalProviders
 
@@ -63,32 +66,52 @@ def get_digest_as_context(digest: Digest) -> Mapping[str, Any]:
     }
 
 
-def get_events_by_participant(
+def get_personalized_digests(
+    digest: Digest,
     participants_by_provider_by_event: Mapping[
         Event, Mapping[ExternalProviders, set[Team | APIUser]]
-    ]
-) -> Mapping[Team | APIUser, set[Event]]:
-    """Invert a mapping of events to participants to a mapping of participants to events."""
-    output = defaultdict(set)
+    ],
+) -> Mapping[int, Digest]:
+    """
+    Split a digest into one digest per participant, keyed by actor ID, in a
+    single pass over its records. Each participant gets the records of the
+    events they participate in, in the order of the original digest.
+    """
+    participants_by_event: dict[Event, set[Team | APIUser]] = defaultdict(set)
     for event, participants_by_provider in participants_by_provider_by_event.items():
-        participants: set[Team | APIUser]
         for participants in participants_by_provider.values():
-            for participant in participants:
-                output[participant].add(event)
+            participants_by_event[event].update(participants)
+
+    output: dict[int, Digest] = {}
+    for rule, rule_groups in digest.items():
+        for group, group_records in rule_groups.items():
+            for record in group_records:
+                for participant in participants_by_event.get(record.value.event, ()):
+                    user_digest = output.setdefault(participant.actor_id, {})
+                    user_digest.setdefault(rule, {}).setdefault(group, []).append(record)
     return output
 
 
-def get_personalized_digests(
-    digest: Digest,
-    participants_by_provider_by_event: Mapping[
-        Event, Mapping[ExternalProviders, set[Team | APIUser]]
-    ],
-) -> Mapping[int, Digest]:
-    events_by_participant = get_events_by_participant(participants_by_provider_by_event)
-    return {
-        participant.actor_id: build_custom_digest(digest, events)
-        for participant, events in events_by_participant.items()
-    }
+class PersonalizedDigestContexts(Mapping[int, Mapping[str, Any]]):
+    """
+    The template context of every personalized digest, keyed by actor ID.
+
+    Contexts are built when they are looked up, so that notification
+    providers render one participant at a time instead of holding the
+    context of every participant in memory.
+    """
+
+    def __init__(self, personalized_digests: Mapping[int, Digest]) -> None:
+        self.personalized_digests = personalized_digests
+
+    def __getitem__(self, actor_id: int) -> Mapping[str, Any]:
+        return get_digest_as_context(self.personalized_digests[actor_id])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.personalized_digests)
+
+    def __len__(self) -> int:
+        return len(self.personalized_digests)
 
 
 def get_event_from_groups_in_digest(digest: Digest) -> Iterable[Event]:
@@ -100,22 +123,6 @@ def get_event_from_groups_in_digest(digest: Digest) -> Iterable[Event]:
     }
 
 
-def build_custom_digest(original_digest: Digest, events: Iterable[Event]) -> Digest:
-    """Given a digest and a set of events, filter the digest to only records that include the events."""
-    user_digest: Digest = {}
-    for rule, rule_groups in original_digest.items():
-        user_rule_groups = {}
-        for group, group_records in rule_groups.items():
-            user_group_records = [
-                record for record in group_records if record.value.event in events
-            ]
-            if user_group_records:
-                user_rule_groups[group] = user_group_records
-        if user_rule_groups:
-            user_digest[rule] = user_rule_groups
-    return user_digest
-
-
 def get_participants_by_event(
     digest: Digest,
     project: Project,
@@ -123,19 +130,24 @@ def get_participants_by_event(
     target_identifier: int | None = None,
 ) -> Mapping[Event, Mapping[ExternalProviders, set[Team | APIUser]]]:
     """
-    This is probably the slowest part in sending digests because we do a lot of
-    DB calls while we iterate over every event. It would be great if we could
-    combine some queries.
+    Ownership is evaluated once per event, but most events of a digest resolve
+    to the same few sets of owners. Notification settings are only looked up
+    once for every distinct set of recipients and shared between their events.
     """
-    return {
-        event: get_send_to(
-            project=project,
-            target_type=target_type,
-            target_identifier=target_identifier,
-            event=event,
+    recipients_by_provider_by_recipients: dict[
+        frozenset[Team | APIUser], Mapping[ExternalProviders, set[Team | APIUser]]
+    ] = {}
+    output = {}
+    for event in get_event_from_groups_in_digest(digest):
+        recipients = frozenset(
+            determine_eligible_recipients(project, target_type, target_identifier, event)
         )
-        for event in get_event_from_groups_in_digest(digest)
-    }
+        if recipients not in recipients_by_provider_by_recipients:
+            recipients_by_provider_by_recipients[recipients] = get_recipients_by_provider(
+                project, recipients
+            )
+        output[event] = recipients_by_provider_by_recipients[recipients]
+    return output
 
 
 def sort_records(records: Sequence[Record]) -> Sequence[Record]:
@@ -9,7 +9,6 @@ import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from hashlib import md5
-from io import BytesIO
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -2012,9 +2011,19 @@ def save_attachment(
     else:
         timestamp = datetime.utcnow().replace(tzinfo=UTC)
 
+    file = File.objects.create(
+        name=attachment.name,
+        type=attachment.type,
+        headers={"Content-Type": attachment.content_type},
+    )
+
     try:
-        data = attachment.data
+        # Stream the chunks from the attachment cache into file blobs, so that
+        # large attachments are never held in memory as a whole.
+        with attachment.open() as fileobj:
+            file.putfile(fileobj, blob_size=settings.SENTRY_ATTACHMENT_BLOB_SIZE)
     except MissingAttachmentChunks:
+        file.delete()
         track_outcome(
             org_id=project.organization_id,
             project_id=project.id,
@@ -2029,13 +2038,6 @@ def save_attachment(
         logger.exception("Missing chunks for cache_key=%s", cache_key)
         return
 
-    file = File.objects.create(
-        name=attachment.name,
-        type=attachment.type,
-        headers={"Content-Type": attachment.content_type},
-    )
-    file.putfile(BytesIO(data), blob_size=settings.SENTRY_ATTACHMENT_BLOB_SIZE)
-
     EventAttachment.objects.create(
         event_id=event_id,
         project_id=project.id,
@@ -242,8 +242,10 @@ add = default_manager.add
 entity_features = default_manager.entity_features
 get = default_manager.get
 has = default_manager.has
+has_many = default_manager.has_many
 batch_has = default_manager.batch_has
 all = default_manager.all
 add_handler = default_manager.add_handler
 add_entity_handler = default_manager.add_entity_handler
 has_for_batch = default_manager.has_for_batch
+local_cache = default_manager.local_cache
@@ -5,10 +5,16 @@ import logging
 __all__ = ["FeatureManager"]
 
 import abc
+import threading
 from collections import defaultdict
+from contextlib import contextmanager
 from typing import (
     TYPE_CHECKING,
     Any,
+    Dict,
+    FrozenSet,
+    Generator,
+    Hashable,
     Iterable,
     List,
     Mapping,
@@ -16,13 +22,14 @@ from typing import (
     MutableSet,
     Optional,
     Sequence,
+    Tuple,
     Type,
 )
 
 import sentry_sdk
 from django.conf import settings
 
-from .base import Feature
+from .base import Feature, OrganizationFeature, ProjectFeature
 from .exceptions import FeatureNotRegistered
 
 if TYPE_CHECKING:
@@ -30,6 +37,22 @@ if TYPE_CHECKING:
     from sentry.models import Organization, Project, User
 
 
+class _Uncacheable(Exception):
+    pass
+
+
+def _cache_key_part(value: Any) -> Hashable:
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    # Models are identified by type and primary key. Unsaved instances and
+    # arbitrary objects can't be told apart safely, so checks involving them
+    # are not cached.
+    pk = getattr(value, "id", None)
+    if isinstance(pk, int):
+        return (type(value).__name__, pk)
+    raise _Uncacheable
+
+
 class RegisteredFeatureManager:
     """
     Feature functions that are built around the need to register feature
@@ -136,6 +159,11 @@ class FeatureManager(RegisteredFeatureManager):
         self._feature_registry: MutableMapping[str, Type[Feature]] = {}
         self.entity_features: MutableSet[str] = set()
         self._entity_handler: Optional[FeatureHandler] = None
+        # Names of registered features without feature handlers, whose value
+        # only depends on `SENTRY_FEATURES` unless the entity handler is used.
+        # Built on first use and reset whenever features or handlers change.
+        self._static_features: Optional[FrozenSet[str]] = None
+        self._local_cache = threading.local()
 
     def all(self, feature_type: Type[Feature] = Feature) -> Mapping[str, Type[Feature]]:
         """
@@ -158,6 +186,7 @@ class FeatureManager(RegisteredFeatureManager):
                 raise NotImplementedError("User flags not allowed with entity_feature=True")
             self.entity_features.add(name)
         self._feature_registry[name] = cls
+        self._static_features = None
 
     def _get_feature_class(self, name: str) -> Type[Feature]:
         try:
@@ -179,6 +208,63 @@ class FeatureManager(RegisteredFeatureManager):
         Registers a handler that doesn't require a feature name match
         """
         self._entity_handler = handler
+        self._static_features = None
+
+    def add_handler(self, handler: FeatureHandler) -> None:
+        super().add_handler(handler)
+        self._static_features = None
+
+    def _is_static(self, name: str, skip_entity: Optional[bool]) -> bool:
+        if self._entity_handler is not None and not skip_entity:
+            return False
+
+        if self._static_features is None:
+            self._static_features = frozenset(
+                name
+                for name in self._feature_registry
+                if not self._handler_registry.get(name)
+            )
+        return name in self._static_features
+
+    @contextmanager
+    def local_cache(self) -> Generator[None, None, None]:
+        """
+        Memoizes the results of ``has`` and ``has_many`` in the current thread
+        until the block exits. Meant to wrap a single request or task, which
+        can check the same flags for the same entities many times. Nested
+        blocks share the cache of the outermost one.
+
+        >>> with features.local_cache():
+        >>>     post_process(event)
+        """
+        if getattr(self._local_cache, "results", None) is not None:
+            yield
+            return
+
+        self._local_cache.results = {}
+        try:
+            yield
+        finally:
+            self._local_cache.results = None
+
+    def _get_cache_key(
+        self,
+        name: str,
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        actor: Optional[User],
+        skip_entity: Optional[bool],
+    ) -> Optional[Tuple[Hashable, ...]]:
+        try:
+            return (
+                name,
+                bool(skip_entity),
+                _cache_key_part(actor),
+                tuple(_cache_key_part(arg) for arg in args),
+                tuple(sorted((k, _cache_key_part(v)) for k, v in kwargs.items())),
+            )
+        except _Uncacheable:
+            return None
 
     def has(
         self, name: str, *args: Any, skip_entity: Optional[bool] = False, **kwargs: Any
@@ -210,11 +296,42 @@ class FeatureManager(RegisteredFeatureManager):
         Depending on the Feature class, additional arguments may need to be
         provided to assign organization or project context to the feature.
 
+        Features without registered handlers, checked without the entity
+        handler, skip straight to the third step.
+
+        Within ``local_cache``, results are memoized per feature, entity and
+        actor.
+
         >>> FeatureManager.has('organizations:feature', organization, actor=request.user)
 
         """
+        actor = kwargs.pop("actor", None)
+
+        results = getattr(self._local_cache, "results", None)
+        cache_key = None
+        if results is not None:
+            cache_key = self._get_cache_key(name, args, kwargs, actor, skip_entity)
+            if cache_key is not None and cache_key in results:
+                return results[cache_key]
+
+        rv = self._has(name, args, kwargs, actor, skip_entity)
+        if cache_key is not None:
+            results[cache_key] = rv
+        return rv
+
+    def _has(
+        self,
+        name: str,
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        actor: Optional[User],
+        skip_entity: Optional[bool],
+    ) -> bool:
+        if self._is_static(name, skip_entity):
+            rv = settings.SENTRY_FEATURES.get(name, False)
+            return rv if rv is not None else False
+
         try:
-            actor = kwargs.pop("actor", None)
             feature = self.get(name, *args, **kwargs)
 
             # Check registered feature handlers
@@ -237,6 +354,107 @@ class FeatureManager(RegisteredFeatureManager):
             logging.exception("Failed to run feature check")
             return False
 
+    def has_many(
+        self,
+        names: Iterable[str],
+        *args: Any,
+        skip_entity: Optional[bool] = False,
+        **kwargs: Any,
+    ) -> Dict[str, bool]:
+        """
+        Determine which of many features are enabled for the same entity and
+        actor. Each value is what ``has`` would return for the feature.
+
+        Features without handlers are resolved with a single lookup each,
+        without building ``Feature`` objects. Organization and project
+        features that only depend on the entity handler are checked with a
+        single ``batch_has`` call, falling back to ``has`` for the ones it
+        can't answer.
+
+        >>> FeatureManager.has_many(['organizations:a', 'organizations:b'], organization)
+        """
+        names = list(names)
+        actor = kwargs.get("actor")
+        results = getattr(self._local_cache, "results", None)
+        rv: Dict[str, bool] = {}
+        # batch_has key of the entity -> (a feature of the entity, feature names)
+        batches: Dict[str, Tuple[Feature, List[str]]] = {}
+        batched: MutableSet[str] = set()
+
+        for name in names:
+            if name in rv or name in batched:
+                continue
+
+            feature = None
+            if not skip_entity and not self._handler_registry.get(name):
+                feature = self._get_batchable_feature(name, args, kwargs)
+            if feature is None:
+                rv[name] = self.has(name, *args, skip_entity=skip_entity, **kwargs)
+                continue
+
+            if results is not None:
+                cache_key = self._get_cache_key(name, args, {}, actor, skip_entity)
+                if cache_key is not None and cache_key in results:
+                    rv[name] = results[cache_key]
+                    continue
+
+            if isinstance(feature, ProjectFeature):
+                batch_key = f"project:{feature.project.id}"
+            else:
+                batch_key = f"organization:{feature.get_subject().id}"
+            batches.setdefault(batch_key, (feature, []))[1].append(name)
+            batched.add(name)
+
+        for batch_key, (feature, batch_names) in batches.items():
+            try:
+                if isinstance(feature, ProjectFeature):
+                    batch_results = self.batch_has(
+                        batch_names,
+                        actor,
+                        projects=[feature.project],
+                        organization=feature.project.organization,
+                    )
+                else:
+                    batch_results = self.batch_has(
+                        batch_names, actor, organization=feature.get_subject()
+                    )
+            except Exception:
+                logging.exception("Failed to run batch feature check")
+                batch_results = None
+            entity_results = (batch_results or {}).get(batch_key, {})
+
+            for name in batch_names:
+                value = entity_results.get(name)
+                if value is None:
+                    rv[name] = self.has(name, *args, skip_entity=skip_entity, **kwargs)
+                    continue
+
+                rv[name] = value
+                if results is not None:
+                    cache_key = self._get_cache_key(name, args, {}, actor, skip_entity)
+                    if cache_key is not None:
+                        results[cache_key] = value
+
+        return {name: rv[name] for name in names}
+
+    def _get_batchable_feature(
+        self, name: str, args: Sequence[Any], kwargs: Mapping[str, Any]
+    ) -> Optional[Feature]:
+        """
+        Returns the feature if it can be checked with the entity handler's
+        ``batch_has``, which only handles plain organization and project
+        features.
+        """
+        if self._entity_handler is None or len(args) != 1 or set(kwargs) - {"actor"}:
+            return None
+        try:
+            cls = self._get_feature_class(name)
+        except FeatureNotRegistered:
+            return None
+        if cls not in (OrganizationFeature, ProjectFeature):
+            return None
+        return cls(name, args[0])
+
     def batch_has(
         self,
         feature_names: Sequence[str],
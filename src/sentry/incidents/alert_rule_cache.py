@@ -0,0 +1,158 @@
+"""
+A per-process cache of alert rule definitions for the subscription processor.
+
+Alert rules change rarely compared to how often their subscriptions receive
+updates, so the query subscription consumer keeps the rule and its sorted
+triggers in memory, keyed by subscription id. Model signals only fire in the
+process that changes a rule, so every change instead increments a version
+counter in Redis, keyed by the snuba query of the rule. Cached definitions are
+checked against these counters before use, which costs a single Redis round
+trip for any number of subscriptions.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+from django.db import router, transaction
+
+from sentry.incidents.models import AlertRule, AlertRuleTrigger
+from sentry.snuba.models import QuerySubscription
+from sentry.utils import metrics, redis
+from sentry.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+ALERT_RULE_VERSION_KEY = "alert_rule_definition:version:%s"
+# Versions outlive cached definitions by far, so that an expired version can't
+# make a stale definition look current.
+ALERT_RULE_VERSION_TTL = int(timedelta(days=7).total_seconds())
+# Maximum time a definition is used before it is loaded again regardless of
+# its version, matching the TTL of the shared alert rule caches.
+ALERT_RULE_DEFINITION_MAX_AGE = 3600
+ALERT_RULE_DEFINITION_CACHE_SIZE = 50_000
+
+
+class AlertRuleDefinition(NamedTuple):
+    alert_rule: AlertRule
+    # Triggers of the alert rule, sorted by `alert_threshold`
+    triggers: List[AlertRuleTrigger]
+    version: int
+    loaded_at: float
+
+
+def get_redis_client():
+    cluster_key = getattr(settings, "SENTRY_INCIDENT_RULES_REDIS_CLUSTER", "default")
+    return redis.redis_clusters.get(cluster_key)
+
+
+def bump_alert_rule_version(snuba_query_id: int) -> None:
+    """
+    Marks all cached definitions of the alert rule of a snuba query as stale.
+
+    Changes are usually made in a transaction, so the version is incremented
+    again once it commits. Otherwise a definition loaded between the first
+    increment and the commit would be cached with the new version.
+    """
+    _incr_alert_rule_version(snuba_query_id)
+    transaction.on_commit(
+        lambda: _incr_alert_rule_version(snuba_query_id),
+        using=router.db_for_write(AlertRule),
+    )
+
+
+def _incr_alert_rule_version(snuba_query_id: int) -> None:
+    try:
+        pipeline = get_redis_client().pipeline()
+        key = ALERT_RULE_VERSION_KEY % snuba_query_id
+        pipeline.incr(key)
+        pipeline.expire(key, ALERT_RULE_VERSION_TTL)
+        pipeline.execute()
+    except Exception:
+        # Cached definitions expire after ALERT_RULE_DEFINITION_MAX_AGE at the
+        # latest, so don't fail the change that caused this.
+        logger.exception("Failed to bump alert rule definition version")
+
+
+def get_alert_rule_versions(snuba_query_ids: Iterable[int]) -> Dict[int, int]:
+    snuba_query_ids = list(snuba_query_ids)
+    if not snuba_query_ids:
+        return {}
+
+    pipeline = get_redis_client().pipeline()
+    for snuba_query_id in snuba_query_ids:
+        pipeline.get(ALERT_RULE_VERSION_KEY % snuba_query_id)
+    return {
+        snuba_query_id: int(version or 0)
+        for snuba_query_id, version in zip(snuba_query_ids, pipeline.execute())
+    }
+
+
+class AlertRuleDefinitionCache:
+    def __init__(self, maxsize: int = ALERT_RULE_DEFINITION_CACHE_SIZE) -> None:
+        self._cache: LRUCache[int, AlertRuleDefinition] = LRUCache(maxsize)
+
+    def get(self, subscription: QuerySubscription) -> Optional[AlertRuleDefinition]:
+        return self.get_many([subscription]).get(subscription.id)
+
+    def get_many(
+        self, subscriptions: Sequence[QuerySubscription]
+    ) -> Dict[int, AlertRuleDefinition]:
+        """
+        Returns the alert rule definitions of many subscriptions, mapped by
+        subscription id. Subscriptions without an alert rule are left out.
+        """
+        with metrics.timer("incidents.alert_rule_cache.check_versions"):
+            versions = get_alert_rule_versions(
+                {subscription.snuba_query_id for subscription in subscriptions}
+            )
+
+        now = time.time()
+        definitions = {}
+        missing = []
+        for subscription in subscriptions:
+            version = versions[subscription.snuba_query_id]
+            definition = self._cache.get(subscription.id)
+            if definition is None:
+                result = "miss"
+            elif definition.version != version:
+                result = "stale"
+            elif now - definition.loaded_at > ALERT_RULE_DEFINITION_MAX_AGE:
+                result = "expired"
+            else:
+                definitions[subscription.id] = definition
+                metrics.incr("incidents.alert_rule_cache.lookup", tags={"result": "hit"})
+                continue
+
+            metrics.incr("incidents.alert_rule_cache.lookup", tags={"result": result})
+            missing.append(subscription)
+
+        if missing:
+            # Versions are read before loading, so a change that happens while
+            # loading leaves the definition stale rather than current.
+            alert_rules = AlertRule.objects.get_for_subscriptions(missing)
+            triggers = AlertRuleTrigger.objects.get_for_alert_rules(alert_rules.values())
+            for subscription in missing:
+                alert_rule = alert_rules.get(subscription.id)
+                if alert_rule is None:
+                    self._cache.delete(subscription.id)
+                    continue
+                definition = AlertRuleDefinition(
+                    alert_rule=alert_rule,
+                    triggers=sorted(
+                        triggers[alert_rule.id], key=lambda trigger: trigger.alert_threshold
+                    ),
+                    version=versions[subscription.snuba_query_id],
+                    loaded_at=now,
+                )
+                self._cache.set(subscription.id, definition)
+                definitions[subscription.id] = definition
+
+        return definitions
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+alert_rule_definition_cache = AlertRuleDefinitionCache()
@@ -89,6 +89,60 @@ class IncidentManager(BaseManager):
 
         return incident
 
+    def get_active_incidents(self, alert_rules_and_projects):
+        """
+        Fetches the active incidents of many (alert rule, project) pairs at once.
+        Attempts to fetch from cache, then loads the remaining incidents with a
+        single query.
+        :return: A dict mapping `(alert_rule_id, project_id)` to the active
+        `Incident`, or None if there is no active incident.
+        """
+        cache_keys = {
+            self._build_active_incident_cache_key(alert_rule.id, project.id): (
+                alert_rule.id,
+                project.id,
+            )
+            for alert_rule, project in alert_rules_and_projects
+        }
+        cached = cache.get_many(list(cache_keys))
+
+        incidents = {}
+        missing = {}
+        for cache_key, pair in cache_keys.items():
+            incident = cached.get(cache_key)
+            if incident is None:
+                missing[cache_key] = pair
+            else:
+                incidents[pair] = incident or None
+
+        if missing:
+            alert_rule_ids = {alert_rule_id for alert_rule_id, _ in missing.values()}
+            project_ids = {project_id for _, project_id in missing.values()}
+            incident_projects = (
+                IncidentProject.objects.filter(
+                    incident__type=IncidentType.ALERT_TRIGGERED.value,
+                    incident__alert_rule_id__in=alert_rule_ids,
+                    project_id__in=project_ids,
+                )
+                .exclude(incident__status=IncidentStatus.CLOSED.value)
+                .select_related("incident")
+                .order_by("-incident__date_added")
+            )
+            latest = {}
+            for incident_project in incident_projects:
+                incident = incident_project.incident
+                latest.setdefault((incident.alert_rule_id, incident_project.project_id), incident)
+
+            to_cache = {}
+            for cache_key, pair in missing.items():
+                incident = latest.get(pair)
+                incidents[pair] = incident
+                # Store False so that we can have a negative cache as well.
+                to_cache[cache_key] = incident or False
+            cache.set_many(to_cache)
+
+        return incidents
+
     @classmethod
     def clear_active_incident_cache(cls, instance, **kwargs):
         for project in instance.projects.all():
@@ -326,6 +380,45 @@ class AlertRuleManager(BaseManager):
 
         return alert_rule
 
+    def get_for_subscriptions(self, subscriptions):
+        """
+        Fetches the AlertRules associated with many Subscriptions at once. Attempts
+        to fetch from cache, then loads the remaining rules with a single query.
+        :return: A dict mapping subscription ids to their `AlertRule`. Subscriptions
+        without an alert rule are left out.
+        """
+        cache_keys = {
+            self.__build_subscription_cache_key(subscription.id): subscription
+            for subscription in subscriptions
+        }
+        cached = cache.get_many(list(cache_keys))
+
+        alert_rules = {}
+        missing = {}
+        for cache_key, subscription in cache_keys.items():
+            alert_rule = cached.get(cache_key)
+            if alert_rule is None:
+                missing[cache_key] = subscription
+            else:
+                alert_rules[subscription.id] = alert_rule
+
+        if missing:
+            rules_by_snuba_query = {
+                alert_rule.snuba_query_id: alert_rule
+                for alert_rule in self.filter(
+                    snuba_query_id__in={s.snuba_query_id for s in missing.values()}
+                )
+            }
+            to_cache = {}
+            for cache_key, subscription in missing.items():
+                alert_rule = rules_by_snuba_query.get(subscription.snuba_query_id)
+                if alert_rule is not None:
+                    alert_rules[subscription.id] = alert_rule
+                    to_cache[cache_key] = alert_rule
+            cache.set_many(to_cache, 3600)
+
+        return alert_rules
+
     @classmethod
     def clear_subscription_cache(cls, instance, **kwargs):
         cache.delete(cls.__build_subscription_cache_key(instance.id))
@@ -477,6 +570,42 @@ class AlertRuleTriggerManager(BaseManager):
             cache.set(cache_key, triggers, 3600)
         return triggers
 
+    def get_for_alert_rules(self, alert_rules):
+        """
+        Fetches the AlertRuleTriggers associated with many AlertRules at once.
+        Attempts to fetch from cache, then loads the remaining triggers with a
+        single query.
+        :return: A dict mapping alert rule ids to lists of `AlertRuleTrigger`
+        """
+        cache_keys = {
+            self._build_trigger_cache_key(alert_rule.id): alert_rule.id
+            for alert_rule in alert_rules
+        }
+        cached = cache.get_many(list(cache_keys))
+
+        triggers = {}
+        missing = {}
+        for cache_key, alert_rule_id in cache_keys.items():
+            if cached.get(cache_key) is None:
+                missing[cache_key] = alert_rule_id
+            else:
+                triggers[alert_rule_id] = cached[cache_key]
+
+        if missing:
+            for alert_rule_id in missing.values():
+                triggers[alert_rule_id] = []
+            for trigger in AlertRuleTrigger.objects.filter(alert_rule_id__in=missing.values()):
+                triggers[trigger.alert_rule_id].append(trigger)
+            cache.set_many(
+                {
+                    cache_key: triggers[alert_rule_id]
+                    for cache_key, alert_rule_id in missing.items()
+                },
+                3600,
+            )
+
+        return triggers
+
     @classmethod
     def clear_trigger_cache(cls, instance, **kwargs):
         cache.delete(cls._build_trigger_cache_key(instance.alert_rule_id))
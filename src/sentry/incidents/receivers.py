@@ -1,11 +1,13 @@
 from datetime import datetime
 
 import pytz
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from sentry.incidents.models import AlertRule, IncidentTrigger
+from sentry.incidents.alert_rule_cache import bump_alert_rule_version
+from sentry.incidents.models import AlertRule, AlertRuleTrigger, IncidentTrigger
 from sentry.models.project import Project
+from sentry.snuba.models import SnubaQuery
 
 
 @receiver(post_save, sender=Project, weak=False)
@@ -25,3 +27,26 @@ def add_project_to_include_all_rules(instance, created, **kwargs):
 @receiver(pre_save, sender=IncidentTrigger)
 def pre_save_incident_trigger(instance, sender, *args, **kwargs):
     instance.date_modified = datetime.utcnow().replace(tzinfo=pytz.utc)
+
+
+@receiver([post_save, post_delete], sender=AlertRule, weak=False)
+def invalidate_alert_rule_definition(instance, **kwargs):
+    if instance.snuba_query_id is not None:
+        bump_alert_rule_version(instance.snuba_query_id)
+
+
+@receiver([post_save, post_delete], sender=AlertRuleTrigger, weak=False)
+def invalidate_alert_rule_trigger_definition(instance, **kwargs):
+    snuba_query_id = (
+        AlertRule.objects_with_snapshots.filter(id=instance.alert_rule_id)
+        .values_list("snuba_query_id", flat=True)
+        .first()
+    )
+    # Triggers deleted along with their alert rule are covered by the rule itself
+    if snuba_query_id is not None:
+        bump_alert_rule_version(snuba_query_id)
+
+
+@receiver(post_save, sender=SnubaQuery, weak=False)
+def invalidate_snuba_query_alert_rule_definition(instance, **kwargs):
+    bump_alert_rule_version(instance.id)
@@ -10,6 +10,7 @@ from snuba_sdk import Column, Condition, Limit, Op
 
 from sentry import features
 from sentry.constants import CRASH_RATE_ALERT_AGGREGATE_ALIAS, CRASH_RATE_ALERT_SESSION_COUNT_ALIAS
+from sentry.incidents.alert_rule_cache import alert_rule_definition_cache
 from sentry.incidents.logic import (
     CRITICAL_TRIGGER_LABEL,
     WARNING_TRIGGER_LABEL,
@@ -18,7 +19,6 @@ from sentry.incidents.logic import (
     update_incident_status,
 )
 from sentry.incidents.models import (
-    AlertRule,
     AlertRuleThresholdType,
     AlertRuleTrigger,
     Incident,
@@ -37,6 +37,7 @@ from sentry.snuba.entity_subscription import (
     get_entity_key_from_query_builder,
     get_entity_subscription_from_snuba_query,
 )
+from sentry.snuba.models import SnubaQuery
 from sentry.snuba.tasks import build_query_builder
 from sentry.utils import metrics, redis
 from sentry.utils.dates import to_datetime, to_timestamp
@@ -70,21 +71,36 @@ class SubscriptionProcessor:
         AlertRuleThresholdType.BELOW: (operator.lt, operator.gt),
     }
 
-    def __init__(self, subscription):
+    def __init__(self, subscription, alert_rule=None, triggers=None, alert_rule_stats=None):
+        """
+        :param alert_rule: The `AlertRule` of the subscription, fetched if not passed
+        :param triggers: The triggers of the alert rule, fetched if not passed
+        :param alert_rule_stats: The result of `get_alert_rule_stats`, fetched if not passed
+        """
         self.subscription = subscription
-        try:
-            self.alert_rule = AlertRule.objects.get_for_subscription(subscription)
-        except AlertRule.DoesNotExist:
-            return
+        # Redis pipeline that stat updates are added to instead of being written
+        # immediately. Set while processing a batch of updates.
+        self.stats_pipeline = None
+        if alert_rule is None:
+            definition = alert_rule_definition_cache.get(subscription)
+            if definition is None:
+                return
+            alert_rule, triggers = definition.alert_rule, definition.triggers
+        self.alert_rule = alert_rule
 
-        self.triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
-        self.triggers.sort(key=lambda trigger: trigger.alert_threshold)
+        if triggers is None:
+            triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
+        self.triggers = sorted(triggers, key=lambda trigger: trigger.alert_threshold)
 
+        if alert_rule_stats is None:
+            alert_rule_stats = get_alert_rule_stats(
+                self.alert_rule, self.subscription, self.triggers
+            )
         (
             self.last_update,
             self.trigger_alert_counts,
             self.trigger_resolve_counts,
-        ) = get_alert_rule_stats(self.alert_rule, self.subscription, self.triggers)
+        ) = alert_rule_stats
         self.orig_trigger_alert_counts = deepcopy(self.trigger_alert_counts)
         self.orig_trigger_resolve_counts = deepcopy(self.trigger_resolve_counts)
 
@@ -665,7 +681,128 @@ class SubscriptionProcessor:
             self.last_update,
             updated_trigger_alert_counts,
             updated_trigger_resolve_counts,
+            pipeline=self.stats_pipeline,
+        )
+
+
+def process_updates(updates):
+    """
+    Processes a batch of subscription updates for alert rules. Produces the same
+    results as processing each update with its own `SubscriptionProcessor`, but
+    loads alert rules, triggers and active incidents for all subscriptions with
+    a few queries, fetches all alert rule stats in one Redis pipeline and writes
+    the updated stats back in another one.
+    :param updates: A list of `(subscription_update, subscription)` tuples.
+    Updates of the same subscription are processed in order.
+    """
+    updates_by_subscription = {}
+    for subscription_update, subscription in updates:
+        updates_by_subscription.setdefault(subscription.id, (subscription, []))[1].append(
+            subscription_update
+        )
+    subscriptions = [subscription for subscription, _ in updates_by_subscription.values()]
+
+    with metrics.timer("incidents.subscription_processor.bulk_load"):
+        processors = build_subscription_processors(subscriptions)
+
+    pipeline = get_redis_client().pipeline()
+    for subscription, subscription_updates in updates_by_subscription.values():
+        processor = processors[subscription.id]
+        processor.stats_pipeline = pipeline
+        for subscription_update in subscription_updates:
+            try:
+                processor.process_update(subscription_update)
+            except Exception:
+                # Don't let a single failing update block the rest of the batch
+                logger.exception(
+                    "Failed to process subscription update",
+                    extra={"subscription_id": subscription.id},
+                )
+
+    metrics.timing("incidents.subscription_processor.batch_size", len(updates))
+    pipeline.execute()
+
+
+def build_subscription_processors(subscriptions):
+    """
+    Creates `SubscriptionProcessor` instances for many subscriptions, loading
+    their alert rules, triggers, active incidents and stats in bulk.
+    :return: A dict mapping subscription ids to their processor
+    """
+    projects = {
+        project.id: project
+        for project in Project.objects.get_many_from_cache(
+            list({subscription.project_id for subscription in subscriptions})
         )
+    }
+    snuba_queries = SnubaQuery.objects.in_bulk(
+        {subscription.snuba_query_id for subscription in subscriptions}
+    )
+    for subscription in subscriptions:
+        if subscription.project_id in projects:
+            subscription.project = projects[subscription.project_id]
+        if subscription.snuba_query_id in snuba_queries:
+            subscription.snuba_query = snuba_queries[subscription.snuba_query_id]
+
+    definitions = alert_rule_definition_cache.get_many(subscriptions)
+    alert_rules = {
+        subscription_id: definition.alert_rule
+        for subscription_id, definition in definitions.items()
+    }
+    triggers = {
+        definition.alert_rule.id: definition.triggers for definition in definitions.values()
+    }
+
+    with_rules = [
+        (subscription, alert_rules[subscription.id])
+        for subscription in subscriptions
+        if subscription.id in alert_rules
+    ]
+    stats = get_alert_rule_stats_many(
+        [
+            (alert_rule, subscription, triggers[alert_rule.id])
+            for subscription, alert_rule in with_rules
+        ]
+    )
+    active_incidents = Incident.objects.get_active_incidents(
+        [
+            (alert_rule, projects[subscription.project_id])
+            for subscription, alert_rule in with_rules
+            if subscription.project_id in projects
+        ]
+    )
+    incident_triggers = {}
+    for incident_trigger in IncidentTrigger.objects.filter(
+        incident__in=[incident for incident in active_incidents.values() if incident]
+    ).select_related("alert_rule_trigger"):
+        incident_triggers.setdefault(incident_trigger.incident_id, {})[
+            incident_trigger.alert_rule_trigger_id
+        ] = incident_trigger
+
+    processors = {}
+    for subscription in subscriptions:
+        alert_rule = alert_rules.get(subscription.id)
+        if alert_rule is None:
+            # The processor skips updates of subscriptions without an alert rule
+            processors[subscription.id] = SubscriptionProcessor(subscription)
+            continue
+
+        processor = SubscriptionProcessor(
+            subscription,
+            alert_rule=alert_rule,
+            triggers=triggers[alert_rule.id],
+            alert_rule_stats=stats[subscription.id],
+        )
+        key = (alert_rule.id, subscription.project_id)
+        if key in active_incidents:
+            incident = active_incidents[key]
+            processor.active_incident = incident
+            processor._incident_triggers = (
+                incident_triggers.get(incident.id, {}) if incident else {}
+            )
+        processors[subscription.id] = processor
+
+    return processors
 
 
 def build_alert_rule_stat_keys(alert_rule, subscription):
@@ -722,6 +859,38 @@ def get_alert_rule_stats(alert_rule, subscription, triggers):
     alert_rule_keys = build_alert_rule_stat_keys(alert_rule, subscription)
     trigger_keys = build_trigger_stat_keys(alert_rule, subscription, triggers)
     results = get_redis_client().mget(alert_rule_keys + trigger_keys)
+    return _parse_alert_rule_stats(results, triggers)
+
+
+def get_alert_rule_stats_many(items):
+    """
+    Fetches stats about many alert rules in a single Redis pipeline.
+    :param items: A list of `(alert_rule, subscription, triggers)` tuples
+    :return: A dict mapping subscription ids to stats in the format returned by
+    `get_alert_rule_stats`
+    """
+    pipeline = get_redis_client().pipeline()
+    key_counts = []
+    for alert_rule, subscription, triggers in items:
+        keys = build_alert_rule_stat_keys(alert_rule, subscription) + build_trigger_stat_keys(
+            alert_rule, subscription, triggers
+        )
+        # Each rule and project use their own hash slot, so keys can't be fetched
+        # with a single `mget` on a cluster.
+        for key in keys:
+            pipeline.get(key)
+        key_counts.append(len(keys))
+
+    results = iter(pipeline.execute() if items else ())
+    return {
+        subscription.id: _parse_alert_rule_stats(
+            [next(results) for _ in range(key_count)], triggers
+        )
+        for (_, subscription, triggers), key_count in zip(items, key_counts)
+    }
+
+
+def _parse_alert_rule_stats(results, triggers):
     results = tuple(0 if result is None else int(result) for result in results)
     last_update = to_datetime(results[0])
     trigger_results = results[1:]
@@ -736,11 +905,17 @@ def get_alert_rule_stats(alert_rule, subscription, triggers):
     return last_update, trigger_alert_counts, trigger_resolve_counts
 
 
-def update_alert_rule_stats(alert_rule, subscription, last_update, alert_counts, resolve_counts):
+def update_alert_rule_stats(
+    alert_rule, subscription, last_update, alert_counts, resolve_counts, pipeline=None
+):
     """
     Updates stats about the alert rule, subscription and triggers if they've changed.
+    If a pipeline is passed, the updates are added to it and written when the
+    caller executes it.
     """
-    pipeline = get_redis_client().pipeline()
+    execute = pipeline is None
+    if pipeline is None:
+        pipeline = get_redis_client().pipeline()
 
     counts_with_stat_keys = zip(ALERT_RULE_TRIGGER_STAT_KEYS, (alert_counts, resolve_counts))
     for stat_key, trigger_counts in counts_with_stat_keys:
@@ -755,7 +930,8 @@ def update_alert_rule_stats(alert_rule, subscription, last_update, alert_counts,
 
     last_update_key = build_alert_rule_stat_keys(alert_rule, subscription)[0]
     pipeline.set(last_update_key, int(to_timestamp(last_update)), ex=REDIS_TTL)
-    pipeline.execute()
+    if execute:
+        pipeline.execute()
 
 
 def get_redis_client():
@@ -19,6 +19,10 @@ MAX_SET_SIZE = 1000
 #: Remove the set if it has not received any updates for 24 hours.
 SET_TTL = 24 * 60 * 60
 
+#: Number of set members requested per SSCAN round trip when streaming
+#: transaction names out of redis.
+SSCAN_BATCH_SIZE = 1000
+
 
 REDIS_KEY_PREFIX = "txnames:"
 
@@ -57,11 +61,11 @@ def _store_transaction_name(project: Project, transaction_name: str) -> None:
 
 
 def get_transaction_names(project: Project) -> Iterator[str]:
-    """Return all transaction names stored for the given project"""
+    """Lazily iterate over all transaction names stored for the given project"""
     client = get_redis_client()
     redis_key = _get_redis_key(project)
 
-    return client.sscan_iter(redis_key)  # type: ignore
+    return client.sscan_iter(redis_key, count=SSCAN_BATCH_SIZE)  # type: ignore
 
 
 def record_transaction_name(project: Project, event: Event, **kwargs: Any) -> None:
@@ -46,8 +46,8 @@ The replacement rules are interpreted by Relay to match and replace `*`, and to
 """
 
 import logging
-from collections import UserDict, defaultdict
-from typing import Iterable, List, Optional, Union
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import sentry_sdk
 from typing_extensions import TypeAlias
@@ -79,11 +79,18 @@ class TreeClusterer(Clusterer):
         self._rules: Optional[List[ReplacementRule]] = None
 
     def add_input(self, transaction_names: Iterable[str]) -> None:
+        # Path segments repeat across many transaction names, so they are
+        # interned to share a single string object per distinct segment.
+        intern = sys.intern
+        root = self._tree
         for tx_name in transaction_names:
-            parts = tx_name.split(SEP)
-            node = self._tree
-            for part in parts:
-                node = node.setdefault(part, Node())
+            node = root
+            for part in tx_name.split(SEP):
+                part = intern(part)
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = Node()
+                node = child
 
     def get_rules(self) -> List[ReplacementRule]:
         """Computes the rules for the current tree."""
@@ -127,35 +134,65 @@ class TreeClusterer(Clusterer):
 Edge: TypeAlias = Union[str, Merged]
 
 
-class Node(UserDict):  # type: ignore
-    """Keys in this dict are names of the children"""
+class Node:
+    """A node of the URL tree. Keys in ``children`` are the names of the children.
+
+    Nodes are slotted and all traversals are iterative, so that trees built from
+    many distinct, deep transaction names stay small and do not hit the
+    recursion limit.
+    """
+
+    __slots__ = ("children",)
+
+    def __init__(self, children: Optional[Dict[Edge, "Node"]] = None) -> None:
+        self.children: Dict[Edge, Node] = children if children is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.children)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Node):
+            return NotImplemented
+        return self.children == other.children
 
     def paths(self, ancestors: Optional[List[Edge]] = None) -> Iterable[List[Edge]]:
-        """Collect all paths and subpaths through the graph"""
+        """Collect all paths and subpaths through the graph, in depth-first order"""
         if ancestors is None:
             ancestors = []
-        for name, child in self.items():
-            path = ancestors + [name]
-            yield path
-            yield from child.paths(ancestors=path)
+        stack: List[Tuple[List[Edge], Node]] = [(ancestors, self)]
+        while stack:
+            prefix, node = stack.pop()
+            # Push children in reverse so they are visited in insertion order.
+            for name, child in reversed(list(node.children.items())):
+                stack.append((prefix + [name], child))
+            if node is not self:
+                yield prefix
 
     def merge(self, merge_threshold: int) -> None:
-        """Recursively merge children of high-cardinality nodes"""
-        if len(self) >= merge_threshold:
-            merged_children = self._merge_nodes(self.values())
-            self.clear()
-            self[MERGED] = merged_children
+        """Merge children of high-cardinality nodes, from the top down"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if len(node.children) >= merge_threshold:
+                merged_children = self._merge_nodes(list(node.children.values()))
+                node.children = {MERGED: merged_children}
 
-        for child in self.values():
-            child.merge(merge_threshold)
+            stack.extend(node.children.values())
 
     @classmethod
-    def _merge_nodes(cls, nodes: Iterable["Node"]) -> "Node":
-        children_by_name = defaultdict(list)
-        for node in nodes:
-            for name, child in node.items():
-                children_by_name[name].append(child)
-
-        return Node(
-            {name: cls._merge_nodes(children) for name, children in children_by_name.items()}
-        )
+    def _merge_nodes(cls, nodes: List["Node"]) -> "Node":
+        """Merge the subtrees of all given nodes into a single new subtree"""
+        merged = Node()
+        stack: List[Tuple[Node, List[Node]]] = [(merged, nodes)]
+        while stack:
+            target, sources = stack.pop()
+            children_by_name: Dict[Edge, List[Node]] = {}
+            for node in sources:
+                for name, child in node.children.items():
+                    children_by_name.setdefault(name, []).append(child)
+
+            for name, children in children_by_name.items():
+                new_child = target.children[name] = Node()
+                stack.append((new_child, children))
+
+        return merged
@@ -3,13 +3,15 @@ import errno
 import logging
 import re
 import sys
+import threading
 import time
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from itertools import groupby
 from os.path import splitext
-from typing import IO, Optional, Tuple
+from typing import IO, Any, Callable, List, Optional, Sequence, Tuple, TypeVar, Union
 from urllib.parse import urlsplit
 
 import sentry_sdk
@@ -17,6 +19,7 @@ from django.conf import settings
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from requests.utils import get_encoding_from_headers
+from sentry_sdk import Hub
 from symbolic import SourceMapCache as SmCache
 
 from sentry import features, http, options
@@ -31,8 +34,9 @@ from sentry.utils import json, metrics
 # database or from the internet
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
-from sentry.utils.hashlib import md5_text
+from sentry.utils.hashlib import md5_text, sha1_text
 from sentry.utils.http import is_valid_origin
+from sentry.utils.lru import LRUCache
 from sentry.utils.retries import ConditionalRetryPolicy, exponential_delay
 from sentry.utils.safe import get_path
 from sentry.utils.urls import non_standard_url_join
@@ -79,13 +83,36 @@ MAX_RESOURCE_FETCHES = 100
 
 CACHE_MAX_VALUE_SIZE = settings.SENTRY_CACHE_MAX_VALUE_SIZE
 
+# Bounds for the process-wide cache of parsed sourcemaps. The weight of an
+# entry is the size of the minified source and sourcemap it was parsed from.
+SOURCEMAP_VIEW_CACHE_SIZE = 500
+SOURCEMAP_VIEW_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# (concurrency, pool) of the process-wide pool fetching sources and sourcemaps
+_fetch_thread_pool: Optional[Tuple[int, ThreadPoolExecutor]] = None
+_fetch_thread_pool_lock = threading.Lock()
+
 
 class UnparseableSourcemap(http.BadSource):
     error_type = EventError.JS_INVALID_SOURCEMAP
 
 
+# Parsed sourcemaps of release artifacts shared across all events processed by
+# this worker, keyed by `(release_id, dist_id, sourcemap_url, checksum)`.
+_sourcemap_view_cache: LRUCache[
+    Tuple[int, Optional[int], str, str], Tuple[SmCache, int]
+] = LRUCache(
+    SOURCEMAP_VIEW_CACHE_SIZE,
+    max_weight=SOURCEMAP_VIEW_CACHE_MAX_BYTES,
+    weigher=lambda entry: entry[1],
+)
+
+
 def trim_line(line, column=0):
     """
     Trims a line down to a goal of 140 characters, with a little
@@ -744,6 +771,7 @@ def get_max_age(headers):
 
 
 def fetch_sourcemap(url, source=b"", project=None, release=None, dist=None, allow_scraping=True):
+    cache_key = None
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -766,17 +794,41 @@ def fetch_sourcemap(url, source=b"", project=None, release=None, dist=None, allo
                 allow_scraping=allow_scraping,
             )
         body = result.body
+
+        # The parsed view depends on both the minified source and the map, so
+        # both go into the checksum. Hashing is cheap compared to parsing. The
+        # length prefix keeps the boundary between the two unambiguous.
+        if release is not None:
+            source_bytes = force_bytes(source)
+            cache_key = (
+                release.id,
+                dist.id if dist else None,
+                url,
+                sha1_text(b"%d:" % len(source_bytes), source_bytes, body).hexdigest(),
+            )
+            cached = _sourcemap_view_cache.get(cache_key)
+            if cached is not None:
+                metrics.incr("sourcemaps.view_cache.hit", sample_rate=0.1)
+                return cached[0]
+            metrics.incr("sourcemaps.view_cache.miss", sample_rate=0.1)
+
     try:
         with sentry_sdk.start_span(
             op="JavaScriptStacktraceProcessor.fetch_sourcemap.SmCache.from_bytes"
         ):
-            return SmCache.from_bytes(source, body)
+            sourcemap_view = SmCache.from_bytes(source, body)
 
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(str(exc), exc_info=True)
         raise UnparseableSourcemap({"url": http.expose_url(url)})
 
+    if cache_key is not None:
+        _sourcemap_view_cache.set(cache_key, (sourcemap_view, len(source) + len(body)))
+        metrics.gauge("sourcemaps.view_cache.bytes", _sourcemap_view_cache.weight, sample_rate=0.1)
+
+    return sourcemap_view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -1229,89 +1281,118 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         Look for and (if found) cache a source file and its associated source
         map (if any).
         """
+        if not self._reserve_fetch(filename):
+            return
 
-        sourcemaps = self.sourcemaps
-        cache = self.cache
+        try:
+            result = self._fetch_file(filename)
+        except http.BadSource as exc:
+            self._add_file_error(filename, exc)
+            return
+
+        sourcemap_url = self._add_file(filename, result)
+        if sourcemap_url is None:
+            return
 
+        try:
+            sourcemap_view = self._fetch_sourcemap(sourcemap_url, result.body)
+        except http.BadSource as exc:
+            # we don't perform the same check here as in `_add_file_error`, because
+            # if someone has uploaded a node_modules file, which has a
+            # sourceMappingURL, they presumably would like it mapped (and would
+            # like to know why it's not working, if that's the case). If they're
+            # not looking for it to be mapped, then they shouldn't be uploading
+            # the source file in the first place.
+            self.cache.add_error(filename, exc.data)
+            return
+
+        self._add_sourcemap(sourcemap_url, sourcemap_view)
+
+    def _reserve_fetch(self, filename):
+        """
+        Counts a fetch of the given file against `max_fetches`, recording an
+        error for the file if the limit has been reached.
+        """
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
-            return
+            self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            return False
+        return True
 
+    def _fetch_file(self, filename):
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug("Attempting to cache source %r", filename)
-        try:
-            # this both looks in the database and tries to scrape the internet
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
-            ) as span:
-                span.set_data("filename", filename)
-                result = fetch_file(
-                    filename,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
-        except http.BadSource as exc:
-            # most people don't upload release artifacts for their third-party libraries,
-            # so ignore missing node_modules files
-            if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
-                pass
-            else:
-                cache.add_error(filename, exc.data)
+        # this both looks in the database and tries to scrape the internet
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
+        ) as span:
+            span.set_data("filename", filename)
+            return fetch_file(
+                filename,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+            )
+
+    def _fetch_sourcemap(self, sourcemap_url, source):
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
+        ) as span:
+            span.set_data("sourcemap_url", sourcemap_url)
+            return fetch_sourcemap(
+                sourcemap_url,
+                source=source,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+            )
 
-            # either way, there's no more for us to do here, since we don't have
-            # a valid file to cache
+    def _add_file_error(self, filename, exc):
+        # most people don't upload release artifacts for their third-party libraries,
+        # so ignore missing node_modules files
+        if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
             return
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
+
+        self.cache.add_error(filename, exc.data)
+
+    def _add_file(self, filename, result):
+        """
+        Caches a fetched source file and links it to its sourcemap. Returns the
+        URL of the sourcemap if it still needs to be fetched.
+        """
+        self.cache.add(filename, result.body, result.encoding)
+        self.cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
         if not sourcemap_url:
-            return
+            return None
 
         logger.debug(
             "Found sourcemap URL %r for minified script %r", sourcemap_url[:256], result.url
         )
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
-            return
+        self.sourcemaps.link(filename, sourcemap_url)
+        if sourcemap_url in self.sourcemaps:
+            return None
 
-        # pull down sourcemap
-        try:
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
-            ) as span:
-                span.set_data("sourcemap_url", sourcemap_url)
-                sourcemap_view = fetch_sourcemap(
-                    sourcemap_url,
-                    source=result.body,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
-        except http.BadSource as exc:
-            # we don't perform the same check here as above, because if someone has
-            # uploaded a node_modules file, which has a sourceMappingURL, they
-            # presumably would like it mapped (and would like to know why it's not
-            # working, if that's the case). If they're not looking for it to be
-            # mapped, then they shouldn't be uploading the source file in the
-            # first place.
-            cache.add_error(filename, exc.data)
-            return
+        return sourcemap_url
 
+    def _add_sourcemap(self, sourcemap_url, sourcemap_view):
         with sentry_sdk.start_span(
             op="JavaScriptStacktraceProcessor.cache_source.cache_sourcemap_view"
-        ) as span:
-            sourcemaps.add(sourcemap_url, sourcemap_view)
+        ):
+            self.sourcemaps.add(sourcemap_url, sourcemap_view)
 
     def populate_source_cache(self, frames):
         """
         Fetch all sources that we know are required (being referenced directly
         in frames).
+
+        All minified files are fetched concurrently first, followed by all of
+        the sourcemaps they link to, on a pool of up to
+        `processing.javascript.fetch-concurrency` threads.
         """
         pending_file_list = set()
         for f in frames:
@@ -1329,12 +1410,45 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
-        for idx, filename in enumerate(pending_file_list):
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
-            ) as span:
-                span.set_data("filename", filename)
-                self.cache_source(filename=filename)
+        filenames = [filename for filename in pending_file_list if self._reserve_fetch(filename)]
+        if not filenames:
+            return
+
+        concurrency = options.get("processing.javascript.fetch-concurrency")
+        metric_tags = {"concurrent": concurrency > 1}
+
+        with metrics.timer("sourcemaps.populate_source_cache.fetch_files", tags=metric_tags):
+            file_results = _fetch_concurrently(self._fetch_file, filenames, concurrency)
+
+        # sourcemap url -> (minified source, filenames linking to the sourcemap)
+        pending_sourcemaps = {}
+        for filename, result in zip(filenames, file_results):
+            if isinstance(result, http.BadSource):
+                self._add_file_error(filename, result)
+                continue
+
+            sourcemap_url = self._add_file(filename, result)
+            if sourcemap_url is not None:
+                pending_sourcemaps.setdefault(sourcemap_url, (result.body, []))[1].append(filename)
+
+        sourcemap_urls = list(pending_sourcemaps)
+        with metrics.timer("sourcemaps.populate_source_cache.fetch_sourcemaps", tags=metric_tags):
+            sourcemap_results = _fetch_concurrently(
+                lambda url: self._fetch_sourcemap(url, pending_sourcemaps[url][0]),
+                sourcemap_urls,
+                concurrency,
+            )
+
+        for sourcemap_url, sourcemap_result in zip(sourcemap_urls, sourcemap_results):
+            if isinstance(sourcemap_result, http.BadSource):
+                for filename in pending_sourcemaps[sourcemap_url][1]:
+                    self.cache.add_error(filename, sourcemap_result.data)
+                continue
+
+            self._add_sourcemap(sourcemap_url, sourcemap_result)
+
+        metrics.timing("sourcemaps.populate_source_cache.files", len(filenames))
+        metrics.timing("sourcemaps.populate_source_cache.sourcemaps", len(sourcemap_urls))
 
     def close(self):
         StacktraceProcessor.close(self)
@@ -1376,3 +1490,52 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
 
             return has_short_stacktrace and is_suspicious_error and has_suspicious_frames(frames)
         return False
+
+
+def _get_fetch_thread_pool(concurrency: int) -> ThreadPoolExecutor:
+    """
+    Returns the process-wide pool used to fetch sources and sourcemaps. Its
+    threads live as long as the process and keep their database connections
+    across events. The pool is only replaced if the configured concurrency
+    changes.
+    """
+    global _fetch_thread_pool
+
+    with _fetch_thread_pool_lock:
+        if _fetch_thread_pool is None or _fetch_thread_pool[0] != concurrency:
+            if _fetch_thread_pool is not None:
+                _fetch_thread_pool[1].shutdown(wait=False)
+            _fetch_thread_pool = (
+                concurrency,
+                ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sourcemaps-fetch"),
+            )
+        return _fetch_thread_pool[1]
+
+
+def _fetch_concurrently(
+    fetch_fn: Callable[[T], R], items: Sequence[T], concurrency: int
+) -> List[Union[R, http.BadSource]]:
+    """
+    Calls `fetch_fn` for every item on the process-wide pool of `concurrency`
+    threads, returning results in the order of `items`. `BadSource` errors are
+    returned in place of the result, all other errors are raised.
+    """
+
+    def fetch(item: T) -> Union[R, http.BadSource]:
+        try:
+            return fetch_fn(item)
+        except http.BadSource as exc:
+            return exc
+
+    if concurrency <= 1 or len(items) <= 1:
+        return [fetch(item) for item in items]
+
+    hub = Hub.current
+
+    def fetch_in_thread(item: T) -> Union[R, http.BadSource]:
+        with Hub(hub):
+            return fetch(item)
+
+    executor = _get_fetch_thread_pool(concurrency)
+    futures = [executor.submit(fetch_in_thread, item) for item in items]
+    return [future.result() for future in futures]
@@ -0,0 +1,348 @@
+import bisect
+import logging
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Sequence, Tuple
+
+from sentry import options
+from sentry.utils import json, metrics, redis
+from sentry.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["SymbolicationCache", "get_symbolication_cache"]
+
+# Number of entries in the per-process tier of the symbolication cache
+SYMBOLICATION_CACHE_SIZE = 100_000
+SYMBOLICATION_CACHE_KEY_PREFIX = "symbolicator:cache:v1"
+
+# Statuses of symbolicated frames and images that are worth caching. Anything
+# else may change once debug files are uploaded and is always sent to
+# symbolicator.
+CACHEABLE_FRAME_STATUSES = frozenset(("symbolicated",))
+CACHEABLE_IMAGE_STATUSES = frozenset(("found", "unused"))
+IMAGE_STATUS_FIELDS = ("unwind_status", "debug_status")
+
+# Fields of a symbolicated image that depend on where it was loaded, or on
+# the lookup rather than the image, and are never cached.
+UNCACHED_IMAGE_FIELDS = frozenset(("image_addr", "image_vmaddr", "candidates"))
+# Absolute addresses in symbolicated frames, cached relative to their image
+FRAME_ADDRESS_FIELDS = ("instruction_addr", "sym_addr")
+# Attributes of `CachedSymbolication` that make up its state
+STATE_FIELDS = (
+    "positions",
+    "cached_frames",
+    "frame_keys",
+    "cached_images",
+    "request_stacktraces",
+)
+
+
+def parse_addr(value: Any) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value, 0)
+        except ValueError:
+            return None
+    return None
+
+
+class SymbolicationCache:
+    """
+    Caches symbolicated frames by debug image and image-relative instruction
+    address, and symbolicated images by debug id, per project.
+
+    Lookups go to an in-process LRU first and then, if the
+    ``symbolicator.cache.redis-cluster`` option names a cluster, to Redis,
+    which shares results between all workers.
+    """
+
+    def __init__(self, maxsize: int = SYMBOLICATION_CACHE_SIZE) -> None:
+        self.local: LRUCache[str, Any] = LRUCache(maxsize)
+
+    def _get_cluster(self) -> Optional[Any]:
+        cluster_id = options.get("symbolicator.cache.redis-cluster")
+        if not cluster_id:
+            return None
+        return redis.redis_clusters.get(cluster_id)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        rv = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                rv[key] = value
+
+        cluster = self._get_cluster() if missing else None
+        if cluster is not None:
+            try:
+                values = cluster.mget(missing)
+            except Exception:
+                logger.warning("symbolicator.cache.redis_error", exc_info=True)
+                values = [None] * len(missing)
+            for key, value in zip(missing, values):
+                if value is not None:
+                    rv[key] = json.loads(value)
+                    self.local.set(key, rv[key])
+
+        return rv
+
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        if not values:
+            return
+
+        for key, value in values.items():
+            self.local.set(key, value)
+
+        cluster = self._get_cluster()
+        if cluster is not None:
+            ttl = options.get("symbolicator.cache.ttl")
+            try:
+                with cluster.pipeline(transaction=False) as pipeline:
+                    for key, value in values.items():
+                        pipeline.set(key, json.dumps(value), ex=ttl)
+                    pipeline.execute()
+            except Exception:
+                logger.warning("symbolicator.cache.redis_error", exc_info=True)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+
+_symbolication_cache = SymbolicationCache()
+
+
+def get_symbolication_cache() -> SymbolicationCache:
+    return _symbolication_cache
+
+
+class _ImageLookup:
+    """Finds the debug image that contains an absolute address."""
+
+    def __init__(self, modules: Sequence[Mapping[str, Any]]) -> None:
+        images = []
+        for idx, module in enumerate(modules):
+            start = parse_addr(module.get("image_addr"))
+            size = parse_addr(module.get("image_size"))
+            if start is not None and size and module.get("debug_id"):
+                images.append((start, start + size, idx))
+        images.sort()
+        self._starts = [start for start, _, _ in images]
+        self._images = images
+
+    def find(self, addr: int) -> Optional[int]:
+        i = bisect.bisect_right(self._starts, addr) - 1
+        if i >= 0:
+            start, end, idx = self._images[i]
+            if start <= addr < end:
+                return idx
+        return None
+
+
+class CachedSymbolication:
+    """
+    Splits a symbolication request of one event into the frames and images
+    that are cached already and those that have to be sent to symbolicator,
+    and puts the response back together.
+
+    Only frames with absolute addresses inside a known image are cached, and
+    the crashing frame of every stacktrace is always sent, as symbolicator
+    adjusts its address depending on the signal and registers. All other
+    frames that are sent get an explicit ``adjust_instruction_addr``, so that
+    leaving out cached frames does not turn them into the crashing frame.
+
+    The split depends on the contents of the cache at the time, so a request
+    that is still pending in symbolicator has to be merged with the split it
+    was sent with. It is restored from `state` (see `get_state`) instead of
+    the cache in that case.
+    """
+
+    def __init__(
+        self,
+        project_id: int,
+        modules: List[MutableMapping[str, Any]],
+        stacktraces: List[Mapping[str, Any]],
+        cache: Optional[SymbolicationCache] = None,
+        state: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        self.project_id = project_id
+        self.modules = modules
+        self.stacktraces = stacktraces
+        self.cache = cache or get_symbolication_cache()
+
+        # Per stacktrace: index of every frame sent to symbolicator in the
+        # original stacktrace, cached results by original index, and cache
+        # keys of frames to store after symbolication.
+        self.positions: List[List[int]] = []
+        self.cached_frames: List[Dict[int, List[Any]]] = []
+        self.frame_keys: List[Dict[int, Tuple[str, int]]] = []
+        self.cached_images: List[Optional[Dict[str, Any]]] = []
+        self.request_stacktraces: List[Dict[str, Any]] = []
+
+        if state is not None:
+            for name in STATE_FIELDS:
+                setattr(self, name, state[name])
+        else:
+            self._prepare()
+
+    def get_state(self) -> Dict[str, Any]:
+        """The split of cached and requested frames and images."""
+        return {name: getattr(self, name) for name in STATE_FIELDS}
+
+    def _image_key(self, module: Mapping[str, Any]) -> str:
+        return f"{SYMBOLICATION_CACHE_KEY_PREFIX}:image:{self.project_id}:{module['debug_id']}"
+
+    def _frame_key(self, module: Mapping[str, Any], offset: int, adjust: bool) -> str:
+        return (
+            f"{SYMBOLICATION_CACHE_KEY_PREFIX}:frame:{self.project_id}:{module['debug_id']}:"
+            f"{offset:x}:{int(adjust)}"
+        )
+
+    def _prepare(self) -> None:
+        images = _ImageLookup(self.modules)
+        image_keys = [
+            self._image_key(module) if module.get("debug_id") else None for module in self.modules
+        ]
+
+        frame_keys: List[Dict[int, Tuple[str, int]]] = []
+        for stacktrace in self.stacktraces:
+            keys = {}
+            for pos, frame in enumerate(stacktrace["frames"]):
+                adjust = frame.get("adjust_instruction_addr")
+                if adjust is None:
+                    if pos == 0:
+                        continue
+                    adjust = True
+                if frame.get("addr_mode") is not None:
+                    continue
+                addr = parse_addr(frame.get("instruction_addr"))
+                idx = images.find(addr) if addr is not None else None
+                if idx is None:
+                    continue
+                base = parse_addr(self.modules[idx]["image_addr"])
+                keys[pos] = (self._frame_key(self.modules[idx], addr - base, adjust), base)
+            frame_keys.append(keys)
+
+        all_keys = [key for key in image_keys if key is not None]
+        all_keys.extend(key for keys in frame_keys for key, _ in keys.values())
+        cached = self.cache.get_many(all_keys)
+
+        self.cached_images = [cached.get(key) if key else None for key in image_keys]
+
+        frames_cached = frames_sent = 0
+        for stacktrace, keys in zip(self.stacktraces, frame_keys):
+            positions = []
+            cached_frames = {}
+            store_keys = {}
+            request_frames = []
+            for pos, frame in enumerate(stacktrace["frames"]):
+                key, base = keys.get(pos, (None, 0))
+                value = cached.get(key) if key is not None else None
+                if value is not None:
+                    cached_frames[pos] = [_restore_frame(f, base) for f in value]
+                    continue
+
+                if key is not None:
+                    store_keys[pos] = (key, base)
+                if pos > 0 and frame.get("adjust_instruction_addr") is None:
+                    frame = dict(frame, adjust_instruction_addr=True)
+                positions.append(pos)
+                request_frames.append(frame)
+
+            frames_cached += len(cached_frames)
+            frames_sent += len(request_frames)
+            self.positions.append(positions)
+            self.cached_frames.append(cached_frames)
+            self.frame_keys.append(store_keys)
+            self.request_stacktraces.append(dict(stacktrace, frames=request_frames))
+
+        metrics.incr("symbolicator.cache.frames", amount=frames_cached, tags={"cached": True})
+        metrics.incr("symbolicator.cache.frames", amount=frames_sent, tags={"cached": False})
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether all frames and images are cached and no request is needed."""
+        return all(image is not None for image in self.cached_images) and not any(
+            stacktrace["frames"] for stacktrace in self.request_stacktraces
+        )
+
+    def merge_response(self, response: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Combines the symbolicator response to ``request_stacktraces`` with the
+        cached results into a response for the original request, and caches
+        the new results. Without a response, all results must be cached.
+        """
+        if response is None:
+            assert self.is_complete
+            response = {
+                "status": "completed",
+                "stacktraces": [{"frames": []} for _ in self.request_stacktraces],
+                "modules": [{} for _ in self.modules],
+            }
+        elif response.get("status") != "completed":
+            return dict(response)
+
+        to_cache: Dict[str, Any] = {}
+
+        modules = []
+        for module, cached_image, complete_image in zip(
+            self.modules, self.cached_images, response["modules"]
+        ):
+            if cached_image is not None and not complete_image:
+                complete_image = dict(module, **cached_image)
+            elif cached_image is None and module.get("debug_id"):
+                statuses = {complete_image.get(field) for field in IMAGE_STATUS_FIELDS}
+                statuses.discard(None)
+                if statuses and statuses <= CACHEABLE_IMAGE_STATUSES:
+                    to_cache[self._image_key(module)] = {
+                        k: v for k, v in complete_image.items() if k not in UNCACHED_IMAGE_FIELDS
+                    }
+            modules.append(complete_image)
+
+        stacktraces = []
+        for i, complete_stacktrace in enumerate(response["stacktraces"]):
+            positions = self.positions[i]
+            frames_by_pos: Dict[int, List[Any]] = {}
+            for complete_frame in complete_stacktrace.get("frames") or ():
+                pos = positions[complete_frame["original_index"]]
+                frames_by_pos.setdefault(pos, []).append(dict(complete_frame, original_index=pos))
+
+            for pos, (key, base) in self.frame_keys[i].items():
+                complete_frames = frames_by_pos.get(pos)
+                if complete_frames and all(
+                    f.get("status") in CACHEABLE_FRAME_STATUSES for f in complete_frames
+                ):
+                    to_cache[key] = [_relativize_frame(f, base) for f in complete_frames]
+
+            for pos, cached_frames in self.cached_frames[i].items():
+                frames_by_pos[pos] = [dict(f, original_index=pos) for f in cached_frames]
+
+            stacktraces.append(
+                dict(
+                    complete_stacktrace,
+                    frames=[frame for pos in sorted(frames_by_pos) for frame in frames_by_pos[pos]],
+                )
+            )
+
+        self.cache.set_many(to_cache)
+        return dict(response, modules=modules, stacktraces=stacktraces)
+
+
+def _relativize_frame(frame: Mapping[str, Any], base: int) -> Dict[str, Any]:
+    rv = {k: v for k, v in frame.items() if k != "original_index"}
+    for field in FRAME_ADDRESS_FIELDS:
+        addr = parse_addr(rv.get(field))
+        if addr is not None:
+            rv[field] = addr - base
+    return rv
+
+
+def _restore_frame(frame: Mapping[str, Any], base: int) -> Dict[str, Any]:
+    rv = dict(frame)
+    for field in FRAME_ADDRESS_FIELDS:
+        if field in rv:
+            rv[field] = "0x%x" % (base + rv[field])
+    return rv
@@ -1,11 +1,16 @@
 import logging
 import posixpath
-from typing import Set
+import time
+from copy import deepcopy
+from typing import Any, List, NamedTuple, Optional, Set
 
+from django.conf import settings
 from symbolic import ParseDebugIdError, normalize_debug_id
 
+from sentry import options
+from sentry.lang.native.cache import CachedSymbolication
 from sentry.lang.native.error import SymbolicationFailed, write_error
-from sentry.lang.native.symbolicator import Symbolicator
+from sentry.lang.native.symbolicator import Symbolicator, get_pending_task_state
 from sentry.lang.native.utils import (
     get_event_attachment,
     get_sdk_from_event,
@@ -19,7 +24,10 @@ from sentry.lang.native.utils import (
 )
 from sentry.models import EventError, Project
 from sentry.stacktraces.functions import trim_function_name
-from sentry.stacktraces.processing import find_stacktraces_in_data
+from sentry.stacktraces.processing import StacktraceInfo, find_stacktraces_in_data
+from sentry.tasks.symbolication import RetrySymbolication
+from sentry.utils import json, metrics
+from sentry.utils.hashlib import md5_text
 from sentry.utils.in_app import is_known_third_party, is_optional_package
 from sentry.utils.safe import get_path, set_path, setdefault_path, trim
 
@@ -35,6 +43,20 @@ MINIDUMP_ATTACHMENT_TYPE = "event.minidump"
 APPLECRASHREPORT_ATTACHMENT_TYPE = "event.applecrashreport"
 
 
+class NativePayload(NamedTuple):
+    stacktrace_infos: List[StacktraceInfo]
+    modules: List[Any]
+    stacktraces: List[Any]
+    signal: Optional[int]
+    cached: Optional[CachedSymbolication] = None
+
+    @property
+    def request_stacktraces(self):
+        if self.cached is not None:
+            return self.cached.request_stacktraces
+        return self.stacktraces
+
+
 def _merge_frame(new_frame, symbolicated, platform="native"):
     # il2cpp events which have the "csharp" platform have good (C#) names
     # coming from the SDK, we do not want to override those with bad (mangled) C++ names.
@@ -264,7 +286,10 @@ def process_minidump(data):
 
     symbolicator = Symbolicator(project=project, event_id=data["event_id"])
 
-    response = symbolicator.process_minidump(minidump.data)
+    # The minidump is only read from the attachment cache when it is uploaded
+    # to symbolicator, and not at all while polling for a pending task.
+    with minidump.open() as minidump_file:
+        response = symbolicator.process_minidump(minidump_file)
 
     if _handle_response_status(data, response):
         _merge_full_response(data, response)
@@ -282,7 +307,8 @@ def process_applecrashreport(data):
 
     symbolicator = Symbolicator(project=project, event_id=data["event_id"])
 
-    response = symbolicator.process_applecrashreport(report.data)
+    with report.open() as report_file:
+        response = symbolicator.process_applecrashreport(report_file)
 
     if _handle_response_status(data, response):
         _merge_full_response(data, response)
@@ -345,11 +371,16 @@ def get_frames_for_symbolication(frames, data, modules):
     return rv
 
 
-def process_payload(data):
-    project = Project.objects.get_from_cache(id=data["project"])
-
-    symbolicator = Symbolicator(project=project, event_id=data["event_id"])
+def _get_native_payload(data, pending_task_state=None):
+    """
+    Collects the stacktraces, debug images and signal of a native event that
+    are sent to symbolicator, or returns `None` if there is nothing to
+    symbolicate.
 
+    If symbolicator is still processing a request for the event, the frames
+    that were taken from the cache for that request are restored from
+    `pending_task_state` rather than looked up again.
+    """
     stacktrace_infos = [
         stacktrace
         for stacktrace in find_stacktraces_in_data(data)
@@ -369,15 +400,49 @@ def process_payload(data):
     ]
 
     if not any(stacktrace["frames"] for stacktrace in stacktraces):
-        return
+        return None
+
+    cached = None
+    if pending_task_state is not None:
+        if pending_task_state.get("cached") is not None:
+            cached = CachedSymbolication(
+                data["project"], modules, stacktraces, state=pending_task_state["cached"]
+            )
+    elif options.get("symbolicator.cache.enabled"):
+        cached = CachedSymbolication(data["project"], modules, stacktraces)
 
-    signal = signal_from_data(data)
+    return NativePayload(stacktrace_infos, modules, stacktraces, signal_from_data(data), cached)
 
-    response = symbolicator.process_payload(stacktraces=stacktraces, modules=modules, signal=signal)
 
+def _symbolicate_payload(symbolicator, payload):
+    if payload.cached is not None and payload.cached.is_complete:
+        return payload.cached.merge_response(None)
+
+    response = symbolicator.process_payload(
+        stacktraces=payload.request_stacktraces,
+        modules=payload.modules,
+        signal=payload.signal,
+        task_state={"cached": payload.cached.get_state() if payload.cached is not None else None},
+    )
+    return _merge_cached_response(payload, response)
+
+
+def _merge_cached_response(payload, response):
+    if payload.cached is not None and response:
+        return payload.cached.merge_response(response)
+    return response
+
+
+def _merge_native_response(data, payload, response):
     if not _handle_response_status(data, response):
         return data
 
+    stacktrace_infos, modules, stacktraces = (
+        payload.stacktrace_infos,
+        payload.modules,
+        payload.stacktraces,
+    )
+
     assert len(modules) == len(response["modules"]), (modules, response)
 
     sdk_info = get_sdk_from_event(data)
@@ -424,6 +489,137 @@ def process_payload(data):
     return data
 
 
+def process_payload(data):
+    project = Project.objects.get_from_cache(id=data["project"])
+
+    symbolicator = Symbolicator(project=project, event_id=data["event_id"])
+
+    payload = _get_native_payload(data, get_pending_task_state(data["project"], data["event_id"]))
+    if payload is None:
+        return
+
+    response = _symbolicate_payload(symbolicator, payload)
+
+    return _merge_native_response(data, payload, response)
+
+
+class PayloadBatcher:
+    """
+    Symbolicates native events in batches.
+
+    Events of the same project with the same debug images and signal, as
+    produced by a crash storm of one release, are sent to symbolicator in a
+    single request and the response is split back per event.
+
+    Events are added with `add`. A batch is sent once it holds
+    `max_batch_size` events or once its oldest event has waited `max_wait`
+    seconds, whichever comes first. `add` and `flush_expired` return the
+    events symbolicated as a result, `flush` sends all pending batches.
+    Events without anything to symbolicate are returned right away.
+    """
+
+    def __init__(self, max_batch_size=None, max_wait=None, clock=time.monotonic):
+        self.max_batch_size = (
+            max_batch_size
+            if max_batch_size is not None
+            else options.get("symbolicator.batch-max-size")
+        )
+        self.max_wait = (
+            max_wait if max_wait is not None else options.get("symbolicator.batch-max-wait")
+        )
+        self.clock = clock
+        # batch key -> (time the first event was added, [(data, payload)])
+        self._pending = {}
+
+    def __len__(self):
+        return sum(len(events) for _, events in self._pending.values())
+
+    def add(self, data):
+        payload = _get_native_payload(data)
+        if payload is None:
+            return [data] + self.flush_expired()
+        if payload.cached is not None and payload.cached.is_complete:
+            data = _merge_native_response(data, payload, payload.cached.merge_response(None))
+            return [data] + self.flush_expired()
+
+        key = (
+            data["project"],
+            payload.signal,
+            json.dumps(payload.modules, sort_keys=True),
+        )
+        _, events = self._pending.setdefault(key, (self.clock(), []))
+        events.append((data, payload))
+
+        processed = []
+        if len(events) >= self.max_batch_size:
+            processed.extend(self._send(self._pending.pop(key)[1]))
+        processed.extend(self.flush_expired())
+        return processed
+
+    def flush_expired(self):
+        now = self.clock()
+        expired = [
+            key for key, (added, _) in self._pending.items() if now - added >= self.max_wait
+        ]
+        processed = []
+        for key in expired:
+            processed.extend(self._send(self._pending.pop(key)[1]))
+        return processed
+
+    def flush(self):
+        processed = []
+        while self._pending:
+            _, (_, events) = self._pending.popitem()
+            processed.extend(self._send(events))
+        return processed
+
+    def _send(self, events):
+        data, payload = events[0]
+        if len(events) == 1:
+            batch_id = data["event_id"]
+        else:
+            batch_id = md5_text(*sorted(d["event_id"] for d, _ in events)).hexdigest()
+
+        project = Project.objects.get_from_cache(id=data["project"])
+        symbolicator = Symbolicator(project=project, event_id=batch_id)
+        stacktraces = [stacktrace for _, p in events for stacktrace in p.request_stacktraces]
+
+        metrics.timing("events.symbolicator.batch_size", len(events))
+        response = None
+        deadline = self.clock() + settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT
+        while True:
+            try:
+                response = symbolicator.process_payload(
+                    stacktraces=stacktraces, modules=payload.modules, signal=payload.signal
+                )
+                break
+            except RetrySymbolication as e:
+                if self.clock() > deadline:
+                    metrics.incr("events.symbolicator.batch_timeout")
+                    break
+                retry_after = settings.SYMBOLICATOR_MAX_RETRY_AFTER
+                if e.retry_after is not None:
+                    retry_after = min(e.retry_after, retry_after)
+                time.sleep(retry_after)
+
+        processed = []
+        offset = 0
+        for i, (data, payload) in enumerate(events):
+            event_response = response
+            if response and response.get("status") == "completed":
+                count = len(payload.stacktraces)
+                event_response = dict(
+                    response,
+                    stacktraces=response["stacktraces"][offset : offset + count],
+                    # Merged images must not share state between events
+                    modules=response["modules"] if i == 0 else deepcopy(response["modules"]),
+                )
+                offset += count
+            event_response = _merge_cached_response(payload, event_response)
+            processed.append(_merge_native_response(data, payload, event_response))
+        return processed
+
+
 def get_symbolication_function(data):
     if is_minidump_event(data):
         return process_minidump
@@ -130,6 +130,20 @@ def _task_id_cache_key_for_event(project_id, event_id):
     return f"symbolicator:{event_id}:{project_id}"
 
 
+def _task_state_cache_key_for_event(project_id, event_id):
+    return f"{_task_id_cache_key_for_event(project_id, event_id)}:state"
+
+
+def get_pending_task_state(project_id, event_id):
+    """
+    Returns the state passed along with the request of a symbolication task
+    that is still pending for an event, or `None` if there is no such task.
+    """
+    if not default_cache.get(_task_id_cache_key_for_event(project_id, event_id)):
+        return None
+    return default_cache.get(_task_state_cache_key_for_event(project_id, event_id)) or {}
+
+
 class Symbolicator:
     def __init__(self, project, event_id):
         symbolicator_options = options.get("symbolicator.options")
@@ -154,8 +168,9 @@ class Symbolicator:
         )
 
         self.task_id_cache_key = _task_id_cache_key_for_event(project.id, event_id)
+        self.task_state_cache_key = _task_state_cache_key_for_event(project.id, event_id)
 
-    def _process(self, create_task, task_name):
+    def _process(self, create_task, task_name, task_state=None):
         task_id = default_cache.get(self.task_id_cache_key)
         json_response = None
 
@@ -194,11 +209,13 @@ class Symbolicator:
                 default_cache.set(
                     self.task_id_cache_key, json_response["request_id"], REQUEST_CACHE_TIMEOUT
                 )
+                default_cache.set(self.task_state_cache_key, task_state, REQUEST_CACHE_TIMEOUT)
                 raise RetrySymbolication(retry_after=json_response["retry_after"])
             else:
                 # Once we arrive here, we are done processing. Clean up the
                 # task id from the cache.
                 default_cache.delete(self.task_id_cache_key)
+                default_cache.delete(self.task_state_cache_key)
                 return json_response
 
     def process_minidump(self, minidump):
@@ -210,12 +227,13 @@ class Symbolicator:
             "process_applecrashreport",
         )
 
-    def process_payload(self, stacktraces, modules, signal=None):
+    def process_payload(self, stacktraces, modules, signal=None, task_state=None):
         return self._process(
             lambda: self.sess.symbolicate_stacktraces(
                 stacktraces=stacktraces, modules=modules, signal=signal
             ),
             "symbolicate_stacktraces",
+            task_state,
         )
 
 
@@ -619,6 +637,12 @@ class SymbolicatorSession:
                 time.sleep(wait)
                 wait *= 2.0
 
+                # Uploaded files are streamed, so they must be read again
+                # from the start for the next attempt.
+                for fileobj in (kwargs.get("files") or {}).values():
+                    if hasattr(fileobj, "seek"):
+                        fileobj.seek(0)
+
     def _create_task(self, path, **kwargs):
         params = {"timeout": self.timeout, "scope": self.project_id}
         with metrics.timer(
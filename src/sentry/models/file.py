@@ -1,12 +1,13 @@
+import bisect
 import io
 import mmap
 import os
 import tempfile
 import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from hashlib import sha1
-from threading import Semaphore
 from uuid import uuid4
 
 from django.conf import settings
@@ -38,7 +39,8 @@ UPLOAD_RETRY_TIME = getattr(settings, "SENTRY_UPLOAD_RETRY_TIME", 60)  # 1min
 
 DEFAULT_BLOB_SIZE = 1024 * 1024  # one mb
 CHUNK_STATE_HEADER = "__state"
-MULTI_BLOB_UPLOAD_CONCURRENCY = 8
+# number of blobs kept open by ChunkedFileBlobIndexWrapper while reading
+BLOB_CACHE_SIZE = 4
 MAX_FILE_SIZE = 2**31  # 2GB is the maximum offset supported by fileblob
 
 
@@ -67,6 +69,55 @@ def _get_size_and_checksum(fileobj, logger=nooplogger):
     return size, checksum.hexdigest()
 
 
+def _seek_start(fileobj):
+    try:
+        fileobj.seek(0)
+    except (AttributeError, io.UnsupportedOperation):
+        pass
+
+
+class _ChecksummingReader:
+    """Wraps a file and computes its size and checksum while it is read.
+
+    If the file is seeked anywhere but to the position read so far, the
+    checksum is no longer complete, unless it is rewound to the start.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._reset()
+
+    def _reset(self):
+        self._checksum = sha1()
+        self._valid = True
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self._fileobj.read(size)
+        self._checksum.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        position = self._fileobj.seek(offset, whence)
+        if position is None:
+            position = self._fileobj.tell()
+        if position == 0:
+            self._reset()
+        elif position != self.size:
+            self._valid = False
+        return position
+
+    def tell(self):
+        return self._fileobj.tell()
+
+    def is_complete(self):
+        return self._valid and not self._fileobj.read(1)
+
+    def hexdigest(self):
+        return self._checksum.hexdigest()
+
+
 @contextmanager
 def _locked_blob(checksum, logger=nooplogger):
     logger.debug("_locked_blob.start", extra={"checksum": checksum})
@@ -128,119 +179,124 @@ class FileBlob(Model):
         entries.  Files can be a list of files or tuples of file and checksum.
         If both are provided then a checksum check is performed.
 
+        Files are processed concurrently, with as many workers as configured
+        in the ``filestore.upload-concurrency`` option.  New blobs are hashed
+        while they are streamed to storage and are locked only while their
+        own chunk is uploaded and saved.  Files matching an existing blob are
+        still hashed, so that ownership of an existing blob is never granted
+        for a checksum that does not match the uploaded contents.  The owners
+        are inserted in bulk at the end.
+
         If the checksums mismatch an `IOError` is raised.
         """
+        from sentry import options
+
         logger.debug("FileBlob.from_files.start")
+        start_time = time.monotonic()
 
-        files_with_checksums = []
+        # This deduplicates duplicates uploaded in the same request.  Files
+        # without a reference checksum need to be hashed up front, as the
+        # checksum is needed to look up and lock the blob.
+        files_by_checksum = {}
+        verified = set()
         for fileobj in files:
             if isinstance(fileobj, tuple):
-                files_with_checksums.append(fileobj)
+                fileobj, checksum = fileobj
             else:
-                files_with_checksums.append((fileobj, None))
+                _seek_start(fileobj)
+                _, checksum = _get_size_and_checksum(fileobj)
+                verified.add(checksum)
+            files_by_checksum.setdefault(checksum, fileobj)
 
-        checksums_seen = set()
-        blobs_created = []
-        blobs_to_save = []
-        locks = set()
-        semaphore = Semaphore(value=MULTI_BLOB_UPLOAD_CONCURRENCY)
+        def _verify_chunk(fileobj, checksum):
+            if checksum in verified:
+                return
+            _seek_start(fileobj)
+            if _get_size_and_checksum(fileobj)[1] != checksum:
+                raise OSError("Checksum mismatch")
 
-        def _upload_and_pend_chunk(fileobj, size, checksum, lock):
-            logger.debug(
-                "FileBlob.from_files._upload_and_pend_chunk.start",
-                extra={"checksum": checksum, "size": size},
-            )
-            blob = cls(size=size, checksum=checksum)
+        def _upload_chunk(fileobj, checksum):
+            logger.debug("FileBlob.from_files._upload_chunk.start", extra={"checksum": checksum})
+            blob = cls(checksum=checksum)
             blob.path = cls.generate_unique_path()
             storage = get_storage()
-            storage.save(blob.path, fileobj)
-            blobs_to_save.append((blob, lock))
-            metrics.timing("filestore.blob-size", size, tags={"function": "from_files"})
+            _seek_start(fileobj)
+            reader = _ChecksummingReader(fileobj)
+            storage.save(blob.path, FileObj(reader))
+            try:
+                # The storage may have seeked around in the file, in which case
+                # the checksum computed while streaming is not usable.
+                if reader.is_complete():
+                    size, actual_checksum = reader.size, reader.hexdigest()
+                else:
+                    _seek_start(fileobj)
+                    size, actual_checksum = _get_size_and_checksum(fileobj)
+                if actual_checksum != checksum:
+                    raise OSError("Checksum mismatch")
+                blob.size = size
+                with atomic_transaction(using=router.db_for_write(cls)):
+                    blob.save()
+            except IntegrityError:
+                # The lock expired while uploading and somebody else created
+                # the blob in the meantime.
+                storage.delete(blob.path)
+                return cls.objects.get(checksum=checksum)
+            except Exception:
+                # The blob is not visible to anyone else yet, so it can be
+                # removed right away.
+                storage.delete(blob.path)
+                raise
+            metrics.timing("filestore.blob-size", blob.size, tags={"function": "from_files"})
             logger.debug(
-                "FileBlob.from_files._upload_and_pend_chunk.end",
+                "FileBlob.from_files._upload_chunk.end",
                 extra={"checksum": checksum, "path": blob.path},
             )
+            return blob
 
-        def _ensure_blob_owned(blob):
-            if organization is None:
-                return
-            try:
-                with atomic_transaction(using=router.db_for_write(FileBlobOwner)):
-                    FileBlobOwner.objects.create(organization_id=organization.id, blob=blob)
-            except IntegrityError:
-                pass
-
-        def _save_blob(blob):
-            logger.debug("FileBlob.from_files._save_blob.start", extra={"path": blob.path})
-            blob.save()
-            _ensure_blob_owned(blob)
-            logger.debug("FileBlob.from_files._save_blob.end", extra={"path": blob.path})
-
-        def _flush_blobs():
-            while True:
-                try:
-                    blob, lock = blobs_to_save.pop()
-                except IndexError:
-                    break
-
-                _save_blob(blob)
-                lock.__exit__(None, None, None)
-                locks.discard(lock)
-                semaphore.release()
+        def _ensure_chunk(fileobj, checksum, existing):
+            if existing is not None:
+                _verify_chunk(fileobj, checksum)
+                return existing
+            # Blobs are locked one at a time, so no deadlocks are possible and
+            # the lock is only held for as long as this chunk takes to upload.
+            with _locked_blob(checksum, logger=logger) as existing:
+                if existing is not None:
+                    _verify_chunk(fileobj, checksum)
+                    return existing
+                return _upload_chunk(fileobj, checksum)
 
         try:
-            with ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as exe:
-                for fileobj, reference_checksum in files_with_checksums:
-                    logger.debug(
-                        "FileBlob.from_files.executor_start", extra={"checksum": reference_checksum}
+            existing = {
+                blob.checksum: blob
+                for blob in cls.objects.filter(checksum__in=list(files_by_checksum))
+            }
+            concurrency = options.get("filestore.upload-concurrency")
+            with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as exe:
+                futures = [
+                    exe.submit(_ensure_chunk, fileobj, checksum, existing.get(checksum))
+                    for checksum, fileobj in files_by_checksum.items()
+                ]
+                blobs_created = [future.result() for future in futures]
+
+            if organization is not None and blobs_created:
+                with atomic_transaction(using=router.db_for_write(FileBlobOwner)):
+                    FileBlobOwner.objects.bulk_create(
+                        [
+                            FileBlobOwner(organization_id=organization.id, blob=blob)
+                            for blob in blobs_created
+                        ],
+                        ignore_conflicts=True,
                     )
-                    _flush_blobs()
-
-                    # Before we go and do something with the files we calculate
-                    # the checksums and compare it against the reference.  This
-                    # also deduplicates duplicates uploaded in the same request.
-                    # This is necessary because we acquire multiple locks in one
-                    # go which would let us deadlock otherwise.
-                    size, checksum = _get_size_and_checksum(fileobj)
-                    if reference_checksum is not None and checksum != reference_checksum:
-                        raise OSError("Checksum mismatch")
-                    if checksum in checksums_seen:
-                        continue
-                    checksums_seen.add(checksum)
-
-                    # Check if we need to lock the blob.  If we get a result back
-                    # here it means the blob already exists.
-                    lock = _locked_blob(checksum, logger=logger)
-                    existing = lock.__enter__()
-                    if existing is not None:
-                        lock.__exit__(None, None, None)
-                        blobs_created.append(existing)
-                        _ensure_blob_owned(existing)
-                        continue
-
-                    # Remember the lock to force unlock all at the end if we
-                    # encounter any difficulties.
-                    locks.add(lock)
-
-                    # Otherwise we leave the blob locked and submit the task.
-                    # We use the semaphore to ensure we never schedule too
-                    # many.  The upload will be done with a certain amount
-                    # of concurrency controlled by the semaphore and the
-                    # `_flush_blobs` call will take all those uploaded
-                    # blobs and associate them with the database.
-                    semaphore.acquire()
-                    exe.submit(_upload_and_pend_chunk(fileobj, size, checksum, lock))
-                    logger.debug("FileBlob.from_files.end", extra={"checksum": reference_checksum})
-
-            _flush_blobs()
         finally:
-            for lock in locks:
-                try:
-                    lock.__exit__(None, None, None)
-                except Exception:
-                    pass
             logger.debug("FileBlob.from_files.end")
 
+        duration = time.monotonic() - start_time
+        total_size = sum(blob.size for blob in blobs_created)
+        metrics.timing("filestore.from_files.blobs", len(blobs_created))
+        metrics.timing("filestore.from_files.size", total_size)
+        if duration > 0:
+            metrics.timing("filestore.from_files.throughput", total_size / duration)
+
     @classmethod
     def from_file(cls, fileobj, logger=nooplogger):
         """
@@ -494,11 +550,25 @@ class FileBlobIndex(Model):
 
 
 class ChunkedFileBlobIndexWrapper:
+    """
+    File-like object over the blobs of a file.
+
+    By default blobs are read on demand: a read binary-searches the blob
+    offsets and only opens the blobs that cover the requested range. The last
+    ``BLOB_CACHE_SIZE`` opened blobs are kept open, so seeking back and forth,
+    as ``zipfile`` does between the central directory and its entries, does
+    not fetch the same blobs again. With ``prefetch`` all blobs are
+    downloaded into a temporary file upfront instead.
+    """
+
     def __init__(self, indexes, mode=None, prefetch=False, prefetch_to=None, delete=True):
         # eager load from database incase its a queryset
         self._indexes = list(indexes)
+        self._offsets = [idx.offset for idx in self._indexes]
+        self._size = sum(i.blob.size for i in self._indexes)
+        self._blob_files = OrderedDict()
         self._curfile = None
-        self._curidx = None
+        self._pos = 0
         if prefetch:
             self.prefetched = True
             self._prefetch(prefetch_to, delete)
@@ -522,28 +592,31 @@ class ChunkedFileBlobIndexWrapper:
         rv.seek(0)
         return rv
 
-    def _nextidx(self):
+    def _get_blob_file(self, i):
         assert not self.prefetched, "this makes no sense"
-        old_file = self._curfile
-        try:
-            try:
-                self._curidx = next(self._idxiter)
-                self._curfile = self._curidx.blob.getfile()
-            except StopIteration:
-                self._curidx = None
-                self._curfile = None
-        finally:
-            if old_file is not None:
-                old_file.close()
+        f = self._blob_files.pop(i, None)
+        if f is None:
+            f = self._indexes[i].blob.getfile()
+            if len(self._blob_files) >= BLOB_CACHE_SIZE:
+                _, evicted = self._blob_files.popitem(last=False)
+                evicted.close()
+        self._blob_files[i] = f
+        return f
 
     @property
     def size(self):
-        return sum(i.blob.size for i in self._indexes)
+        return self._size
 
     def open(self):
         self.closed = False
         self.seek(0)
 
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
     def _prefetch(self, prefetch_to=None, delete=True):
         size = self.size
         f = tempfile.NamedTemporaryFile(prefix="._prefetch-", dir=prefetch_to, delete=delete)
@@ -578,7 +651,9 @@ class ChunkedFileBlobIndexWrapper:
         if self._curfile:
             self._curfile.close()
         self._curfile = None
-        self._curidx = None
+        while self._blob_files:
+            _, f = self._blob_files.popitem()
+            f.close()
         self.closed = True
 
     def _seek(self, pos):
@@ -590,19 +665,8 @@ class ChunkedFileBlobIndexWrapper:
 
         if pos < 0:
             raise OSError("Invalid argument")
-        if pos == 0 and not self._indexes:
-            # Empty file, there's no seeking to be done.
-            return
-
-        for n, idx in enumerate(self._indexes[::-1]):
-            if idx.offset <= pos:
-                if idx != self._curidx:
-                    self._idxiter = iter(self._indexes[-(n + 1) :])
-                    self._nextidx()
-                break
-        else:
-            raise ValueError("Cannot seek to pos")
-        self._curfile.seek(pos - self._curidx.offset)
+        self._pos = pos
+        return pos
 
     def seek(self, pos, whence=io.SEEK_SET):
         if whence == io.SEEK_SET:
@@ -619,9 +683,38 @@ class ChunkedFileBlobIndexWrapper:
             raise ValueError("I/O operation on closed file")
         if self.prefetched:
             return self._curfile.tell()
-        if self._curfile is None:
-            return self.size
-        return self._curidx.offset + self._curfile.tell()
+        return self._pos
+
+    def readinto(self, b):
+        """
+        Read up to ``len(b)`` bytes into the writable buffer ``b`` and return
+        the number of bytes read.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        if self.prefetched:
+            return self._curfile.readinto(b)
+
+        view = memoryview(b).cast("B")
+        total = 0
+        while total < len(view) and self._pos < self._size:
+            i = bisect.bisect_right(self._offsets, self._pos) - 1
+            idx = self._indexes[i]
+            blob_end = idx.offset + idx.blob.size
+
+            f = self._get_blob_file(i)
+            f.seek(self._pos - idx.offset)
+            count = _readinto(f, view[total : total + min(len(view) - total, blob_end - self._pos)])
+            if not count:
+                # The blob is shorter than recorded, continue with the next one
+                self._pos = blob_end
+                continue
+
+            total += count
+            self._pos += count
+
+        return total
 
     def read(self, n=-1):
         if self.closed:
@@ -630,28 +723,25 @@ class ChunkedFileBlobIndexWrapper:
         if self.prefetched:
             return self._curfile.read(n)
 
-        result = bytearray()
+        remaining = max(self._size - self._pos, 0)
+        if n is None or n < 0 or n > remaining:
+            n = remaining
 
-        # Read to the end of the file
-        if n < 0:
-            while self._curfile is not None:
-                blob_result = self._curfile.read(32768)
-                if not blob_result:
-                    self._nextidx()
-                else:
-                    result.extend(blob_result)
+        buf = bytearray(n)
+        count = self.readinto(buf)
+        if count < n:
+            del buf[count:]
+        return bytes(buf)
 
-        # Read until a certain number of bytes are read
-        else:
-            while n > 0 and self._curfile is not None:
-                blob_result = self._curfile.read(min(n, 32768))
-                if not blob_result:
-                    self._nextidx()
-                else:
-                    n -= len(blob_result)
-                    result.extend(blob_result)
 
-        return bytes(result)
+def _readinto(f, view):
+    """Fills ``view`` from ``f``, copying from ``read`` if ``f`` has no ``readinto``."""
+    try:
+        return f.readinto(view)
+    except (AttributeError, io.UnsupportedOperation):
+        data = f.read(len(view))
+        view[: len(data)] = data
+        return len(data)
 
 
 @region_silo_only_model
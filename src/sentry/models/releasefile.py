@@ -1,4 +1,3 @@
-import errno
 import logging
 import os
 import zipfile
@@ -22,12 +21,12 @@ from sentry.db.models import (
     region_silo_only_model,
     sane_repr,
 )
-from sentry.models import clear_cached_files
 from sentry.models.distribution import Distribution
-from sentry.models.file import File
+from sentry.models.file import ONE_DAY_AND_A_HALF, File
 from sentry.models.release import Release
 from sentry.utils import json, metrics
 from sentry.utils.db import atomic_transaction
+from sentry.utils.disk_cache import DiskCache
 from sentry.utils.hashlib import sha1_text
 from sentry.utils.zip import safe_extract_zip
 
@@ -145,10 +144,26 @@ class ReleaseFile(Model):
 
 
 class ReleaseFileCache:
+    """
+    Caches large release files, including release archives and artifact
+    indexes, on the local disk of the worker.
+
+    The cache is bounded by ``releasefile.cache-max-size`` and evicts the
+    least recently read files first.
+    """
+
     @property
     def cache_path(self):
         return options.get("releasefile.cache-path")
 
+    @property
+    def disk_cache(self) -> DiskCache:
+        return DiskCache(
+            self.cache_path,
+            options.get("releasefile.cache-max-size"),
+            metrics_prefix="release_file.cache.disk",
+        )
+
     def getfile(self, releasefile):
         cutoff = options.get("releasefile.cache-limit")
         file_size = releasefile.file.size
@@ -158,22 +173,16 @@ class ReleaseFileCache:
 
         file_id = str(releasefile.file.id)
         organization_id = str(releasefile.organization_id)
-        file_path = os.path.join(self.cache_path, organization_id, file_id)
 
-        hit = True
-        try:
-            os.stat(file_path)
-        except OSError as e:
-            if e.errno != errno.ENOENT:
-                raise
-            releasefile.file.save_to(file_path)
-            hit = False
+        fileobj, hit = self.disk_cache.open(
+            os.path.join(organization_id, file_id), releasefile.file.save_to
+        )
 
         metrics.timing("release_file.cache.get.size", file_size, tags={"hit": hit, "cutoff": False})
-        return FileObj(open(file_path, "rb"))
+        return FileObj(fileobj)
 
     def clear_old_entries(self):
-        clear_cached_files(self.cache_path)
+        self.disk_cache.clear_old_entries(max_age=ONE_DAY_AND_A_HALF)
 
 
 ReleaseFile.cache = ReleaseFileCache()
@@ -34,6 +34,13 @@ class FileSystemNodeStorage(NodeStorage):
     def delete(self, id):
         os.remove(self.node_path(id))
 
+    def delete_multi(self, id_list):
+        for id in id_list:
+            try:
+                self.delete(id)
+            except FileNotFoundError:
+                pass
+
     def cleanup(self, cutoff: datetime.datetime):
         for filename in os.listdir(self.path):
             path = os.path.join(self.path, filename)
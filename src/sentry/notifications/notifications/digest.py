@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, Any, Mapping, MutableMapping, Sequence
 from sentry.db.models import Model
 from sentry.digests import Digest
 from sentry.digests.utils import (
+    PersonalizedDigestContexts,
     get_digest_as_context,
     get_participants_by_event,
     get_personalized_digests,
@@ -125,13 +126,9 @@ class DigestNotification(ProjectNotification):
             Event, Mapping[ExternalProviders, set[Team | User]]
         ],
     ) -> Mapping[int, Mapping[str, Any]]:
-        personalized_digests = get_personalized_digests(
-            self.digest, participants_by_provider_by_event
+        return PersonalizedDigestContexts(
+            get_personalized_digests(self.digest, participants_by_provider_by_event)
         )
-        return {
-            actor_id: get_digest_as_context(digest)
-            for actor_id, digest in personalized_digests.items()
-        }
 
     def send(self) -> None:
         # Only calculate shared context once.
@@ -48,6 +48,7 @@ default_store: AbstractOptionsStore = silo_mode_delegation(
 default_store.connect_signals()
 
 default_manager = OptionsManager(store=default_store)
+default_manager.connect_signals()
 
 # expose public API
 get = default_manager.get
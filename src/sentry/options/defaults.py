@@ -64,6 +64,13 @@ register(
     flags=FLAG_PRIORITIZE_DISK,
 )
 register("releasefile.cache-limit", type=Int, default=10 * 1024 * 1024, flags=FLAG_PRIORITIZE_DISK)
+# Total size of release files cached on disk, least recently used files are evicted first
+register(
+    "releasefile.cache-max-size",
+    type=Int,
+    default=10 * 1024 * 1024 * 1024,
+    flags=FLAG_PRIORITIZE_DISK,
+)
 register(
     "releasefile.cache-max-archive-size",
     type=Int,
@@ -145,6 +152,8 @@ register("beacon.anonymous", type=Bool, flags=FLAG_REQUIRED)
 # Filestore
 register("filestore.backend", default="filesystem", flags=FLAG_NOSTORE)
 register("filestore.options", default={"location": "/tmp/sentry-files"}, flags=FLAG_NOSTORE)
+# Number of blobs uploaded concurrently by `FileBlob.from_files`
+register("filestore.upload-concurrency", default=8, flags=FLAG_PRIORITIZE_DISK)
 
 # Symbol server
 register("symbolserver.enabled", default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
@@ -167,6 +176,19 @@ register(
 # it break everywhere.
 register("symbolicator.ignored_sources", type=Sequence, default=(), flags=FLAG_ALLOW_EMPTY)
 
+# Maximum number of reprocessed native events symbolicated in one request by `PayloadBatcher`, and
+# the number of seconds an event waits for other events to join its batch.
+register("symbolicator.batch-max-size", default=50, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
+register("symbolicator.batch-max-wait", default=0.5, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
+
+# Cache of symbolicated native frames and images shared between events. The in-process tier is
+# always used when enabled, the Redis tier only if a cluster is configured.
+register("symbolicator.cache.enabled", default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
+register(
+    "symbolicator.cache.redis-cluster", default="", flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
+register("symbolicator.cache.ttl", default=3600, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
+
 # Backend chart rendering via chartcuterie
 register("chart-rendering.enabled", default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
 register(
@@ -600,3 +622,26 @@ register("derive-code-mappings.dry-run.early-adopter-rollout", default=0.0)
 register("derive-code-mappings.dry-run.general-availability-rollout", default=0.0)
 # Allows adjusting the GA percentage
 register("derive-code-mappings.general-availability-rollout", default=0.0)
+
+# Number of minified sources and sourcemaps fetched concurrently while
+# processing a single JavaScript event. 1 fetches them sequentially.
+register("processing.javascript.fetch-concurrency", default=8)
+
+# Maximum number of rows per second deleted by a single bulk deletion task. 0 disables throttling.
+register(
+    "deletions.bulk.rows-per-second", default=0, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
+# Threads used to delete the event data of a group. Above 1, the next page of events is fetched
+# while the current one is deleted.
+register(
+    "deletions.event-data.concurrency", default=1, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
+# Maximum number of events per second whose data is deleted by a single task. 0 disables it.
+register(
+    "deletions.event-data.rate-limit", default=0, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
+
+# Fetch the next batch of rows of discover exports from Snuba while the current one is written
+register(
+    "data-export.prefetch-rows", default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
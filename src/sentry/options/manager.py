@@ -1,5 +1,6 @@
 import logging
 import sys
+from time import time
 
 from django.conf import settings
 
@@ -67,6 +68,7 @@ class OptionsManager:
     def __init__(self, store):
         self.store = store
         self.registry = {}
+        self._last_refresh = 0
 
     def set(self, key, value, coerce=True):
         """
@@ -198,6 +200,35 @@ class OptionsManager:
 
         return self.store.delete(opt)
 
+    def refresh_local_cache(self):
+        """
+        Load all registered options that can be stored into the local cache
+        of the store in bulk.
+        """
+        self.store.refresh_local_cache(
+            [opt for opt in self.registry.values() if not (opt.flags & FLAG_NOSTORE)]
+        )
+
+    def maybe_refresh_local_cache(self, **kwargs):
+        # Refreshing more often than options expire from the local cache means
+        # that reads are served from memory instead of one cache get per key.
+        interval = getattr(settings, "SENTRY_OPTIONS_REFRESH_INTERVAL", None)
+        if not interval:
+            return
+
+        now = time()
+        if now - self._last_refresh < interval:
+            return
+        self._last_refresh = now
+        self.refresh_local_cache()
+
+    def connect_signals(self):
+        from celery.signals import task_postrun
+        from django.core.signals import request_finished
+
+        task_postrun.connect(self.maybe_refresh_local_cache)
+        request_finished.connect(self.maybe_refresh_local_cache)
+
     def register(
         self,
         key,
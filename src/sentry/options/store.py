@@ -5,7 +5,8 @@ import dataclasses
 import logging
 from random import random
 from time import time
-from typing import Any
+from typing import Any, Iterable
+from uuid import uuid4
 
 from django.db.utils import OperationalError, ProgrammingError
 from django.utils import timezone
@@ -16,6 +17,16 @@ from sentry.services.hybrid_cloud import InterfaceWithLifecycle
 CACHE_FETCH_ERR = "Unable to fetch option cache for %s"
 CACHE_UPDATE_ERR = "Unable to update option cache for %s"
 
+# Changes whenever an option is set or deleted, so that bulk refreshes can
+# tell whether anything changed since the last one.
+VERSION_CACHE_KEY = "o:version"
+# Bulk refreshes load all options again at least this often, even if the
+# version didn't change, in case a change didn't update the version.
+FULL_REFRESH_INTERVAL = 60
+# Marks options in the local cache that are neither in the network cache nor
+# in the database, so that reading them doesn't need a network round trip.
+UNSET = object()
+
 logger = logging.getLogger("sentry")
 
 
@@ -56,6 +67,14 @@ class AbstractOptionsStore(InterfaceWithLifecycle, abc.ABC):
     def set_cache_impl(self, cache: Any) -> None:
         pass
 
+    @abc.abstractmethod
+    def refresh_local_cache(self, keys: Iterable[Key]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def get_version(self) -> str | None:
+        pass
+
     @abc.abstractmethod
     def connect_signals(self):
         pass
@@ -77,6 +96,8 @@ class OptionsStore(AbstractOptionsStore):
         self.cache = cache
         self.ttl = ttl
         self.flush_local_cache()
+        self._version = None
+        self._last_full_refresh = None
 
     @cached_property
     def model(self):
@@ -109,7 +130,7 @@ class OptionsStore(AbstractOptionsStore):
         if value is not None:
             return value
 
-        if self.cache is None:
+        if self.cache is None or self.is_unset(key):
             return None
 
         cache_key = key.cache_key
@@ -144,11 +165,11 @@ class OptionsStore(AbstractOptionsStore):
 
         # Key is within normal expiry window, so just return it
         if now < expires:
-            return value
+            return None if value is UNSET else value
 
         # If we're able to accept within grace window, return it
         if force_grace and now < grace:
-            return value
+            return None if value is UNSET else value
 
         # Let's clean up values if we're beyond grace.
         if now > grace:
@@ -170,6 +191,18 @@ class OptionsStore(AbstractOptionsStore):
         # in grace, too bad. The value is considered bad.
         return None
 
+    def is_unset(self, key):
+        """
+        Check whether the last bulk refresh found the key neither in the
+        network cache nor in the database, and the key is still within its
+        expiry window.
+        """
+        try:
+            value, expires, _ = self._local_cache[key.cache_key]
+        except KeyError:
+            return False
+        return value is UNSET and int(time()) < expires
+
     def get_store(self, key, silent=False):
         """
         Attempt to fetch value from the database. If successful,
@@ -182,6 +215,9 @@ class OptionsStore(AbstractOptionsStore):
         between a miss vs error, but not worth it now since the value
         is limited at the moment.
         """
+        if self.is_unset(key):
+            return None
+
         try:
             value = self.model.objects.get(key=key.name).value
         except (self.model.DoesNotExist, ProgrammingError, OperationalError):
@@ -214,7 +250,9 @@ class OptionsStore(AbstractOptionsStore):
         assert self.cache is not None, "cache must be configured before mutating options"
 
         self.set_store(key, value)
-        return self.set_cache(key, value)
+        rv = self.set_cache(key, value)
+        self.bump_version()
+        return rv
 
     def set_store(self, key, value):
         from sentry.db.models.query import create_or_update
@@ -249,7 +287,9 @@ class OptionsStore(AbstractOptionsStore):
         assert self.cache is not None, "cache must be configured before mutating options"
 
         self.delete_store(key)
-        return self.delete_cache(key)
+        rv = self.delete_cache(key)
+        self.bump_version()
+        return rv
 
     def delete_store(self, key):
         self.model.objects.filter(key=key.name).delete()
@@ -268,6 +308,91 @@ class OptionsStore(AbstractOptionsStore):
             logger.warning(CACHE_UPDATE_ERR, key.name, extra={"key": key.name}, exc_info=True)
             return False
 
+    def bump_version(self):
+        try:
+            self.cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+        except Exception:
+            logger.warning(CACHE_UPDATE_ERR, VERSION_CACHE_KEY, exc_info=True)
+
+    def refresh_local_cache(self, keys):
+        """
+        Load the given keys into the local cache in bulk, so that reads
+        within their TTL don't need a network round trip.
+
+        If the options version in the network cache didn't change since the
+        last full refresh, the cached values are only marked as fresh again.
+        Otherwise, all keys are read from the network cache at once, and the
+        ones missing there from the database in a single query.  Keys that
+        are in neither are remembered as unset until the next refresh.
+        """
+        from sentry.utils import metrics
+
+        if self.cache is None:
+            return
+
+        keys = [key for key in keys if key.ttl > 0]
+        now = time()
+
+        try:
+            version = self.cache.get(VERSION_CACHE_KEY)
+            if version is None:
+                # The version was never set or got evicted. Start a new one,
+                # which can't match the last known version.
+                version = uuid4().hex
+                if not self.cache.add(VERSION_CACHE_KEY, version, None):
+                    version = self.cache.get(VERSION_CACHE_KEY)
+        except Exception:
+            logger.warning(CACHE_FETCH_ERR, VERSION_CACHE_KEY, exc_info=True)
+            return
+
+        if (
+            version is not None
+            and version == self._version
+            and now - self._last_full_refresh < FULL_REFRESH_INTERVAL
+        ):
+            for key in keys:
+                entry = self._local_cache.get(key.cache_key)
+                if entry is not None:
+                    self._local_cache[key.cache_key] = _make_cache_value(key, entry[0])
+            metrics.incr("options.refresh", tags={"full": False}, sample_rate=1.0)
+            return
+
+        try:
+            values = self.cache.get_many([key.cache_key for key in keys])
+            missing = {key.name: key for key in keys if values.get(key.cache_key) is None}
+            if missing:
+                loaded = {
+                    missing[option.key].cache_key: option.value
+                    for option in self.model.objects.filter(key__in=list(missing))
+                }
+                if loaded:
+                    self.cache.set_many(loaded, self.ttl)
+                values.update(loaded)
+        except Exception:
+            logger.warning("option.failed-refresh", exc_info=True)
+            return
+
+        for key in keys:
+            value = values.get(key.cache_key)
+            if value is None:
+                value = UNSET
+            self._local_cache[key.cache_key] = _make_cache_value(key, value)
+
+        if self._last_full_refresh is not None:
+            metrics.timing("options.refresh.staleness", now - self._last_full_refresh)
+        metrics.timing("options.refresh.duration", time() - now)
+        metrics.incr("options.refresh", tags={"full": True}, sample_rate=1.0)
+        self._version = version
+        self._last_full_refresh = now
+
+    def get_version(self):
+        """
+        The options version seen by the last full bulk refresh of the local
+        cache, or ``None`` if there was none yet. It changes after options
+        were set or deleted in any process, once this process refreshed.
+        """
+        return self._version
+
     def clean_local_cache(self):
         """
         Iterate over our local cache items, and
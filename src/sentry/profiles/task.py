@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import os
+from array import array
 from datetime import datetime
+from itertools import chain
 from time import sleep, time
-from typing import Any, List, Mapping, MutableMapping, Optional, Tuple
+from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 import sentry_sdk
 from arroyo.backends.kafka.consumer import KafkaPayload, KafkaProducer
@@ -22,6 +25,7 @@ from sentry.signals import first_profile_received
 from sentry.tasks.base import instrumented_task
 from sentry.tasks.symbolication import RetrySymbolication
 from sentry.utils import json, kafka_config, metrics
+from sentry.utils.lru import LRUCache
 from sentry.utils.outcomes import Outcome, track_outcome
 
 Profile = MutableMapping[str, Any]
@@ -29,6 +33,15 @@ CallTrees = Mapping[str, List[Any]]
 
 _profiles_kafka_producer = None
 
+# Bounds for the per-worker cache of opened proguard mappers. The weight of a
+# mapper is the size of its mapping file.
+PROGUARD_MAPPER_CACHE_SIZE = 32
+PROGUARD_MAPPER_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Number of remapped frames and classes memoized per mapper
+PROGUARD_REMAP_CACHE_SIZE = 100_000
+
+__unset__ = object()
+
 
 class VroomTimeout(Exception):
     pass
@@ -305,16 +318,17 @@ def _process_symbolicator_results(
 
 
 def _process_symbolicator_results_for_sample(profile: Profile, stacktraces: List[Any]) -> None:
-    profile["profile"]["frames"] = stacktraces[0]["frames"]
+    frames = stacktraces[0]["frames"]
+    profile["profile"]["frames"] = frames
     if profile["platform"] in SHOULD_SYMBOLICATE:
-        for frame in profile["profile"]["frames"]:
+        for frame in frames:
             frame.pop("pre_context", None)
             frame.pop("context_line", None)
             frame.pop("post_context", None)
 
     if profile["platform"] == "rust":
 
-        def truncate_stack_needed(frames: List[dict[str, Any]], stack: List[Any]) -> List[Any]:
+        def truncate_stack_needed(stack: Tuple[int, ...]) -> Tuple[int, ...]:
             # remove top frames related to the profiler (top of the stack)
             if frames[stack[0]].get("function", "") == "perf_signal_handler":
                 stack = stack[2:]
@@ -324,54 +338,79 @@ def _process_symbolicator_results_for_sample(profile: Profile, stacktraces: List
             return stack
 
     elif profile["platform"] == "cocoa":
+        # the last frame is the same for every stack
+        truncate_bottom = bool(frames) and frames[-1].get("instruction_addr", "") == "0xffffffffc"
 
-        def truncate_stack_needed(
-            frames: List[dict[str, Any]],
-            stack: List[Any],
-        ) -> List[Any]:
+        def truncate_stack_needed(stack: Tuple[int, ...]) -> Tuple[int, ...]:
             # remove bottom frames we can't symbolicate
-            if frames[-1].get("instruction_addr", "") == "0xffffffffc":
+            if truncate_bottom:
                 return stack[:-2]
             return stack
 
     else:
 
-        def truncate_stack_needed(
-            frames: List[dict[str, Any]],
-            stack: List[Any],
-        ) -> List[Any]:
+        def truncate_stack_needed(stack: Tuple[int, ...]) -> Tuple[int, ...]:
             return stack
 
+    remap_stack: Callable[[Sequence[int]], Tuple[int, ...]] = tuple
     if profile["platform"] in SHOULD_SYMBOLICATE:
-        idx_map = get_frame_index_map(profile["profile"]["frames"])
-
-        def get_stack(stack: List[int]) -> List[int]:
-            new_stack: List[int] = []
-            for index in stack:
-                # the new stack extends the older by replacing
-                # a specific frame index with the indices of
-                # the frames originated from the original frame
-                # should inlines be present
-                new_stack.extend(idx_map[index])
-            return new_stack
+        remap_stack = _get_stack_remapper(frames)
+
+    # Every distinct stack is remapped and truncated exactly once, then
+    # identical stacks are merged and the samples pointing to them updated.
+    stacks = profile["profile"]["stacks"]
+    stack_ids: dict[Tuple[int, ...], int] = {}
+    new_stacks: List[List[int]] = []
+    stack_id_map = array("l", [0]) * len(stacks)
+    for old_stack_id, stack in enumerate(stacks):
+        new_stack = remap_stack(stack)
+        if len(new_stack) >= 2:
+            # truncate some unneeded frames in the stack (related to the profiler itself or impossible to symbolicate)
+            new_stack = truncate_stack_needed(new_stack)
+
+        new_stack_id = stack_ids.get(new_stack)
+        if new_stack_id is None:
+            new_stack_id = stack_ids[new_stack] = len(new_stacks)
+            new_stacks.append(list(new_stack))
+        stack_id_map[old_stack_id] = new_stack_id
+
+    profile["profile"]["stacks"] = new_stacks
+    for sample in profile["profile"]["samples"]:
+        sample["stack_id"] = stack_id_map[sample["stack_id"]]
 
-    else:
 
-        def get_stack(stack: List[int]) -> List[int]:
-            return stack
+def _get_stack_remapper(
+    frames: List[dict[str, Any]]
+) -> Callable[[Sequence[int]], Tuple[int, ...]]:
+    """
+    Returns a function replacing the original frame indexes of a stack with
+    the indexes of the symbolicated frames, see `get_frame_index_map`.
+    """
+    original_indexes = array("l", (frame["original_index"] for frame in frames))
+    if not original_indexes:
+        return tuple
 
-    for sample in profile["profile"]["samples"]:
-        stack_id = sample["stack_id"]
-        stack = get_stack(profile["profile"]["stacks"][stack_id])
-        profile["profile"]["stacks"][stack_id] = stack
+    if len(original_indexes) == len(set(original_indexes)):
+        # No inlined frames, every original frame maps to exactly one frame.
+        index_map = array("l", [0]) * (max(original_indexes) + 1)
+        for i, original_idx in enumerate(original_indexes):
+            index_map[original_idx] = i
 
-        if len(stack) < 2:
-            continue
+        def remap_stack(stack: Sequence[int]) -> Tuple[int, ...]:
+            return tuple(map(index_map.__getitem__, stack))
 
-        # truncate some unneeded frames in the stack (related to the profiler itself or impossible to symbolicate)
-        profile["profile"]["stacks"][stack_id] = truncate_stack_needed(
-            profile["profile"]["frames"], stack
-        )
+    else:
+        frame_index_map = get_frame_index_map(frames)
+        expanded = [tuple(frame_index_map.get(i, ())) for i in range(max(frame_index_map) + 1)]
+
+        def remap_stack(stack: Sequence[int]) -> Tuple[int, ...]:
+            # the new stack extends the older by replacing
+            # a specific frame index with the indices of
+            # the frames originated from the original frame
+            # should inlines be present
+            return tuple(chain.from_iterable(map(expanded.__getitem__, stack)))
+
+    return remap_stack
 
 
 def _process_symbolicator_results_for_cocoa(profile: Profile, stacktraces: List[Any]) -> None:
@@ -443,19 +482,87 @@ def get_frame_index_map(frames: List[dict[str, Any]]) -> dict[int, List[int]]:
     return index_map
 
 
-@metrics.wraps("process_profile.deobfuscate")
-def _deobfuscate(profile: Profile, project: Project) -> None:
-    debug_file_id = profile.get("build_id")
-    if debug_file_id is None or debug_file_id == "":
-        return
+class CachedProguardMapper:
+    """
+    A ``ProguardMapper`` that memoizes the results of ``remap_frame`` and
+    ``remap_class``, as the same methods show up in every profile of a build.
+    """
+
+    def __init__(self, mapper: ProguardMapper, size: int) -> None:
+        self.mapper = mapper
+        self.size = size
+        self.frames: LRUCache[Tuple[str, str, int], Tuple[Any, ...]] = LRUCache(
+            PROGUARD_REMAP_CACHE_SIZE
+        )
+        self.classes: LRUCache[str, Optional[str]] = LRUCache(PROGUARD_REMAP_CACHE_SIZE)
+        # Time spent in the mapper itself, used to estimate the time saved by
+        # memoization.
+        self.remap_duration = 0.0
+        self.remap_count = 0
+
+    @property
+    def has_line_info(self) -> bool:
+        return bool(self.mapper.has_line_info)
+
+    def remap_frame(self, class_name: str, method: str, line: int) -> Tuple[Any, ...]:
+        key = (class_name, method, line)
+        mapped = self.frames.get(key)
+        if mapped is None:
+            start = time()
+            mapped = tuple(self.mapper.remap_frame(class_name, method, line))
+            self.remap_duration += time() - start
+            self.remap_count += 1
+            self.frames.set(key, mapped)
+        return mapped
+
+    def remap_class(self, class_name: str) -> Optional[str]:
+        mapped = self.classes.get(class_name, __unset__)
+        if mapped is __unset__:
+            mapped = self.mapper.remap_class(class_name)
+            self.classes.set(class_name, mapped)
+        return mapped  # type: ignore
+
+
+_proguard_mapper_cache: LRUCache[Tuple[int, str], CachedProguardMapper] = LRUCache(
+    PROGUARD_MAPPER_CACHE_SIZE,
+    max_weight=PROGUARD_MAPPER_CACHE_MAX_BYTES,
+    weigher=lambda mapper: mapper.size,
+)
+
+
+def _get_proguard_mapper(project: Project, debug_file_id: str) -> Optional[CachedProguardMapper]:
+    # Mappers are shared per project only, so that a profile is never
+    # deobfuscated with a mapping file uploaded to another project.
+    cache_key = (project.id, debug_file_id)
+    mapper = _proguard_mapper_cache.get(cache_key)
+    metrics.incr(
+        "process_profile.deobfuscate.mapper_cache",
+        tags={"hit": mapper is not None},
+        sample_rate=1.0,
+    )
+    if mapper is not None:
+        return mapper
 
     dif_paths = ProjectDebugFile.difcache.fetch_difs(project, [debug_file_id], features=["mapping"])
     debug_file_path = dif_paths.get(debug_file_id)
     if debug_file_path is None:
+        return None
+
+    mapper = CachedProguardMapper(
+        ProguardMapper.open(debug_file_path), os.path.getsize(debug_file_path)
+    )
+    _proguard_mapper_cache.set(cache_key, mapper)
+    return mapper
+
+
+@metrics.wraps("process_profile.deobfuscate")
+def _deobfuscate(profile: Profile, project: Project) -> None:
+    debug_file_id = profile.get("build_id")
+    if debug_file_id is None or debug_file_id == "":
         return
 
-    mapper = ProguardMapper.open(debug_file_path)
-    if not mapper.has_line_info:
+    mapper = _get_proguard_mapper(project, debug_file_id)
+    if mapper is None or not mapper.has_line_info:
         return
 
     for method in profile["profile"]["methods"]:
@@ -490,6 +597,15 @@ def _deobfuscate(profile: Profile, project: Project) -> None:
             if mapped:
                 method["class_name"] = mapped
 
+    hits, misses = mapper.frames.reset_stats()
+    metrics.incr("process_profile.deobfuscate.frame_cache.hit", amount=hits, sample_rate=1.0)
+    metrics.incr("process_profile.deobfuscate.frame_cache.miss", amount=misses, sample_rate=1.0)
+    if hits and mapper.remap_count:
+        metrics.timing(
+            "process_profile.deobfuscate.frame_cache.time_saved",
+            hits * mapper.remap_duration / mapper.remap_count,
+        )
+
 
 @metrics.wraps("process_profile.track_outcome")
 def _track_outcome(
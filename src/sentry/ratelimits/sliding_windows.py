@@ -73,15 +73,35 @@ When using the quotas, the keys change as follows:
     sliding-window-rate-limit:123:3:902 = 1
     sliding-window-rate-limit:123:30:90 = 2
 
+Leasing
+=======
+
+With the `lease_fraction` option, the Redis backend stops going to Redis for
+every request. Instead it reserves a slice of each request's quotas at once
+(a "lease" of `lease_fraction` times the smallest limit, in addition to what
+was requested) and grants further requests from that slice locally, until it
+is used up or expires. Expired and replaced leases return their unused units
+to Redis.
+
+Reserved units are counted in Redis when the lease is taken, so leases never
+grant more than the quotas allow in total. They can however be spent up to
+`lease_seconds` after the granule they were counted in, which lets quota be
+overspent by at most one lease per worker and prefix when that granule leaves
+the window. Leases also hold back quota from other workers until they are
+returned. A larger `lease_fraction` means fewer round trips to Redis at the
+expense of accuracy; `lease_seconds` is capped at the smallest granularity of
+the quotas.
+
 """
 
+import math
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from time import time
-from typing import Any, Iterator, MutableMapping, Optional, Sequence, Tuple
+from typing import Any, Iterator, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from sentry.exceptions import InvalidConfiguration
-from sentry.utils import redis
+from sentry.utils import metrics, redis
 from sentry.utils.services import Service
 
 
@@ -171,6 +191,28 @@ class GrantedQuota:
 Timestamp = int
 
 
+@dataclass
+class Lease:
+    # The request that reserved the lease, with `requested` set to the number
+    # of reserved units.
+    request: RequestedQuota
+
+    # How many of the reserved units have not been used yet.
+    remaining: int
+
+    # When the units were reserved. This determines the granules in which
+    # they are counted in Redis.
+    timestamp: Timestamp
+
+    # When the lease can no longer be used, and its remaining units are
+    # returned to Redis.
+    expires_at: Timestamp
+
+
+def _get_lease_key(request: RequestedQuota) -> Tuple[str, Tuple[Quota, ...]]:
+    return request.prefix, tuple(request.quotas)
+
+
 class SlidingWindowRateLimiter(Service):
     def __init__(self, **options: Any) -> None:
         pass
@@ -277,6 +319,13 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     def __init__(self, **options: Any) -> None:
         cluster_key = options.get("cluster", "default")
         self.client = redis.redis_clusters.get(cluster_key)
+
+        # See "Leasing" in the module docstring. Leasing is disabled unless
+        # `lease_fraction` is set.
+        self.lease_fraction = float(options.get("lease_fraction", 0.0))
+        self.lease_seconds = int(options.get("lease_seconds", 1))
+        self.leases: MutableMapping[Tuple[str, Tuple[Quota, ...]], Lease] = {}
+
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -315,6 +364,24 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         else:
             timestamp = int(timestamp)
 
+        if self.lease_fraction > 0:
+            return timestamp, self._check_within_leases(requests, timestamp)
+
+        return timestamp, self._check_within_redis_quotas(requests, timestamp)
+
+    def _check_within_redis_quotas(
+        self,
+        requests: Sequence[RequestedQuota],
+        timestamp: Timestamp,
+        returned_units: Optional[Mapping[str, int]] = None,
+    ) -> Sequence[GrantedQuota]:
+        """
+        :param returned_units: Units of leases that are returned in the same
+            round trip as the quotas are used, by Redis key.
+        """
+        if returned_units is None:
+            returned_units = {}
+
         keys_to_fetch = set()
         for request in requests:
             # We could potentially run this check inside of __post__init__ of
@@ -365,18 +432,10 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
             # been overused, in those cases we want to truncate resulting
             # negative "grants" to zero.
             for quota in request.quotas:
-                used_quota = (
-                    sum(
-                        int(
-                            redis_results.get(
-                                self._build_redis_key(request=request, quota=quota, granule=granule)
-                            )
-                            or 0
-                        )
-                        for granule in quota.iter_window(timestamp)
-                    )
-                    + quota_used_cache[id(quota)]
-                )
+                used_quota = quota_used_cache[id(quota)]
+                for granule in quota.iter_window(timestamp):
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+                    used_quota += int(redis_results.get(key) or 0) - returned_units.get(key, 0)
 
                 remaining_quota = max(0, quota.limit - used_quota)
 
@@ -394,7 +453,121 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 )
             )
 
-        return timestamp, results
+        return results
+
+    def _check_within_leases(
+        self, requests: Sequence[RequestedQuota], timestamp: Timestamp
+    ) -> Sequence[GrantedQuota]:
+        """
+        Grant requests from the local leases, and reserve new leases in Redis
+        for requests that don't fit into theirs.
+        """
+        leases_to_return = [
+            lease for lease in self.leases.values() if lease.expires_at <= timestamp
+        ]
+        for lease in leases_to_return:
+            del self.leases[_get_lease_key(lease.request)]
+
+        results: List[Optional[GrantedQuota]] = []
+        lease_requests: List[Tuple[int, RequestedQuota]] = []
+        # Units of each lease not granted to earlier requests of this call yet.
+        # The leases themselves are only updated in `use_quotas`.
+        available: MutableMapping[Tuple[str, Tuple[Quota, ...]], int] = {}
+        # Units granted by this call from leases it replaces. They are added to
+        # the replacing lease, so that `use_quotas` can subtract them again.
+        carried_over: MutableMapping[Tuple[str, Tuple[Quota, ...]], int] = defaultdict(int)
+
+        for i, request in enumerate(requests):
+            assert request.quotas
+
+            lease_key = _get_lease_key(request)
+            lease = self.leases.get(lease_key)
+            if lease is not None:
+                remaining = available.setdefault(lease_key, lease.remaining)
+                if remaining >= request.requested:
+                    available[lease_key] = remaining - request.requested
+                    results.append(
+                        GrantedQuota(
+                            prefix=request.prefix, granted=request.requested, reached_quotas=[]
+                        )
+                    )
+                    continue
+
+                # Replace leases that are too small rather than topping them
+                # up, so that every lease is counted in a single granule. Units
+                # granted from it in this call stay counted.
+                del self.leases[lease_key]
+                del available[lease_key]
+                carried_over[lease_key] += lease.remaining - remaining
+                lease.remaining = remaining
+                leases_to_return.append(lease)
+
+            smallest_limit = min(quota.limit for quota in request.quotas)
+            lease_size = math.ceil(smallest_limit * self.lease_fraction)
+            lease_requests.append((i, replace(request, requested=request.requested + lease_size)))
+            results.append(None)
+
+        metrics.incr(
+            "ratelimits.sliding_windows.leases",
+            amount=len(requests) - len(lease_requests),
+            tags={"result": "hit"},
+        )
+        metrics.incr(
+            "ratelimits.sliding_windows.leases",
+            amount=len(lease_requests),
+            tags={"result": "miss"},
+        )
+
+        returned_units = self._get_returned_units(leases_to_return, timestamp)
+        if lease_requests:
+            requested_leases = [request for _, request in lease_requests]
+            lease_grants = self._check_within_redis_quotas(
+                requested_leases, timestamp, returned_units
+            )
+            self._incr_quotas(requested_leases, lease_grants, timestamp, returned_units)
+
+            for (i, lease_request), lease_grant in zip(lease_requests, lease_grants):
+                request = requests[i]
+                lease_key = _get_lease_key(request)
+                lease = self.leases.get(lease_key)
+                if lease is not None:
+                    # Another request of this call reserved a lease with the
+                    # same prefix and quotas already.
+                    lease.remaining += lease_grant.granted
+                elif lease_grant.granted > 0:
+                    self.leases[lease_key] = Lease(
+                        request=lease_request,
+                        remaining=lease_grant.granted + carried_over.pop(lease_key, 0),
+                        timestamp=timestamp,
+                        expires_at=timestamp
+                        + min(
+                            self.lease_seconds,
+                            *(quota.granularity_seconds for quota in request.quotas),
+                        ),
+                    )
+
+                granted = min(request.requested, lease_grant.granted)
+                reached_quotas = lease_grant.reached_quotas if granted < request.requested else []
+                results[i] = GrantedQuota(
+                    prefix=request.prefix, granted=granted, reached_quotas=reached_quotas
+                )
+        elif returned_units:
+            self._incr_quotas([], [], timestamp, returned_units)
+
+        return [result for result in results if result is not None]
+
+    def release_leases(self, timestamp: Optional[Timestamp] = None) -> None:
+        """
+        Return the unused units of all leases to Redis, for example before
+        shutting down.
+        """
+        if timestamp is None:
+            timestamp = int(time())
+
+        returned_units = self._get_returned_units(list(self.leases.values()), int(timestamp))
+        self.leases.clear()
+        if returned_units:
+            self._incr_quotas([], [], int(timestamp), returned_units)
 
     def use_quotas(
         self,
@@ -404,6 +577,55 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     ) -> None:
         assert len(requests) == len(grants)
 
+        if self.lease_fraction > 0:
+            # Units of leases are counted in Redis when they are reserved, so
+            # using them only has to be tracked locally.
+            for request, grant in zip(requests, grants):
+                assert request.prefix == grant.prefix
+                lease = self.leases.get(_get_lease_key(request))
+                if lease is not None:
+                    lease.remaining = max(0, lease.remaining - grant.granted)
+            return
+
+        self._incr_quotas(requests, grants, timestamp)
+
+    def _get_returned_units(
+        self, leases: Sequence[Lease], timestamp: Timestamp
+    ) -> MutableMapping[str, int]:
+        """
+        Map the remaining units of returned leases to the keys of the granules
+        they were counted in.
+        """
+        returned_units: MutableMapping[str, int] = defaultdict(int)
+        for lease in leases:
+            if lease.remaining <= 0:
+                continue
+
+            for quota in lease.request.quotas:
+                granule = next(quota.iter_window(lease.timestamp))
+                # Once the granule has left the window, its key may have
+                # expired, and the units no longer count towards the quota.
+                if granule < timestamp // quota.granularity_seconds - (
+                    quota.window_seconds // quota.granularity_seconds
+                ):
+                    continue
+                key = self._build_redis_key(request=lease.request, quota=quota, granule=granule)
+                returned_units[key] += lease.remaining
+
+        return returned_units
+
+    def _incr_quotas(
+        self,
+        requests: Sequence[RequestedQuota],
+        grants: Sequence[GrantedQuota],
+        timestamp: Timestamp,
+        returned_units: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        """
+        Count the granted quota in the current granule of each quota, and
+        subtract the units of returned leases from the granules they were
+        counted in.
+        """
         keys_to_incr: MutableMapping[str, int] = {}
         keys_ttl: MutableMapping[str, int] = {}
 
@@ -418,6 +640,9 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 keys_to_incr[key] += grant.granted
                 keys_ttl[key] = quota.window_seconds
 
+        if not keys_to_incr and not returned_units:
+            return
+
         with self.client.pipeline(transaction=False) as pipeline:
             for key, value in keys_to_incr.items():
                 pipeline.incrby(key, value)
@@ -427,4 +652,9 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 # timestamps starting from 0 for convenience.
                 pipeline.expire(key, keys_ttl[key])
 
+            # The granule of a returned lease is still within the window, so
+            # its key hasn't expired yet and doesn't need a new TTL.
+            for key, value in (returned_units or {}).items():
+                pipeline.decrby(key, value)
+
             pipeline.execute()
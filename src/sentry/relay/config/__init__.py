@@ -54,16 +54,22 @@ logger = logging.getLogger(__name__)
 
 def get_exposed_features(project: Project) -> Sequence[str]:
 
-    active_features = []
+    organization_features = []
+    project_features = []
     for feature in EXPOSABLE_FEATURES:
         if feature.startswith("organizations:"):
-            has_feature = features.has(feature, project.organization)
+            organization_features.append(feature)
         elif feature.startswith("projects:"):
-            has_feature = features.has(feature, project)
+            project_features.append(feature)
         else:
             raise RuntimeError("EXPOSABLE_FEATURES must start with 'organizations:' or 'projects:'")
 
-        if has_feature:
+    enabled_features = features.has_many(organization_features, project.organization)
+    enabled_features.update(features.has_many(project_features, project))
+
+    active_features = []
+    for feature in EXPOSABLE_FEATURES:
+        if enabled_features[feature]:
             metrics.incr(
                 "sentry.relay.config.features", tags={"outcome": "enabled", "feature": feature}
             )
@@ -148,7 +154,7 @@ def get_project_config(
         python's StoreView)
     :return: a ProjectConfig object for the given project
     """
-    with sentry_sdk.push_scope() as scope:
+    with sentry_sdk.push_scope() as scope, features.local_cache():
         scope.set_tag("project", project.id)
         with metrics.timer("relay.config.get_project_config.duration"):
             return _get_project_config(project, full_config=full_config, project_keys=project_keys)
@@ -422,6 +422,12 @@ def post_process_forwarder(**options):
     type=click.Choice(["earliest", "latest"]),
     help="Force subscriptions to start from a particular offset",
 )
+@click.option(
+    "--batch-size",
+    default=1,
+    type=int,
+    help="How many subscription updates to process together.",
+)
 @log_options()
 @configuration
 def query_subscription_consumer(**options):
@@ -434,6 +440,7 @@ def query_subscription_consumer(**options):
         commit_batch_timeout_ms=options["commit_batch_timeout_ms"],
         initial_offset_reset=options["initial_offset_reset"],
         force_offset_reset=options["force_offset_reset"],
+        batch_size=options["batch_size"],
     )
 
     def handler(signum, frame):
@@ -57,6 +57,13 @@ local function argument_parser(callback)
     end
 end
 
+local function optional_number(value)
+    if value == nil then
+        return nil
+    end
+    return tonumber(value)
+end
+
 local function object_argument_parser(schema, callback)
     if callback == nil then
         callback = identity
@@ -106,15 +113,23 @@ local function zrange_scored_iterator(result)
     end
 end
 
-local function zrange_move_slice(source, destination, threshold, callback)
+local function zrange_move_slice(source, destination, threshold, callback, limit)
     local callback = callback
     if callback == nil then
         callback = noop
     end
 
-    local keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES')
+    -- Without a limit, every item up to the threshold is moved at once. A
+    -- limit bounds how long a single script invocation can block the server,
+    -- and callers invoke the script repeatedly until a batch comes back short.
+    local keys
+    if limit ~= nil and limit > 0 then
+        keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES', 'LIMIT', 0, limit)
+    else
+        keys = redis.call('ZRANGEBYSCORE', source, 0, threshold, 'WITHSCORES')
+    end
     if #keys == 0 then
-        return
+        return 0
     end
 
     -- NOTE: The actual number of arguments is the chunk size * 2, since the
@@ -134,6 +149,8 @@ local function zrange_move_slice(source, destination, threshold, callback)
         redis.call('ZADD', destination, unpack(zadd_args))
         redis.call('ZREM', source, unpack(zrem_args))
     end
+
+    return #keys / 2
 end
 
 local function zset_trim(key, capacity, callback)
@@ -164,7 +181,7 @@ end
 
 -- Timeline and Schedule Operations
 
-local function schedule(configuration, deadline)
+local function schedule(configuration, deadline, limit)
     local response = {}
     local i = 0
     zrange_move_slice(
@@ -174,16 +191,19 @@ local function schedule(configuration, deadline)
         function (timeline_id, timestamp)
             i = i + 1
             response[i] = {timeline_id, timestamp}
-        end
+        end,
+        limit
     )
     return response
 end
 
-local function maintenance(configuration, deadline)
-    zrange_move_slice(
+local function maintenance(configuration, deadline, limit)
+    return zrange_move_slice(
         configuration:get_schedule_ready_key(),
         configuration:get_schedule_waiting_key(),
-        deadline
+        deadline,
+        nil,
+        limit
     )
 end
 
@@ -296,14 +316,25 @@ local function digest_timeline(configuration, timeline_id, timeline_capacity)
 
     local results = {}
     local records = redis.call('ZREVRANGE', digest_key, 0, -1, 'WITHSCORES')
+
+    -- Record values are fetched with one MGET per chunk rather than one GET
+    -- per record.
     local i = 0
-    for key, score in zrange_scored_iterator(records) do
-        i = i + 1
-        results[i] = {
-            key,
-            redis.call('GET', configuration:get_timeline_record_key(timeline_id, key)),
-            score
-        }
+    for _, chunk_iterator in chunked(1000, zrange_scored_iterator(records)) do
+        local record_ids = {}
+        local record_keys = {}
+        local scores = {}
+        for j, key, score in chunk_iterator do
+            record_ids[j] = key
+            record_keys[j] = configuration:get_timeline_record_key(timeline_id, key)
+            scores[j] = score
+        end
+
+        local values = redis.call('MGET', unpack(record_keys))
+        for j, record_id in ipairs(record_ids) do
+            i = i + 1
+            results[i] = {record_id, values[j], scores[j]}
+        end
     end
 
     return results
@@ -385,18 +416,20 @@ end)
 
 local commands = {
     SCHEDULE = function (cursor, arguments)
-        local cursor, configuration, deadline = multiple_argument_parser(
+        local cursor, configuration, deadline, limit = multiple_argument_parser(
             configuration_argument_parser,
-            argument_parser(tonumber)
+            argument_parser(tonumber),
+            argument_parser(optional_number)
         )(cursor, arguments)
-        return schedule(configuration, deadline)
+        return schedule(configuration, deadline, limit)
     end,
     MAINTENANCE = function (cursor, arguments)
-        local cursor, configuration, deadline = multiple_argument_parser(
+        local cursor, configuration, deadline, limit = multiple_argument_parser(
             configuration_argument_parser,
-            argument_parser(tonumber)
+            argument_parser(tonumber),
+            argument_parser(optional_number)
         )(cursor, arguments)
-        return maintenance(configuration, deadline)
+        return maintenance(configuration, deadline, limit)
     end,
     ADD = function (cursor, arguments)
         local cursor, configuration, arguments = multiple_argument_parser(
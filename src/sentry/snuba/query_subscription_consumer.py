@@ -2,7 +2,7 @@ import logging
 import re
 import time
 from random import random
-from typing import Any, Callable, Dict, Iterable, List, Optional, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, cast
 
 import jsonschema
 import pytz
@@ -22,8 +22,10 @@ from sentry.utils.batching_kafka_consumer import create_topics
 logger = logging.getLogger(__name__)
 
 TQuerySubscriptionCallable = Callable[[Dict[str, Any], QuerySubscription], None]
+TQuerySubscriptionBatchCallable = Callable[[List[Tuple[Dict[str, Any], QuerySubscription]]], None]
 
 subscriber_registry: Dict[str, TQuerySubscriptionCallable] = {}
+batch_subscriber_registry: Dict[str, TQuerySubscriptionBatchCallable] = {}
 
 
 def register_subscriber(
@@ -38,6 +40,25 @@ def register_subscriber(
     return inner
 
 
+def register_batch_subscriber(
+    subscriber_key: str,
+) -> Callable[[TQuerySubscriptionBatchCallable], TQuerySubscriptionBatchCallable]:
+    """
+    Registers a callback that receives all updates of a batch for subscriptions of
+    the given type at once, as a list of `(subscription_update, subscription)` tuples.
+    It is used instead of the callback registered with `register_subscriber` when
+    the consumer processes more than one message at a time.
+    """
+
+    def inner(func: TQuerySubscriptionBatchCallable) -> TQuerySubscriptionBatchCallable:
+        if subscriber_key in batch_subscriber_registry:
+            raise Exception("Batch handler already registered for %s" % subscriber_key)
+        batch_subscriber_registry[subscriber_key] = func
+        return func
+
+    return inner
+
+
 class InvalidMessageError(Exception):
     pass
 
@@ -51,6 +72,10 @@ class QuerySubscriptionConsumer:
     A Kafka consumer that processes query subscription update messages. Each message has
     a related subscription id and the latest values related to the subscribed query.
     These values are passed along to a callback associated with the subscription.
+
+    With a `batch_size` greater than one, up to that many messages are consumed
+    before they are processed together. Updates for subscription types with a
+    batch callback are passed to it at once, all others to their callback one by one.
     """
 
     topic_to_dataset: Dict[str, Dataset] = {
@@ -70,6 +95,7 @@ class QuerySubscriptionConsumer:
         commit_batch_timeout_ms: int = 5000,
         initial_offset_reset: str = "earliest",
         force_offset_reset: Optional[str] = None,
+        batch_size: int = 1,
     ):
         self.group_id = group_id
         if not topic:
@@ -79,6 +105,8 @@ class QuerySubscriptionConsumer:
         self.topic = topic
         self.cluster_name: str = settings.KAFKA_TOPICS[topic]["cluster"]
         self.commit_batch_size = commit_batch_size
+        self.batch_size = batch_size
+        self.__uncommitted_count = 0
 
         # Adding time based commit behaviour
         self.commit_batch_timeout_ms: int = commit_batch_timeout_ms
@@ -165,56 +193,83 @@ class QuerySubscriptionConsumer:
 
         self.consumer.subscribe([self.topic], on_assign=on_assign, on_revoke=on_revoke)
 
-        i = 0
+        batch: List[Message] = []
         while not self.__shutdown_requested:
             message = self.consumer.poll(0.1)
-            if message is None:
+            if message is not None:
+                error = message.error()
+                if error is not None:
+                    raise KafkaException(error)
+
+                batch.append(message)
+                if len(batch) < self.batch_size:
+                    continue
+            elif not batch:
                 continue
 
-            error = message.error()
-            if error is not None:
-                raise KafkaException(error)
+            # Process a full batch, or whatever was received before the topic
+            # ran dry, so that updates never wait for more messages.
+            self.process_batch(batch)
+            batch = []
 
-            i = i + 1
+        if batch:
+            self.process_batch(batch)
 
-            with sentry_sdk.start_transaction(
-                op="handle_message",
-                name="query_subscription_consumer_process_message",
-                sampled=random() <= options.get("subscriptions-query.sample-rate"),
-            ), metrics.timer("snuba_query_subscriber.handle_message"):
-                try:
-                    self.handle_message(message)
-                except Exception:
-                    # This is a failsafe to make sure that no individual message will block this
-                    # consumer. If we see errors occurring here they need to be investigated to
-                    # make sure that we're not dropping legitimate messages.
-                    logger.exception(
-                        "Unexpected error while handling message in QuerySubscriptionConsumer. Skipping message.",
-                        extra={
-                            "offset": message.offset(),
-                            "partition": message.partition(),
-                            "value": message.value(),
-                        },
-                    )
+        logger.debug("Committing offsets and closing consumer")
+        self.commit_offsets()
+        self.consumer.close()
 
+    def process_batch(self, messages: List[Message]) -> None:
+        if self.batch_size > 1:
+            # Partitions may have been revoked while the batch was collected. Their
+            # messages will be processed by the consumer they were assigned to.
+            messages = [message for message in messages if message.partition() in self.offsets]
+            if not messages:
+                return
+
+        with sentry_sdk.start_transaction(
+            op="handle_message",
+            name="query_subscription_consumer_process_message",
+            sampled=random() <= options.get("subscriptions-query.sample-rate"),
+        ), metrics.timer("snuba_query_subscriber.handle_message"):
+            if len(messages) == 1:
+                self._handle_message_safe(messages[0])
+            else:
+                self.handle_messages(messages)
+
+        for message in messages:
             # Track latest completed message here, for use in `shutdown` handler.
             self.offsets[message.partition()] = message.offset() + 1
 
-            batch_by_size: bool = i % self.commit_batch_size == 0
-            batch_by_time: bool = (
-                self.__batch_deadline is not None and time.time() > self.__batch_deadline
-            )
-
-            if batch_by_time or batch_by_size:
-                logger.debug("Committing offsets")
-                self.commit_offsets()
+        self.__uncommitted_count += len(messages)
+        batch_by_size: bool = self.__uncommitted_count >= self.commit_batch_size
+        batch_by_time: bool = (
+            self.__batch_deadline is not None and time.time() > self.__batch_deadline
+        )
 
-        logger.debug("Committing offsets and closing consumer")
-        self.commit_offsets()
-        self.consumer.close()
+        if batch_by_time or batch_by_size:
+            logger.debug("Committing offsets")
+            self.commit_offsets()
+
+    def _handle_message_safe(self, message: Message) -> None:
+        try:
+            self.handle_message(message)
+        except Exception:
+            # This is a failsafe to make sure that no individual message will block this
+            # consumer. If we see errors occurring here they need to be investigated to
+            # make sure that we're not dropping legitimate messages.
+            logger.exception(
+                "Unexpected error while handling message in QuerySubscriptionConsumer. Skipping message.",
+                extra={
+                    "offset": message.offset(),
+                    "partition": message.partition(),
+                    "value": message.value(),
+                },
+            )
 
     def _reset_batch(self) -> None:
         self.__batch_deadline = None
+        self.__uncommitted_count = 0
 
     def commit_offsets(self, partitions: Optional[Iterable[int]] = None) -> None:
         logger.info(
@@ -248,90 +303,11 @@ class QuerySubscriptionConsumer:
         :param message:
         :return:
         """
-        # set a commit time deadline only after the first message for this batch is seen
-        if not self.__batch_deadline:
-            self.__batch_deadline = self.commit_batch_timeout_ms / 1000.0 + time.time()
-
         with sentry_sdk.push_scope() as scope:
-            try:
-                with metrics.timer("snuba_query_subscriber.parse_message_value"):
-                    contents = self.parse_message_value(message.value())
-            except InvalidMessageError:
-                # If the message is in an invalid format, just log the error
-                # and continue
-                logger.exception(
-                    "Subscription update could not be parsed",
-                    extra={
-                        "offset": message.offset(),
-                        "partition": message.partition(),
-                        "value": message.value(),
-                    },
-                )
-                return
-            scope.set_tag("query_subscription_id", contents["subscription_id"])
-
-            try:
-                with metrics.timer("snuba_query_subscriber.fetch_subscription"):
-                    subscription: QuerySubscription = QuerySubscription.objects.get_from_cache(
-                        subscription_id=contents["subscription_id"]
-                    )
-                    if subscription.status != QuerySubscription.Status.ACTIVE.value:
-                        metrics.incr("snuba_query_subscriber.subscription_inactive")
-                        return
-            except QuerySubscription.DoesNotExist:
-                metrics.incr("snuba_query_subscriber.subscription_doesnt_exist")
-                logger.warning(
-                    "Received subscription update, but subscription does not exist",
-                    extra={
-                        "offset": message.offset(),
-                        "partition": message.partition(),
-                        "value": message.value(),
-                    },
-                )
-                try:
-                    if "entity" in contents:
-                        entity_key = contents["entity"]
-                    else:
-                        # XXX(ahmed): Remove this logic. This was kept here as backwards compat
-                        # for subscription updates with schema version `2`. However schema version 3
-                        # sends the "entity" in the payload
-                        entity_regex = r"^(MATCH|match)[ ]*\(([^)]+)\)"
-                        entity_match = re.match(entity_regex, contents["request"]["query"])
-                        if not entity_match:
-                            raise InvalidMessageError(
-                                "Unable to fetch entity from query in message"
-                            )
-                        entity_key = entity_match.group(2)
-                    topic = message.topic()
-                    if topic in self.topic_to_dataset:
-                        _delete_from_snuba(
-                            self.topic_to_dataset[topic],
-                            contents["subscription_id"],
-                            EntityKey(entity_key),
-                        )
-                    else:
-                        logger.error(
-                            "Topic not registered with QuerySubscriptionConsumer, can't remove "
-                            "non-existent subscription from Snuba",
-                            extra={"topic": topic, "subscription_id": contents["subscription_id"]},
-                        )
-                except InvalidMessageError as e:
-                    logger.exception(e)
-                except Exception:
-                    logger.exception("Failed to delete unused subscription from snuba.")
-                return
-
-            if subscription.type not in subscriber_registry:
-                metrics.incr("snuba_query_subscriber.subscription_type_not_registered")
-                logger.error(
-                    "Received subscription update, but no subscription handler registered",
-                    extra={
-                        "offset": message.offset(),
-                        "partition": message.partition(),
-                        "value": message.value(),
-                    },
-                )
+            update = self.prepare_message(message, scope)
+            if update is None:
                 return
+            contents, subscription = update
 
             sentry_sdk.set_tag("project_id", subscription.project_id)
             sentry_sdk.set_tag("query_subscription_id", contents["subscription_id"])
@@ -352,6 +328,155 @@ class QuerySubscriptionConsumer:
 
                 callback(contents, subscription)
 
+    def handle_messages(self, messages: List[Message]) -> None:
+        """
+        Handles a batch of messages like `handle_message`. Updates for subscription types
+        with a batch callback are passed to that callback in a single call, in the order
+        of the messages.
+        :param messages:
+        :return:
+        """
+        updates_by_type: Dict[str, List[Tuple[Dict[str, Any], QuerySubscription]]] = {}
+        for message in messages:
+            with sentry_sdk.push_scope() as scope:
+                try:
+                    update = self.prepare_message(message, scope)
+                except Exception:
+                    logger.exception(
+                        "Unexpected error while handling message in QuerySubscriptionConsumer. Skipping message.",
+                        extra={
+                            "offset": message.offset(),
+                            "partition": message.partition(),
+                            "value": message.value(),
+                        },
+                    )
+                    continue
+            if update is not None:
+                updates_by_type.setdefault(update[1].type, []).append(update)
+
+        for subscription_type, updates in updates_by_type.items():
+            batch_callback = batch_subscriber_registry.get(subscription_type)
+            if batch_callback is None:
+                callback = subscriber_registry[subscription_type]
+                for contents, subscription in updates:
+                    try:
+                        with metrics.timer(
+                            "snuba_query_subscriber.callback.duration", instance=subscription_type
+                        ):
+                            callback(contents, subscription)
+                    except Exception:
+                        logger.exception(
+                            "Unexpected error in QuerySubscriptionConsumer callback. Skipping update.",
+                            extra={"subscription_id": contents["subscription_id"]},
+                        )
+                continue
+
+            metrics.timing(
+                "snuba_query_subscriber.batch_size", len(updates), tags={"type": subscription_type}
+            )
+            try:
+                with metrics.timer(
+                    "snuba_query_subscriber.batch_callback.duration", instance=subscription_type
+                ):
+                    batch_callback(updates)
+            except Exception:
+                logger.exception(
+                    "Unexpected error in QuerySubscriptionConsumer batch callback. Skipping batch.",
+                    extra={"type": subscription_type, "batch_size": len(updates)},
+                )
+
+    def prepare_message(
+        self, message: Message, scope: sentry_sdk.Scope
+    ) -> Optional[Tuple[Dict[str, Any], QuerySubscription]]:
+        """
+        Parses the value from Kafka and fetches the related subscription. Returns None if
+        the message is invalid, or the subscription is inactive, removed or has no
+        registered callback.
+        """
+        # set a commit time deadline only after the first message for this batch is seen
+        if not self.__batch_deadline:
+            self.__batch_deadline = self.commit_batch_timeout_ms / 1000.0 + time.time()
+
+        try:
+            with metrics.timer("snuba_query_subscriber.parse_message_value"):
+                contents = self.parse_message_value(message.value())
+        except InvalidMessageError:
+            # If the message is in an invalid format, just log the error
+            # and continue
+            logger.exception(
+                "Subscription update could not be parsed",
+                extra={
+                    "offset": message.offset(),
+                    "partition": message.partition(),
+                    "value": message.value(),
+                },
+            )
+            return None
+        scope.set_tag("query_subscription_id", contents["subscription_id"])
+
+        try:
+            with metrics.timer("snuba_query_subscriber.fetch_subscription"):
+                subscription: QuerySubscription = QuerySubscription.objects.get_from_cache(
+                    subscription_id=contents["subscription_id"]
+                )
+                if subscription.status != QuerySubscription.Status.ACTIVE.value:
+                    metrics.incr("snuba_query_subscriber.subscription_inactive")
+                    return None
+        except QuerySubscription.DoesNotExist:
+            metrics.incr("snuba_query_subscriber.subscription_doesnt_exist")
+            logger.warning(
+                "Received subscription update, but subscription does not exist",
+                extra={
+                    "offset": message.offset(),
+                    "partition": message.partition(),
+                    "value": message.value(),
+                },
+            )
+            try:
+                if "entity" in contents:
+                    entity_key = contents["entity"]
+                else:
+                    # XXX(ahmed): Remove this logic. This was kept here as backwards compat
+                    # for subscription updates with schema version `2`. However schema version 3
+                    # sends the "entity" in the payload
+                    entity_regex = r"^(MATCH|match)[ ]*\(([^)]+)\)"
+                    entity_match = re.match(entity_regex, contents["request"]["query"])
+                    if not entity_match:
+                        raise InvalidMessageError("Unable to fetch entity from query in message")
+                    entity_key = entity_match.group(2)
+                topic = message.topic()
+                if topic in self.topic_to_dataset:
+                    _delete_from_snuba(
+                        self.topic_to_dataset[topic],
+                        contents["subscription_id"],
+                        EntityKey(entity_key),
+                    )
+                else:
+                    logger.error(
+                        "Topic not registered with QuerySubscriptionConsumer, can't remove "
+                        "non-existent subscription from Snuba",
+                        extra={"topic": topic, "subscription_id": contents["subscription_id"]},
+                    )
+            except InvalidMessageError as e:
+                logger.exception(e)
+            except Exception:
+                logger.exception("Failed to delete unused subscription from snuba.")
+            return None
+
+        if subscription.type not in subscriber_registry:
+            metrics.incr("snuba_query_subscriber.subscription_type_not_registered")
+            logger.error(
+                "Received subscription update, but no subscription handler registered",
+                extra={
+                    "offset": message.offset(),
+                    "partition": message.partition(),
+                    "value": message.value(),
+                },
+            )
+            return None
+
+        return contents, subscription
+
     def parse_message_value(self, value: str) -> Dict[str, Any]:
         """
         Parses the value received via the Kafka consumer and verifies that it
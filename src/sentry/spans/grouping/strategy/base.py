@@ -1,9 +1,11 @@
 import re
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional, Sequence, TypedDict, Union
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypedDict, Union
 from urllib.parse import urlparse
 
 from sentry.spans.grouping.utils import Hash, parse_fingerprint_var
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
 
 
 class Span(TypedDict):
@@ -27,6 +29,17 @@ class Span(TypedDict):
 # return a list of strings that will serve as the span fingerprint.
 CallableStrategy = Callable[[Span], Optional[Sequence[str]]]
 
+# Callable strategies only look at the span's `op` and `description`, and most
+# spans within a service repeat the same handful of those pairs. The group hash
+# of spans that use the default fingerprint is memoized per worker, keyed by
+# (strategy name, op, description), so that the regexes above only run once
+# per distinct span shape.
+SPAN_GROUP_CACHE_SIZE = 10000
+
+_span_group_cache: "LRUCache[Tuple[str, Optional[str], Optional[str]], str]" = LRUCache(
+    maxsize=SPAN_GROUP_CACHE_SIZE
+)
+
 
 @dataclass(frozen=True)
 class SpanGroupingStrategy:
@@ -36,7 +49,18 @@ class SpanGroupingStrategy:
 
     def execute(self, event_data: Any) -> Dict[str, str]:
         spans = event_data.get("spans", [])
-        span_groups = {span["span_id"]: self.get_span_group(span) for span in spans}
+
+        span_groups = {}
+        hits = 0
+        for span in spans:
+            span_group, cached = self._get_span_group(span)
+            span_groups[span["span_id"]] = span_group
+            hits += cached
+
+        if spans:
+            metrics.incr("spans.grouping.cache.hit", amount=hits, sample_rate=0.1)
+            metrics.incr("spans.grouping.cache.miss", amount=len(spans) - hits, sample_rate=0.1)
+            metrics.gauge("spans.grouping.cache.size", len(_span_group_cache), sample_rate=0.1)
 
         # make sure to get the group id for the transaction root span
         span_id = event_data["contexts"]["trace"]["span_id"]
@@ -50,6 +74,25 @@ class SpanGroupingStrategy:
         return result.hexdigest()
 
     def get_span_group(self, span: Span) -> str:
+        return self._get_span_group(span)[0]
+
+    def _get_span_group(self, span: Span) -> Tuple[str, bool]:
+        """Returns the group hash of the span and whether it was served from
+        the span group cache. Only spans without a custom fingerprint are
+        cached, since those are fully determined by their op and description."""
+        if span.get("fingerprint"):
+            return self._compute_span_group(span), False
+
+        key = (self.name, span.get("op"), span.get("description"))
+        span_group = _span_group_cache.get(key)
+        if span_group is not None:
+            return span_group, True
+
+        span_group = self._compute_span_group(span)
+        _span_group_cache.set(key, span_group)
+        return span_group, False
+
+    def _compute_span_group(self, span: Span) -> str:
         fingerprints = span.get("fingerprint") or ["{{ default }}"]
 
         result = Hash()
@@ -321,7 +321,7 @@ def post_process_group(
     """
     from sentry.utils import snuba
 
-    with snuba.options_override({"consistent": True}):
+    with snuba.options_override({"consistent": True}), features.local_cache():
         from sentry.eventstore.processing import event_processing_store
         from sentry.ingest.transaction_clusterer.datasource.redis import (
             record_transaction_name as record_transaction_name_for_clustering,  # We use the data being present/missing in the processing store; to ensure that we don't duplicate work should the forwarding consumers; need to rewind history.
@@ -39,6 +39,7 @@ def reprocess_group(
         reprocess_event,
         start_group_reprocessing,
     )
+    from sentry.tasks.symbolication import batched_symbolication
 
     sentry_sdk.set_tag("is_start", "false")
 
@@ -80,29 +81,32 @@ def reprocess_group(
 
     remaining_event_ids = []
 
-    for event in events:
-        if max_events is None or max_events > 0:
-            with sentry_sdk.start_span(op="reprocess_event"):
-                try:
-                    reprocess_event(
-                        project_id=project_id,
-                        event_id=event.event_id,
-                        start_time=start_time,
-                    )
-                except CannotReprocess as e:
-                    logger.error(f"reprocessing2.{e}")
-                except Exception:
-                    sentry_sdk.capture_exception()
-                else:
-                    if max_events is not None:
-                        max_events -= 1
-
-                    continue
-
-        # In case of errors while kicking off reprocessing or if max_events has
-        # been exceeded, do the default action.
-
-        remaining_event_ids.append((event.datetime, event.event_id))
+    # Events of one group usually share their debug images, so native events
+    # are sent to symbolicator together.
+    with batched_symbolication():
+        for event in events:
+            if max_events is None or max_events > 0:
+                with sentry_sdk.start_span(op="reprocess_event"):
+                    try:
+                        reprocess_event(
+                            project_id=project_id,
+                            event_id=event.event_id,
+                            start_time=start_time,
+                        )
+                    except CannotReprocess as e:
+                        logger.error(f"reprocessing2.{e}")
+                    except Exception:
+                        sentry_sdk.capture_exception()
+                    else:
+                        if max_events is not None:
+                            max_events -= 1
+
+                        continue
+
+            # In case of errors while kicking off reprocessing or if max_events has
+            # been exceeded, do the default action.
+
+            remaining_event_ids.append((event.datetime, event.event_id))
 
     # len(remaining_event_ids) is upper-bounded by settings.SENTRY_REPROCESSING_PAGE_SIZE
     if remaining_event_ids:
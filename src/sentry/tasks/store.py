@@ -169,6 +169,7 @@ def _do_preprocess_event(
                 event_id=event_id,
                 start_time=start_time,
                 has_attachments=has_attachments,
+                data=data,
             )
             return
         # else: go directly to process, do not go through the symbolicate queue, do not collect 200
@@ -1,7 +1,9 @@
 import logging
 import random
-from time import sleep, time
-from typing import Any, Callable, Optional
+import threading
+from contextlib import contextmanager
+from time import monotonic, sleep, time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import sentry_sdk
 from django.conf import settings
@@ -83,6 +85,82 @@ def should_demote_symbolication(project_id: int) -> bool:
             return False
 
 
+class SymbolicationBatchCollector:
+    """
+    Collects native events submitted for symbolication while reprocessing, so
+    that events of one project are symbolicated together by a single
+    `symbolicate_event_batch_from_reprocessing` task.
+
+    A batch is submitted once it holds `max_size` events or once its oldest
+    event has waited `max_wait` seconds for more events, whichever comes first.
+    Remaining events are submitted by `flush`.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.max_size = (
+            max_size if max_size is not None else options.get("symbolicator.batch-max-size")
+        )
+        self.max_wait = (
+            max_wait if max_wait is not None else options.get("symbolicator.batch-max-wait")
+        )
+        self.clock = clock
+        # (project id, is low priority) -> (time the first event was added, [task kwargs])
+        self._pending: Dict[Tuple[int, bool], Tuple[float, List[Dict[str, Any]]]] = {}
+
+    def add(self, project_id: int, is_low_priority: bool, event: Dict[str, Any]) -> None:
+        key = (project_id, is_low_priority)
+        _, events = self._pending.setdefault(key, (self.clock(), []))
+        events.append(event)
+        if len(events) >= self.max_size:
+            self._submit(key)
+        self.flush_expired()
+
+    def flush_expired(self) -> None:
+        now = self.clock()
+        for key in [k for k, (added, _) in self._pending.items() if now - added >= self.max_wait]:
+            self._submit(key)
+
+    def flush(self) -> None:
+        for key in list(self._pending):
+            self._submit(key)
+
+    def _submit(self, key: Tuple[int, bool]) -> None:
+        _, events = self._pending.pop(key)
+        _, is_low_priority = key
+        task = (
+            symbolicate_event_batch_from_reprocessing_low_priority
+            if is_low_priority
+            else symbolicate_event_batch_from_reprocessing
+        )
+        metrics.timing("tasks.store.symbolicate_event_batch.size", len(events))
+        task.delay(events=events)
+
+
+_batch_state = threading.local()
+
+
+@contextmanager
+def batched_symbolication(**kwargs: Any) -> Iterator[SymbolicationBatchCollector]:
+    """
+    Symbolicates the native events that are reprocessed within the block in
+    batches, see `SymbolicationBatchCollector`. Pending batches are submitted
+    when the block exits.
+    """
+    collector = SymbolicationBatchCollector(**kwargs)
+    previous = getattr(_batch_state, "collector", None)
+    _batch_state.collector = collector
+    try:
+        yield collector
+    finally:
+        _batch_state.collector = previous
+        collector.flush()
+
+
 def submit_symbolicate(
     is_low_priority: bool,
     from_reprocessing: bool,
@@ -91,7 +169,26 @@ def submit_symbolicate(
     start_time: Optional[int],
     queue_switches: int = 0,
     has_attachments: bool = False,
+    data: Optional[Event] = None,
 ) -> None:
+    collector = getattr(_batch_state, "collector", None)
+    if collector is not None and from_reprocessing and data is not None:
+        from sentry.lang.native.processing import get_symbolication_function, process_payload
+
+        # Minidumps and Apple crash reports are symbolicated one by one
+        if get_symbolication_function(data) is process_payload:
+            collector.add(
+                data["project"],
+                is_low_priority,
+                {
+                    "cache_key": cache_key,
+                    "start_time": start_time,
+                    "event_id": event_id,
+                    "has_attachments": has_attachments,
+                },
+            )
+            return
+
     if is_low_priority:
         task = (
             symbolicate_event_from_reprocessing_low_priority
@@ -429,3 +526,103 @@ def symbolicate_event_from_reprocessing_low_priority(
         queue_switches=queue_switches,
         has_attachments=has_attachments,
     )
+
+
+def _do_symbolicate_event_batch(
+    events: List[Dict[str, Any]],
+    symbolicate_task: Callable[..., None],
+) -> None:
+    from sentry.lang.native.processing import (
+        PayloadBatcher,
+        get_symbolication_function,
+        process_payload,
+    )
+
+    # id of the event data -> (task kwargs, event data)
+    pending: Dict[int, Tuple[Dict[str, Any], Any]] = {}
+    for event in events:
+        data = processing.event_processing_store.get(event["cache_key"])
+        if (
+            data is None
+            or get_symbolication_function(data) is not process_payload
+            or killswitch_matches_context(
+                "store.load-shed-symbolicate-event-projects",
+                {
+                    "project_id": data["project"],
+                    "event_id": data["event_id"],
+                    "platform": data.get("platform") or "null",
+                    "symbolication_function": "process_payload",
+                },
+            )
+        ):
+            # The regular path reports missing data and handles load shedding
+            _do_symbolicate_event(symbolicate_task=symbolicate_task, data=data, **event)
+            continue
+        data = CanonicalKeyDict(data)
+        pending[id(data)] = (event, data)
+
+    def _continue_to_process_event(event: Dict[str, Any], data: Any) -> None:
+        # We cannot persist canonical types in the cache, so we need to
+        # downgrade this.
+        if isinstance(data, CANONICAL_TYPES):
+            data = dict(data.items())
+        store.do_process_event(
+            cache_key=processing.event_processing_store.store(data),
+            start_time=event["start_time"],
+            event_id=event["event_id"],
+            process_task=store.process_event_from_reprocessing,
+            data=data,
+            data_has_changed=True,
+            from_symbolicate=True,
+            has_attachments=event["has_attachments"],
+        )
+
+    # All events are known upfront, so batches are only bounded by size.
+    batcher = PayloadBatcher(max_wait=float("inf"))
+    try:
+        with metrics.timer("tasks.store.symbolicate_event_batch.symbolication"):
+            for event, data in list(pending.values()):
+                for symbolicated in batcher.add(data):
+                    _continue_to_process_event(*pending.pop(id(symbolicated)))
+            for symbolicated in batcher.flush():
+                _continue_to_process_event(*pending.pop(id(symbolicated)))
+    except Exception:
+        metrics.incr("tasks.store.symbolicate_event_batch.fatal")
+        error_logger.exception("tasks.store.symbolicate_event_batch.symbolication")
+
+    # Events of a failed batch are symbolicated one by one
+    for event, data in pending.values():
+        _do_symbolicate_event(symbolicate_task=symbolicate_task, **event)
+
+
+@instrumented_task(  # type: ignore
+    name="sentry.tasks.symbolication.symbolicate_event_batch_from_reprocessing",
+    queue="events.reprocessing.symbolicate_event",
+    time_limit=settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT + 30,
+    soft_time_limit=settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT + 20,
+    acks_late=True,
+)
+def symbolicate_event_batch_from_reprocessing(
+    events: List[Dict[str, Any]], **kwargs: Any
+) -> None:
+    """
+    Symbolicates several reprocessed native events, sending events that share
+    debug images to symbolicator in a single request.
+
+    :param list events: the `cache_key`, `start_time`, `event_id` and
+        `has_attachments` of every event
+    """
+    return _do_symbolicate_event_batch(events, symbolicate_event_from_reprocessing)
+
+
+@instrumented_task(  # type: ignore
+    name="sentry.tasks.symbolication.symbolicate_event_batch_from_reprocessing_low_priority",
+    queue="events.reprocessing.symbolicate_event_low_priority",
+    time_limit=settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT + 30,
+    soft_time_limit=settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT + 20,
+    acks_late=True,
+)
+def symbolicate_event_batch_from_reprocessing_low_priority(
+    events: List[Dict[str, Any]], **kwargs: Any
+) -> None:
+    return _do_symbolicate_event_batch(events, symbolicate_event_from_reprocessing_low_priority)
@@ -86,11 +86,16 @@ def Feature(names):
             feature_names = {name: True for name in names if name.startswith("organization")}
             return {f"organization:{organization.id}": feature_names}
 
+    def features_many_override(feature_names, *args, **kwargs):
+        return {name: features_override(name, *args, **kwargs) for name in feature_names}
+
     with patch("sentry.features.has") as features_has:
         features_has.side_effect = features_override
-        with patch("sentry.features.batch_has") as features_batch_has:
-            features_batch_has.side_effect = batch_features_override
-            yield
+        with patch("sentry.features.has_many") as features_has_many:
+            features_has_many.side_effect = features_many_override
+            with patch("sentry.features.batch_has") as features_batch_has:
+                features_batch_has.side_effect = batch_features_override
+                yield
 
 
 def with_feature(feature):
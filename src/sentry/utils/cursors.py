@@ -84,6 +84,27 @@ class StringCursor(Cursor):
             raise ValueError
 
 
+class KeysetCursor(Cursor):
+    """
+    A cursor for keyset pagination. The value is a composite ``<sort value>,<id>``
+    key of the row the page starts after (or before, for previous cursors), and
+    the offset is always zero.
+    """
+
+    @classmethod
+    def from_string(cls, cursor_str: str) -> KeysetCursor:
+        bits = cursor_str.rsplit(":", 2)
+        if len(bits) != 3:
+            raise ValueError
+        value = bits[0]
+        if value != "0" and "," not in value:
+            raise ValueError
+        try:
+            return KeysetCursor(0 if value == "0" else value, int(bits[1]), int(bits[2]))
+        except (TypeError, ValueError):
+            raise ValueError
+
+
 class CursorResult(Sequence[T]):
     def __init__(
         self,
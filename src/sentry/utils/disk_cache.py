@@ -0,0 +1,386 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Callable, Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".index.sqlite3"
+# Files are written here first and then moved into place, so that partial
+# files of interrupted writes never end up next to the cached files.
+TEMP_DIRNAME = ".tmp"
+
+# Reads of a file within this many seconds of its last recorded access do not
+# update the index, so hot files do not cause a write transaction per read.
+ACCESS_UPDATE_INTERVAL = 60
+
+# Number of keys per index for which the last recorded access is remembered
+TOUCHED_CACHE_SIZE = 10000
+
+# The total size of all entries is kept in the `meta` table by triggers, so
+# that writes don't need to sum up the sizes of all entries.
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE meta SET value = value + NEW.size WHERE key = 'total_size';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE meta SET value = value - OLD.size WHERE key = 'total_size';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE meta SET value = value - OLD.size + NEW.size WHERE key = 'total_size';
+END;
+INSERT OR IGNORE INTO meta (key, value)
+    SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries;
+COMMIT;
+"""
+
+
+class _Index:
+    """
+    The SQLite index of a cache directory, shared by all ``DiskCache``
+    instances of a process.
+
+    The connection is opened once per process and serialized with a lock.
+    After a fork, the child opens its own connection on first use.
+    """
+
+    def __init__(self, path: str, index_path: str) -> None:
+        self.path = path
+        self.index_path = index_path
+        self.touched: LRUCache[str, float] = LRUCache(TOUCHED_CACHE_SIZE)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(self.path, exist_ok=True)
+        conn = sqlite3.connect(
+            self.index_path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            pid = os.getpid()
+            if self._conn is None or self._pid != pid:
+                # Never close a connection inherited from the parent process,
+                # it is still in use there.
+                self._conn = None
+                self.touched.clear()
+                self._conn = self._open()
+                self._pid = pid
+
+            try:
+                yield self._conn
+            except sqlite3.Error:
+                # Reconnect on the next access in case the index was replaced
+                self._conn.close()
+                self._conn = None
+                raise
+
+
+_indexes: Dict[str, _Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_index(path: str) -> _Index:
+    index_path = os.path.join(path, INDEX_FILENAME)
+    with _indexes_lock:
+        index = _indexes.get(index_path)
+        if index is None:
+            index = _indexes[index_path] = _Index(path, index_path)
+        return index
+
+
+class DiskCache:
+    """
+    A size-bounded cache of files in a directory shared by all processes of a
+    worker host.
+
+    Every cached file is tracked in a small SQLite index next to the files,
+    recording its size and when it was last read. When a write pushes the
+    total size of the cache over ``max_size``, the least recently used files
+    are removed until the cache fits again, so eviction never has to walk the
+    directory tree. Access times are recorded at most once per
+    ``access_update_interval`` seconds per file and process.
+
+    Keys are relative paths within the cache directory. Files written by
+    earlier versions that are not yet in the index are adopted on their next
+    read, and removed by ``clear_old_entries`` once they are older than its
+    ``max_age``. Once none are left, the directory tree is no longer walked.
+    Failures to access the index are logged and otherwise ignored, so a
+    broken index degrades to an unbounded cache instead of failing reads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int,
+        metrics_prefix: str = "disk_cache",
+        access_update_interval: float = ACCESS_UPDATE_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.metrics_prefix = metrics_prefix
+        self.access_update_interval = access_update_interval
+        self._index = _get_index(path)
+
+    @property
+    def temp_path(self) -> str:
+        return os.path.join(self.path, TEMP_DIRNAME)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the path of the cached file for ``key`` and mark it as
+        recently used, or ``None`` if the file is not cached.
+        """
+        path = self.get_path(key)
+        now = time.time()
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+
+        touched = self._index.touched.get(key)
+        if touched is not None and now - touched < self.access_update_interval:
+            return path
+
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+        try:
+            with self._index.connect() as conn:
+                conn.execute(
+                    "INSERT INTO entries (key, size, accessed) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET accessed = excluded.accessed",
+                    (key, size, now),
+                )
+            self._index.touched.set(key, now)
+        except sqlite3.Error:
+            logger.warning("disk_cache.index_error", exc_info=True)
+
+        return path
+
+    def put(self, key: str, write: Callable[[str], None]) -> str:
+        """
+        Store a file under ``key`` and return its path.
+
+        ``write`` receives a path in the temporary directory of the cache to
+        create the file at, which is then moved into place unless another
+        process did so in the meantime. Afterwards, least recently used files
+        are evicted if the cache exceeds its size budget.
+        """
+        path = self.get_path(key)
+        temp_path = os.path.join(self.temp_path, uuid4().hex)
+        os.makedirs(self.temp_path, exist_ok=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            write(temp_path)
+            # Never replace a file that another process may be reading already.
+            if not os.path.exists(path):
+                os.rename(temp_path, path)
+        finally:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+
+        size = os.stat(path).st_size
+        now = time.time()
+
+        try:
+            with self._index.connect() as conn:
+                conn.execute(
+                    "INSERT INTO entries (key, size, accessed) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE "
+                    "SET size = excluded.size, accessed = excluded.accessed",
+                    (key, size, now),
+                )
+                self._index.touched.set(key, now)
+                self._evict(conn, self.max_size, keep=key)
+        except sqlite3.Error:
+            logger.warning("disk_cache.index_error", exc_info=True)
+
+        return path
+
+    def get_or_put(self, key: str, write: Callable[[str], None]) -> Tuple[str, bool]:
+        """
+        Return the path of the cached file for ``key``, writing it with
+        ``write`` on a miss, along with whether the file was already cached.
+        """
+        path = self.get(key)
+        if path is not None:
+            return path, True
+        return self.put(key, write), False
+
+    def open(self, key: str, write: Callable[[str], None]) -> Tuple[IO[bytes], bool]:
+        """
+        Like ``get_or_put``, but return the opened file. A file evicted by
+        another process before it could be opened is treated as a miss.
+        """
+        path, hit = self.get_or_put(key, write)
+        try:
+            return open(path, "rb"), hit
+        except FileNotFoundError:
+            self._forget(key)
+        return open(self.put(key, write), "rb"), False
+
+    def clear_old_entries(self, max_age: Optional[int] = None) -> None:
+        """
+        Remove files until the cache fits its size budget and, if ``max_age``
+        is given, all files that have not been read for that many seconds.
+        """
+        try:
+            with self._index.connect() as conn:
+                if max_age is not None:
+                    cutoff = time.time() - max_age
+                    expired = conn.execute(
+                        "SELECT key FROM entries WHERE accessed < ?", (cutoff,)
+                    ).fetchall()
+                    for (key,) in expired:
+                        self._remove(conn, key)
+                    self._remove_temp_files(cutoff)
+                    if not self._get_meta(conn, "untracked_removed"):
+                        self._remove_untracked(conn, cutoff)
+                self._evict(conn, self.max_size)
+        except sqlite3.Error:
+            logger.warning("disk_cache.index_error", exc_info=True)
+
+    def total_size(self) -> int:
+        with self._index.connect() as conn:
+            return self._total_size(conn)
+
+    def _total_size(self, conn: sqlite3.Connection) -> int:
+        return self._get_meta(conn, "total_size") or 0
+
+    def _get_meta(self, conn: sqlite3.Connection, key: str) -> Optional[int]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: int) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _evict(self, conn: sqlite3.Connection, max_size: int, keep: Optional[str] = None) -> None:
+        total = self._total_size(conn)
+        metrics.gauge(f"{self.metrics_prefix}.size", total)
+        if total <= max_size:
+            return
+
+        evicted = 0
+        # The rows are read lazily through the index on `accessed`, so that
+        # only as many are read as need to be evicted.
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            if total <= max_size:
+                break
+            if key == keep:
+                continue
+            self._remove(conn, key)
+            total -= size
+            evicted += 1
+
+        metrics.incr(f"{self.metrics_prefix}.evictions", amount=evicted)
+
+    def _remove_temp_files(self, cutoff: float) -> None:
+        # Files of interrupted writes are left behind in the temporary
+        # directory, which is flat and can be swept without walking the tree.
+        removed = 0
+        try:
+            entries = list(os.scandir(self.temp_path))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning("disk_cache.remove_failed", exc_info=True)
+
+        metrics.incr(f"{self.metrics_prefix}.temp_removals", amount=removed)
+
+    def _remove_untracked(self, conn: sqlite3.Connection, cutoff: float) -> None:
+        # Files that are not in the index, such as those written by earlier
+        # versions, are only adopted when they are read. Remove the ones that
+        # are never read again by mtime. Once there are none left, this is
+        # recorded in the index so that the tree is not walked again.
+        tracked = {key for (key,) in conn.execute("SELECT key FROM entries")}
+        removed = 0
+        remaining = 0
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            if dirpath == self.path and TEMP_DIRNAME in dirnames:
+                dirnames.remove(TEMP_DIRNAME)
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.path)
+                if key in tracked or key.startswith(INDEX_FILENAME):
+                    continue
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                    else:
+                        remaining += 1
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    remaining += 1
+                    logger.warning("disk_cache.remove_failed", exc_info=True)
+
+        if not remaining:
+            self._set_meta(conn, "untracked_removed", 1)
+        metrics.incr(f"{self.metrics_prefix}.untracked_removals", amount=removed)
+
+    def _remove(self, conn: sqlite3.Connection, key: str) -> None:
+        # Readers that already opened the file keep a valid handle after the
+        # unlink, so files can be removed while they are in use.
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("disk_cache.remove_failed", exc_info=True)
+            return
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._index.touched.delete(key)
+
+    def _forget(self, key: str) -> None:
+        self._index.touched.delete(key)
+        try:
+            with self._index.connect() as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error:
+            logger.warning("disk_cache.index_error", exc_info=True)
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar, Union
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+__unset__ = object()
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A thread-safe, bounded, in-process least-recently-used cache.
+
+    The cache is bounded by the number of entries (``maxsize``) and optionally
+    by the total weight of its values (``max_weight``), where the weight of a
+    value is computed by ``weigher`` when the value is inserted. Entries that
+    are heavier than ``max_weight`` on their own are never stored.
+
+    Hit and miss counters are kept so that callers can report cache
+    efficiency through metrics; they can be reset with ``reset_stats``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        max_weight: Optional[int] = None,
+        weigher: Optional[Callable[[V], int]] = None,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        if (max_weight is None) != (weigher is None):
+            raise ValueError("max_weight and weigher must be provided together")
+
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weigher = weigher
+
+        self.__data: "OrderedDict[K, Tuple[V, int]]" = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__weight = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.__data
+
+    @property
+    def weight(self) -> int:
+        return self.__weight
+
+    def get(self, key: K, default: Union[V, None] = None) -> Union[V, None]:
+        with self.__lock:
+            try:
+                value, _ = self.__data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.__data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        weight = self.weigher(value) if self.weigher is not None else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        with self.__lock:
+            previous = self.__data.pop(key, __unset__)
+            if previous is not __unset__:
+                self.__weight -= previous[1]  # type: ignore
+
+            self.__data[key] = (value, weight)
+            self.__weight += weight
+
+            while len(self.__data) > self.maxsize or (
+                self.max_weight is not None and self.__weight > self.max_weight
+            ):
+                _, (_, evicted_weight) = self.__data.popitem(last=False)
+                self.__weight -= evicted_weight
+                self.evictions += 1
+
+    def get_or_set(self, key: K, factory: Callable[[], V]) -> V:
+        """
+        Return the cached value for ``key``, computing and storing it with
+        ``factory`` on a miss. The factory is called outside of the lock, so
+        concurrent misses for the same key may compute the value twice.
+        """
+        value = self.get(key, __unset__)  # type: ignore
+        if value is __unset__:
+            value = factory()
+            self.set(key, value)  # type: ignore
+        return value  # type: ignore
+
+    def delete(self, key: K) -> None:
+        with self.__lock:
+            previous = self.__data.pop(key, __unset__)
+            if previous is not __unset__:
+                self.__weight -= previous[1]  # type: ignore
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__data.clear()
+            self.__weight = 0
+
+    def reset_stats(self) -> Tuple[int, int]:
+        """
+        Reset the hit and miss counters, returning their previous values.
+        """
+        with self.__lock:
+            stats = (self.hits, self.misses)
+            self.hits = self.misses = 0
+            return stats
@@ -5,12 +5,14 @@ import logging
 import os
 import random
 import re
+import time
 from abc import ABC, abstractmethod
+from array import array
 from collections import defaultdict, deque
 from dataclasses import dataclass
 from datetime import timedelta
 from enum import Enum
-from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
 import sentry_sdk
@@ -22,6 +24,7 @@ from sentry.models import Organization, Project, ProjectDebugFile, ProjectOption
 from sentry.types.issues import GROUP_TYPE_TO_TEXT, GroupType
 from sentry.utils import metrics
 from sentry.utils.event_frames import get_sdk_name
+from sentry.utils.lru import LRUCache
 from sentry.utils.safe import get_path
 
 from .performance_span_issue import PerformanceSpanProblem
@@ -32,6 +35,10 @@ def join_regexes(regexes: Sequence[str]) -> str:
 
 
 PERFORMANCE_GROUP_COUNT_LIMIT = 10
+# How long (in seconds) compiled detection settings are reused within a worker
+# before options, project options and feature flags are read again.
+DETECTION_SETTINGS_CACHE_TTL = 30
+DETECTION_SETTINGS_CACHE_SIZE = 5000
 INTEGRATIONS_OF_INTEREST = [
     "django",
     "flask",
@@ -63,6 +70,18 @@ class DetectorType(Enum):
     M_N_PLUS_ONE_DB = "m_n_plus_one_db"
 
 
+class SpanFeature(Enum):
+    """
+    Per-span values that several detectors derive from the same span. Detectors
+    declare the features they need and the detection engine computes each of
+    them once per event instead of once per detector.
+    """
+
+    DURATION = "duration"
+    FINGERPRINT = "fingerprint"
+    UPPER_DESCRIPTION = "upper_description"
+
+
 DETECTOR_TYPE_TO_GROUP_TYPE = {
     DetectorType.SLOW_SPAN: GroupType.PERFORMANCE_SLOW_SPAN,
     DetectorType.RENDER_BLOCKING_ASSET_SPAN: GroupType.PERFORMANCE_RENDER_BLOCKING_ASSET_SPAN,
@@ -318,7 +337,7 @@ def _detect_performance_problems(data: Event, sdk_span: Any) -> List[Performance
     event_id = data.get("event_id", None)
     project_id = data.get("project")
 
-    detection_settings = get_detection_settings(project_id)
+    detection_settings = get_cached_detection_config(project_id).settings
     detectors = {
         DetectorType.CONSECUTIVE_DB_OP: ConsecutiveDBSpanDetector(detection_settings, data),
         DetectorType.SLOW_SPAN: SlowSpanDetector(detection_settings, data),
@@ -334,8 +353,7 @@ def _detect_performance_problems(data: Event, sdk_span: Any) -> List[Performance
         DetectorType.M_N_PLUS_ONE_DB: MNPlusOneDBSpanDetector(detection_settings, data),
     }
 
-    for _, detector in detectors.items():
-        run_detector_on_data(detector, data)
+    run_detectors_on_data(list(detectors.values()), data)
 
     # Metrics reporting only for detection, not created issues.
     report_metrics_for_detectors(data, event_id, detectors, sdk_span)
@@ -374,31 +392,163 @@ def _detect_performance_problems(data: Event, sdk_span: Any) -> List[Performance
 
 
 def run_detector_on_data(detector, data):
-    if not detector.is_event_eligible(data):
+    run_detectors_on_data([detector], data)
+
+
+def run_detectors_on_data(detectors: Sequence[PerformanceDetector], data: Event) -> None:
+    """
+    Walks the spans of the event once, dispatching each span to every eligible
+    detector in order. Span features required by any of the detectors are
+    computed up front and shared between them.
+    """
+    eligible_detectors = [detector for detector in detectors if detector.is_event_eligible(data)]
+    if not eligible_detectors:
         return
 
     spans = data.get("spans", [])
+    required_features = frozenset().union(
+        *(detector.required_span_features for detector in eligible_detectors)
+    )
+    span_features = SpanFeatures(spans, required_features)
+    for detector in eligible_detectors:
+        detector.span_features = span_features
+
+    visitors = [detector.visit_span for detector in eligible_detectors]
     for span in spans:
-        detector.visit_span(span)
+        for visit_span in visitors:
+            visit_span(span)
 
-    detector.on_complete()
+    for detector in eligible_detectors:
+        detector.on_complete()
 
 
 # Uses options and flags to determine which orgs and which detectors automatically create performance issues.
 def get_allowed_issue_creation_detectors(project_id: str):
+    issue_creation_rates = get_cached_detection_config(project_id).get_issue_creation_rates()
+
+    allowed_detectors = set()
+    for detector_type, rate in issue_creation_rates.items():
+        if rate and rate > random.random():
+            allowed_detectors.add(detector_type)
+
+    return allowed_detectors
+
+
+def get_issue_creation_rates(project_id: str) -> Dict[DetectorType, float]:
     project = Project.objects.get_from_cache(id=project_id)
     organization = Organization.objects.get_from_cache(id=project.organization_id)
     if not features.has("organizations:performance-issues-ingest", organization):
         # Only organizations with this non-flagr feature have performance issues created.
         return {}
 
-    allowed_detectors = set()
-    for detector_type, system_option in DETECTOR_TYPE_ISSUE_CREATION_TO_SYSTEM_OPTION.items():
-        rate = options.get(system_option)
-        if rate and rate > random.random():
-            allowed_detectors.add(detector_type)
+    return {
+        detector_type: options.get(system_option)
+        for detector_type, system_option in DETECTOR_TYPE_ISSUE_CREATION_TO_SYSTEM_OPTION.items()
+    }
 
-    return allowed_detectors
+
+def _get_project_settings_option(project_id: Optional[str]) -> Any:
+    # Served from the project option cache, which `ProjectOptionManager.reload_cache`
+    # refreshes for every process on each write to the project's options.
+    if not project_id:
+        return None
+    return ProjectOption.objects.get_all_values(project_id).get(
+        "sentry:performance_issue_settings"
+    )
+
+
+class DetectionConfig:
+    """
+    The detection settings and issue creation rates of a single project,
+    compiled from options, project options and feature flags. Issue creation
+    rates are only resolved when first needed, since they require the project
+    and organization to be fetched.
+
+    The project's performance issue settings option and the options version
+    are recorded so that the config can be rebuilt as soon as either changes.
+    """
+
+    __slots__ = (
+        "project_id",
+        "settings",
+        "project_option",
+        "options_version",
+        "expires_at",
+        "_issue_creation_rates",
+    )
+
+    def __init__(
+        self,
+        project_id: Optional[str],
+        settings: Dict[DetectorType, Any],
+        project_option: Any,
+        options_version: Optional[str],
+        ttl: float,
+    ):
+        self.project_id = project_id
+        self.settings = settings
+        self.project_option = project_option
+        self.options_version = options_version
+        self.expires_at = time.monotonic() + ttl
+        self._issue_creation_rates: Optional[Dict[DetectorType, float]] = None
+
+    @property
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def get_issue_creation_rates(self) -> Dict[DetectorType, float]:
+        if self._issue_creation_rates is None:
+            self._issue_creation_rates = get_issue_creation_rates(self.project_id)
+        return self._issue_creation_rates
+
+
+_detection_config_cache: LRUCache[Optional[str], DetectionConfig] = LRUCache(
+    maxsize=DETECTION_SETTINGS_CACHE_SIZE
+)
+
+
+def get_cached_detection_config(project_id: Optional[str] = None) -> DetectionConfig:
+    """
+    Returns the compiled detection config of the project from an in-process
+    cache, rebuilding it once `DETECTION_SETTINGS_CACHE_TTL` has passed. Changes
+    to the project's performance issue settings, made in any process, invalidate
+    the entry immediately. Changes to system options invalidate it once this
+    process has refreshed its options and seen a new options version. Feature
+    flags have no such version and are only picked up when the entry expires.
+    """
+    project_option = _get_project_settings_option(project_id)
+    options_version = options.default_store.get_version()
+    config = _detection_config_cache.get(project_id)
+    if (
+        config is not None
+        and not config.is_expired
+        and config.project_option == project_option
+        and config.options_version == options_version
+    ):
+        metrics.incr("performance.detection_settings.cache", tags={"hit": True}, sample_rate=0.01)
+        return config
+
+    metrics.incr("performance.detection_settings.cache", tags={"hit": False}, sample_rate=0.01)
+    config = DetectionConfig(
+        project_id,
+        get_detection_settings(project_id),
+        project_option,
+        options_version,
+        DETECTION_SETTINGS_CACHE_TTL,
+    )
+    _detection_config_cache.set(project_id, config)
+    return config
+
+
+def invalidate_detection_config(project_id: Optional[str] = None) -> None:
+    """
+    Drops the cached detection config of the project, or of every project if
+    no project id is given.
+    """
+    if project_id is None:
+        _detection_config_cache.clear()
+    else:
+        _detection_config_cache.delete(project_id)
 
 
 def prepare_problem_for_grouping(
@@ -513,14 +663,80 @@ def total_span_time(span_list: List[Dict[str, Any]]) -> float:
     return total_duration * 1000
 
 
+_UNSET_FEATURE = object()
+
+
+class SpanFeatures:
+    """
+    Column-oriented store of the span features required by the detectors of a
+    single event, indexed by the position of the span in the event.
+
+    Durations are kept as integer microseconds in an array so that they
+    round-trip exactly to the `timedelta` returned by `get_span_duration`.
+    Fingerprints are costly and only needed for some spans, so they are
+    computed on first use and memoized.
+    Spans that are not part of the event (eg. the root span) fall back to
+    computing the feature on the fly.
+    """
+
+    __slots__ = ("_index", "_durations", "_fingerprints", "_upper_descriptions")
+
+    def __init__(self, spans: Sequence[Span], features: AbstractSet[SpanFeature]):
+        self._index = {id(span): i for i, span in enumerate(spans)}
+        self._durations = (
+            array("q", (_duration_microseconds(span) for span in spans))
+            if SpanFeature.DURATION in features
+            else None
+        )
+        self._fingerprints: Optional[List[Any]] = (
+            [_UNSET_FEATURE] * len(spans) if SpanFeature.FINGERPRINT in features else None
+        )
+        self._upper_descriptions = (
+            [(span.get("description", "") or "").upper() for span in spans]
+            if SpanFeature.UPPER_DESCRIPTION in features
+            else None
+        )
+
+    def duration(self, span: Span) -> timedelta:
+        index = self._index.get(id(span))
+        if self._durations is None or index is None:
+            return get_span_duration(span)
+        return timedelta(microseconds=self._durations[index])
+
+    def fingerprint(self, span: Span) -> Optional[str]:
+        index = self._index.get(id(span))
+        if self._fingerprints is None or index is None:
+            return fingerprint_span(span)
+        fingerprint = self._fingerprints[index]
+        if fingerprint is _UNSET_FEATURE:
+            fingerprint = self._fingerprints[index] = fingerprint_span(span)
+        return fingerprint
+
+    def upper_description(self, span: Span) -> str:
+        index = self._index.get(id(span))
+        if self._upper_descriptions is None or index is None:
+            return (span.get("description", "") or "").upper()
+        return self._upper_descriptions[index]
+
+
+def _duration_microseconds(span: Span) -> int:
+    duration = get_span_duration(span)
+    return (duration.days * 86400 + duration.seconds) * 1000000 + duration.microseconds
+
+
 class PerformanceDetector(ABC):
     """
     Classes of this type have their visit functions called as the event is walked once and will store a performance issue if one is detected.
     """
 
+    # The span features this detector reads through `span_features`. They are
+    # precomputed once per event when running detectors with `run_detectors_on_data`.
+    required_span_features: AbstractSet[SpanFeature] = frozenset()
+
     def __init__(self, settings: Dict[DetectorType, Any], event: Event):
         self.settings = settings[self.settings_key]
         self._event = event
+        self.span_features = SpanFeatures([], frozenset())
         self.init()
 
     @abstractmethod
@@ -539,7 +755,7 @@ class PerformanceDetector(ABC):
         if not op or not span_id:
             return None
 
-        span_duration = get_span_duration(span)
+        span_duration = self.span_features.duration(span)
         for setting in self.settings:
             op_prefix = self.find_span_prefix(setting, op)
             if op_prefix:
@@ -579,6 +795,7 @@ class SlowSpanDetector(PerformanceDetector):
     __slots__ = "stored_problems"
 
     settings_key = DetectorType.SLOW_SPAN
+    required_span_features = frozenset({SpanFeature.DURATION, SpanFeature.FINGERPRINT})
 
     def init(self):
         self.stored_problems = {}
@@ -590,7 +807,7 @@ class SlowSpanDetector(PerformanceDetector):
         op, span_id, op_prefix, span_duration, settings = settings_for_span
         duration_threshold = settings.get("duration_threshold")
 
-        fingerprint = fingerprint_span(span)
+        fingerprint = self.span_features.fingerprint(span)
 
         if not fingerprint:
             return
@@ -616,6 +833,7 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
     __slots__ = ("stored_problems", "fcp", "transaction_start")
 
     settings_key = DetectorType.RENDER_BLOCKING_ASSET_SPAN
+    required_span_features = frozenset({SpanFeature.DURATION, SpanFeature.FINGERPRINT})
 
     def init(self):
         self.stored_problems = {}
@@ -648,7 +866,7 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
 
         if self._is_blocking_render(span):
             span_id = span.get("span_id", None)
-            fingerprint = fingerprint_span(span)
+            fingerprint = self.span_features.fingerprint(span)
             if span_id and fingerprint:
                 self.stored_problems[fingerprint] = PerformanceProblem(
                     fingerprint=fingerprint,
@@ -674,7 +892,7 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
         if span_end_timestamp >= fcp_timestamp:
             return False
 
-        span_duration = get_span_duration(span)
+        span_duration = self.span_features.duration(span)
         fcp_ratio_threshold = self.settings.get("fcp_ratio_threshold")
         return span_duration / self.fcp > fcp_ratio_threshold
 
@@ -693,6 +911,7 @@ class NPlusOneAPICallsDetector(PerformanceDetector):
 
     __slots__ = ["stored_problems"]
     settings_key: DetectorType = DetectorType.N_PLUS_ONE_API_CALLS
+    required_span_features = frozenset({SpanFeature.DURATION})
 
     HOST_DENYLIST = []
 
@@ -710,7 +929,7 @@ class NPlusOneAPICallsDetector(PerformanceDetector):
             return
 
         duration_threshold = timedelta(milliseconds=self.settings.get("duration_threshold"))
-        span_duration = get_span_duration(span)
+        span_duration = self.span_features.duration(span)
 
         if span_duration < duration_threshold:
             return
@@ -851,6 +1070,7 @@ class ConsecutiveDBSpanDetector(PerformanceDetector):
     __slots__ = "stored_problems"
 
     settings_key = DetectorType.CONSECUTIVE_DB_OP
+    required_span_features = frozenset({SpanFeature.DURATION, SpanFeature.UPPER_DESCRIPTION})
 
     def init(self):
         self.stored_problems: dict[str, PerformanceProblem] = {}
@@ -879,7 +1099,7 @@ class ConsecutiveDBSpanDetector(PerformanceDetector):
             "consecutive_count_threshold"
         )
         exceeds_span_duration_threshold = all(
-            get_span_duration(span).total_seconds() * 1000
+            self.span_features.duration(span).total_seconds() * 1000
             > self.settings.get("span_duration_threshold")
             for span in independent_db_spans
         )
@@ -915,7 +1135,7 @@ class ConsecutiveDBSpanDetector(PerformanceDetector):
         "Given a list of spans, find the sum of the span durations in milliseconds"
         sum = 0
         for span in spans:
-            sum += get_span_duration(span).total_seconds() * 1000
+            sum += self.span_features.duration(span).total_seconds() * 1000
         return sum
 
     def _find_independent_spans(self, spans: list[Span]) -> list[Span]:
@@ -929,7 +1149,7 @@ class ConsecutiveDBSpanDetector(PerformanceDetector):
             if (
                 query
                 and contains_complete_query(span)
-                and "WHERE" not in query.upper()
+                and "WHERE" not in self.span_features.upper_description(span)
                 and not CONTAINS_PARAMETER_REGEX.search(query)
             ):
                 independent_spans.append(span)
@@ -950,9 +1170,10 @@ class ConsecutiveDBSpanDetector(PerformanceDetector):
 
     def _is_db_query(self, span: Span) -> bool:
         op: str = span.get("op", "") or ""
-        description: str = span.get("description", "") or ""
         is_db_op = op == "db" or op.startswith("db.sql")
-        is_query = "SELECT" in description.upper()  # TODO - make this more elegant
+        is_query = (
+            "SELECT" in self.span_features.upper_description(span)
+        )  # TODO - make this more elegant
         return is_db_op and is_query
 
     def _fingerprint(self) -> str:
@@ -999,6 +1220,7 @@ class NPlusOneDBSpanDetector(PerformanceDetector):
     )
 
     settings_key = DetectorType.N_PLUS_ONE_DB_QUERIES
+    required_span_features = frozenset({SpanFeature.DURATION})
 
     def init(self):
         self.stored_problems = {}
@@ -1107,7 +1329,7 @@ class NPlusOneDBSpanDetector(PerformanceDetector):
         # Do the spans take enough total time?
         total_duration = timedelta()
         for span in self.n_spans:
-            total_duration += get_span_duration(span)
+            total_duration += self.span_features.duration(span)
         if total_duration < duration_threshold:
             return
 
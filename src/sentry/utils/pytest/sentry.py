@@ -103,6 +103,10 @@ def pytest_configure(config):
     # enable draft features
     settings.SENTRY_OPTIONS["mail.enable-replies"] = True
 
+    # fetch JavaScript sources on the test thread, so that fetches see data
+    # created within the test's transaction
+    settings.SENTRY_OPTIONS["processing.javascript.fetch-concurrency"] = 1
+
     settings.SENTRY_ALLOW_ORIGIN = "*"
 
     settings.SENTRY_TSDB = "sentry.tsdb.redissnuba.RedisSnubaTSDB"
@@ -299,6 +303,10 @@ def pytest_runtest_teardown(item):
     for model in (OrganizationOption, ProjectOption, UserOption):
         model.objects.clear_local_cache()
 
+    from sentry.utils.performance_issues.performance_detection import invalidate_detection_config
+
+    invalidate_detection_config()
+
     Hub.main.bind_client(None)
 
 
@@ -252,3 +252,38 @@ def bulk_delete_objects(
         )
 
     return has_more
+
+
+def bulk_delete_objects_by_id(model, ids, partition_key=None):
+    """
+    Deletes the rows of ``model`` with the given primary keys in a single
+    query and returns the number of deleted rows.
+
+    Unlike ``QuerySet.delete`` this neither collects related objects nor sends
+    signals, so it must only be used for models without resident relations.
+    """
+    if not ids:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+
+    query = []
+    params = []
+    if partition_key:
+        for column, value in partition_key.items():
+            query.append(f"{quote_name(column)} = %s")
+            params.append(value)
+
+    query.append("id = any(%s)")
+    params.append(list(ids))
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "delete from {} where {}".format(
+            quote_name(model._meta.db_table),
+            " AND ".join(query),
+        ),
+        params,
+    )
+    return cursor.rowcount
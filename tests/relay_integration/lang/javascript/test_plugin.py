@@ -11,6 +11,7 @@ from sentry.models import File, Release, ReleaseFile
 from sentry.models.releasefile import update_artifact_index
 from sentry.testutils import RelayStoreHelper, SnubaTestCase, TransactionTestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.testutils.helpers.options import override_options
 from sentry.utils import json
 
 BASE64_SOURCEMAP = "data:application/json;base64," + (
@@ -728,6 +729,73 @@ class JavascriptIntegrationTest(RelayStoreHelper, SnubaTestCase, TransactionTest
             "\t\treturn multiply(add(a, b), a, b) / c;",
         ]
 
+    @responses.activate
+    @override_options({"processing.javascript.fetch-concurrency": 4})
+    def test_expansion_via_release_artifacts_concurrent_fetch(self):
+        # Sources are fetched on a thread pool, whose threads open their own
+        # database connections to read the release artifacts.
+        project = self.project
+        release = Release.objects.create(organization_id=project.organization_id, version="abc")
+        release.add_project(project)
+
+        for name in ("file1.js", "file2.js"):
+            with open(get_fixture_path(name), "rb") as f:
+                file = File.objects.create(
+                    name=name, type="release.file", headers={"Content-Type": "application/json"}
+                )
+                file.putfile(f)
+            ReleaseFile.objects.create(
+                name=f"http://example.com/{name}",
+                release_id=release.id,
+                organization_id=project.organization_id,
+                file=file,
+            )
+
+        data = {
+            "timestamp": self.min_ago,
+            "message": "hello",
+            "platform": "javascript",
+            "release": "abc",
+            "exception": {
+                "values": [
+                    {
+                        "type": "Error",
+                        "stacktrace": {
+                            "frames": [
+                                {
+                                    "abs_path": "http://example.com/file1.js",
+                                    "filename": "file1.js",
+                                    "lineno": 3,
+                                    "colno": 2,
+                                },
+                                {
+                                    "abs_path": "http://example.com/file2.js",
+                                    "filename": "file2.js",
+                                    "lineno": 3,
+                                    "colno": 2,
+                                },
+                            ]
+                        },
+                    }
+                ]
+            },
+        }
+
+        event = self.post_and_retrieve_event(data)
+
+        assert "errors" not in event.data
+
+        exception = event.interfaces["exception"]
+        frame_list = exception.values[0].stacktrace.frames
+
+        frame = frame_list[0]
+        assert frame.pre_context == ["function add(a, b) {", '\t"use strict";']
+        assert frame.context_line == "\treturn a + b; // fôo"
+
+        frame = frame_list[1]
+        assert frame.pre_context == ["function multiply(a, b) {", '\t"use strict";']
+        assert frame.context_line == "\treturn a * b;"
+
     @responses.activate
     def test_expansion_via_distribution_release_artifacts(self):
         project = self.project
@@ -2,6 +2,7 @@ from datetime import timedelta
 from unittest import TestCase as SimpleTestCase
 
 import pytest
+from django.db import connection
 from django.utils import timezone
 
 from sentry.api.paginator import (
@@ -11,6 +12,7 @@ from sentry.api.paginator import (
     CombinedQuerysetPaginator,
     DateTimePaginator,
     GenericOffsetPaginator,
+    KeysetPaginator,
     OffsetPaginator,
     Paginator,
     SequencePaginator,
@@ -19,7 +21,7 @@ from sentry.api.paginator import (
 from sentry.incidents.models import AlertRule
 from sentry.models import Rule, User
 from sentry.testutils import APITestCase, TestCase
-from sentry.utils.cursors import Cursor
+from sentry.utils.cursors import Cursor, KeysetCursor
 
 
 class PaginatorTest(TestCase):
@@ -360,6 +362,91 @@ class DateTimePaginatorTest(TestCase):
         assert result7[0] == res4
 
 
+class KeysetPaginatorTest(TestCase):
+    def test_ascending_with_ties(self):
+        joined = timezone.now()
+
+        # Rows sharing a sort value are ordered and paged by id.
+        res1 = self.create_user("foo@example.com", date_joined=joined)
+        res2 = self.create_user("bar@example.com", date_joined=joined)
+        res3 = self.create_user("baz@example.com", date_joined=joined)
+        res4 = self.create_user("qux@example.com", date_joined=joined + timedelta(seconds=1))
+
+        paginator = KeysetPaginator(User.objects.all(), "date_joined")
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res1, res2]
+        assert result1.next
+        assert not result1.prev
+        assert result1.next.offset == 0
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res3, res4]
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=1, cursor=result2.prev)
+        assert list(result3) == [res2]
+        assert result3.next
+        assert result3.prev
+
+        result4 = paginator.get_result(limit=5, cursor=result3.prev)
+        assert list(result4) == [res1]
+        assert result4.next
+        assert not result4.prev
+
+    def test_descending(self):
+        joined = timezone.now()
+
+        res1 = self.create_user("foo@example.com", date_joined=joined)
+        res2 = self.create_user("bar@example.com", date_joined=joined + timedelta(seconds=1))
+        res3 = self.create_user("baz@example.com", date_joined=joined + timedelta(seconds=2))
+
+        paginator = KeysetPaginator(User.objects.all(), "-date_joined")
+        result1 = paginator.get_result(limit=1, cursor=None)
+        assert list(result1) == [res3]
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res2, res1]
+        assert not result2.next
+
+        result3 = paginator.get_result(limit=2, cursor=result2.prev)
+        assert list(result3) == [res3]
+        assert result3.next
+        assert not result3.prev
+
+    def test_cursor_round_trip(self):
+        joined = timezone.now()
+        for i in range(3):
+            self.create_user(f"user{i}@example.com", date_joined=joined + timedelta(seconds=i))
+
+        paginator = KeysetPaginator(User.objects.all(), "date_joined")
+        result1 = paginator.get_result(limit=1, cursor=None)
+        cursor = KeysetCursor.from_string(str(result1.next))
+        assert str(cursor) == str(result1.next)
+
+        result2 = paginator.get_result(limit=1, cursor=cursor)
+        assert result2[0].date_joined > result1[0].date_joined
+
+        with pytest.raises(ValueError):
+            KeysetCursor.from_string("100:1:0")
+
+    def test_count_hits(self):
+        for i in range(3):
+            self.create_user(f"user{i}@example.com")
+
+        paginator = KeysetPaginator(User.objects.all(), "id")
+        assert paginator.get_result(limit=1, count_hits=True).hits == 3
+
+        # The estimate comes from the planner statistics, which are exact for
+        # a freshly analyzed small table.
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {User._meta.db_table}")
+
+        paginator = KeysetPaginator(User.objects.all(), "id", approximate_hits=True)
+        assert paginator.get_result(limit=1, count_hits=True).hits == 3
+        assert paginator.get_result(limit=1, count_hits=True, max_hits=2).hits == 2
+
+
 def test_reverse_bisect_left():
     assert reverse_bisect_left([], 0) == 0
 
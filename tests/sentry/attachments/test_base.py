@@ -1,6 +1,10 @@
 import copy
+import io
+import os
 
-from sentry.attachments.base import BaseAttachmentCache, CachedAttachment
+import pytest
+
+from sentry.attachments.base import BaseAttachmentCache, CachedAttachment, MissingAttachmentChunks
 
 
 class InMemoryCache:
@@ -110,3 +114,59 @@ def test_basic_rate_limited():
     assert att2.id == att.id == 0
     assert att2.data == att.data == b"Hello World! Bye."
     assert att2.rate_limited is True
+
+
+def test_open_chunked():
+    data = InMemoryCache()
+    cache = BaseAttachmentCache(data)
+
+    chunks = [os.urandom(3000), b"", os.urandom(5000)]
+    for chunk_index, chunk in enumerate(chunks):
+        cache.set_chunk("c:foo", 123, chunk_index, chunk)
+
+    att = CachedAttachment(key="c:foo", id=123, name="lol.bin", chunks=3)
+    cache.set("c:foo", [att])
+    (att2,) = cache.get("c:foo")
+    expected = b"".join(chunks)
+
+    with att2.open() as f:
+        assert f.read(10) == expected[:10]
+        assert f.read(4000) == expected[10:4010]
+        assert f.read() == expected[4010:]
+        assert f.read() == b""
+
+        f.seek(2990)
+        assert f.tell() == 2990
+        assert f.read(20) == expected[2990:3010]
+        f.seek(100, io.SEEK_CUR)
+        assert f.read(10) == expected[3110:3120]
+
+    # Streaming does not load the data into the attachment
+    assert att2.data == expected
+
+
+def test_open_unchunked():
+    data = InMemoryCache()
+    cache = BaseAttachmentCache(data)
+
+    att = CachedAttachment(name="lol.txt", content_type="text/plain", data=b"Hello World! Bye.")
+    cache.set("c:foo", [att])
+
+    (att2,) = cache.get("c:foo")
+    with att2.open() as f:
+        assert f.read() == b"Hello World! Bye."
+
+
+def test_open_missing_chunks():
+    data = InMemoryCache()
+    cache = BaseAttachmentCache(data)
+
+    cache.set_chunk("c:foo", 123, 0, b"Hello World! ")
+    att = CachedAttachment(key="c:foo", id=123, name="lol.txt", chunks=2)
+    cache.set("c:foo", [att])
+
+    (att2,) = cache.get("c:foo")
+    with att2.open() as f:
+        assert f.read(6) == b"Hello "
+        with pytest.raises(MissingAttachmentChunks):
+            f.read()
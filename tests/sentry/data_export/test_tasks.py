@@ -1,12 +1,17 @@
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 from django.db import IntegrityError
 
 from sentry.data_export.base import ExportQueryType
-from sentry.data_export.models import ExportedData
-from sentry.data_export.tasks import assemble_download, merge_export_blobs
+from sentry.data_export.models import ExportedData, ExportedDataBlob
+from sentry.data_export.tasks import (
+    ExportBlobWriter,
+    ExportRowFetcher,
+    assemble_download,
+    merge_export_blobs,
+)
 from sentry.exceptions import InvalidSearchQuery
-from sentry.models import File
+from sentry.models import File, FileBlob
 from sentry.search.events.constants import TIMEOUT_ERROR_MESSAGE
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
@@ -657,3 +662,69 @@ class AssembleDownloadLargeTest(TestCase, SnubaTestCase):
 class MergeExportBlobsTest(TestCase, SnubaTestCase):
     def test_task_persistent_name(self):
         assert merge_export_blobs.name == "sentry.data_export.tasks.merge_blobs"
+
+
+class ExportBlobWriterTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data_export = ExportedData.objects.create(
+            user=self.user,
+            organization=self.organization,
+            query_type=ExportQueryType.DISCOVER,
+            query_info={"project": [self.project.id], "field": ["title"], "query": ""},
+        )
+
+    def get_blobs(self):
+        return [
+            (export_blob.offset, FileBlob.objects.get(id=export_blob.blob_id).size)
+            for export_blob in ExportedDataBlob.objects.filter(
+                data_export=self.data_export
+            ).order_by("offset")
+        ]
+
+    def test_uploads_full_blobs(self):
+        writer = ExportBlobWriter(self.data_export, 10, blob_size=4)
+        writer.write(b"abcdef")
+        # The remainder is only uploaded on close
+        assert self.get_blobs() == [(10, 4)]
+        writer.write(b"gh")
+        writer.write(b"i")
+        assert writer.tell() == 9
+        assert writer.close() == 9
+        assert self.get_blobs() == [(10, 4), (14, 4), (18, 1)]
+
+    def test_abort(self):
+        ExportBlobWriter(self.data_export, 0, blob_size=4).write(b"abcd")
+        writer = ExportBlobWriter(self.data_export, 4, blob_size=4)
+        writer.write(b"efghij")
+        writer.abort()
+        assert self.get_blobs() == [(0, 4)]
+
+
+class ExportRowFetcherTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data_export = ExportedData(query_type=ExportQueryType.DISCOVER)
+        self.processor = Mock()
+        self.processor.data_fn.side_effect = lambda limit, offset: {
+            "data": [{"offset": offset + i} for i in range(limit)]
+        }
+        self.processor.handle_fields.side_effect = lambda rows: rows
+
+    def test_prefetch(self):
+        fetcher = ExportRowFetcher(self.processor, self.data_export, prefetch=True)
+        fetcher.prefetch(2, 4)
+        assert fetcher.fetch(2, 4) == [{"offset": 4}, {"offset": 5}]
+        assert self.processor.data_fn.call_count == 1
+
+        # A prefetched fragment that isn't requested is dropped
+        fetcher.prefetch(2, 6)
+        assert fetcher.fetch(1, 6) == [{"offset": 6}]
+        fetcher.close()
+
+    def test_prefetch_disabled(self):
+        fetcher = ExportRowFetcher(self.processor, self.data_export, prefetch=False)
+        fetcher.prefetch(2, 4)
+        assert self.processor.data_fn.call_count == 0
+        assert fetcher.fetch(2, 4) == [{"offset": 4}, {"offset": 5}]
+        fetcher.close()
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from sentry import deletions
+from sentry.deletions import BulkModelDeletionTask
+from sentry.models import GroupHash, GroupMeta
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
+from sentry.testutils.silo import region_silo_test
+
+
+@region_silo_test
+class BulkModelDeletionTaskTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = self.create_group()
+        self.other_group = self.create_group()
+        self.hashes = [
+            GroupHash.objects.create(project=self.project, group=self.group, hash=str(i) * 32)
+            for i in range(5)
+        ]
+        self.other_hash = GroupHash.objects.create(
+            project=self.project, group=self.other_group, hash="x" * 32
+        )
+
+    def test_chunk(self):
+        task = deletions.get(
+            model=GroupHash,
+            query={"group_id": self.group.id},
+            task=BulkModelDeletionTask,
+            chunk_size=2,
+        )
+
+        assert task.chunk()
+        assert GroupHash.objects.filter(group=self.group).count() == 3
+        assert task.last_id == self.hashes[1].id
+
+        while task.chunk():
+            pass
+
+        assert not GroupHash.objects.filter(group=self.group).exists()
+        assert GroupHash.objects.filter(id=self.other_hash.id).exists()
+
+    def test_join_query(self):
+        GroupMeta.objects.create(group=self.group, key="foo", value="bar")
+        GroupMeta.objects.create(group=self.other_group, key="foo", value="bar")
+
+        task = deletions.get(
+            model=GroupMeta,
+            query={"group__project": self.project.id},
+            task=BulkModelDeletionTask,
+        )
+        while task.chunk():
+            pass
+
+        assert not GroupMeta.objects.filter(group__project=self.project).exists()
+
+    @mock.patch("sentry.deletions.base.time.sleep")
+    def test_throttle(self, sleep):
+        task = deletions.get(
+            model=GroupHash,
+            query={"group_id": self.group.id},
+            task=BulkModelDeletionTask,
+        )
+
+        with override_options({"deletions.bulk.rows-per-second": 1}):
+            assert task.chunk()
+
+        assert sleep.call_count == 1
+        # Five rows at one row per second
+        assert 4 < sleep.call_args[0][0] <= 5
+
+        sleep.reset_mock()
+        assert not task.chunk()
+        assert sleep.call_count == 0
+
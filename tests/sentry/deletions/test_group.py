@@ -1,7 +1,7 @@
 from unittest import mock
 from uuid import uuid4
 
-from sentry import nodestore
+from sentry import deletions, nodestore
 from sentry.deletions.defaults.group import EventDataDeletionTask
 from sentry.eventstore.models import Event
 from sentry.models import (
@@ -17,6 +17,7 @@ from sentry.models import (
 from sentry.tasks.deletion import delete_groups
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.testutils.helpers.options import override_options
 from sentry.testutils.silo import region_silo_test
 
 
@@ -103,6 +104,47 @@ class DeleteGroupTest(TestCase, SnubaTestCase):
         assert not nodestore.get(self.node_id2)
         assert nodestore.get(self.node_id3), "Does not remove from second group"
 
+    @mock.patch("sentry.nodestore.delete_multi")
+    def test_event_data_concurrent(self, nodestore_delete_multi):
+        other_event = mock.Mock(event_id="d" * 32)
+        task = deletions.get(
+            task=EventDataDeletionTask, group_id=self.event.group_id, project_id=self.project.id
+        )
+
+        with override_options({"deletions.event-data.concurrency": 3}), mock.patch.object(
+            task, "fetch_events", side_effect=[[self.event], [other_event], []]
+        ) as fetch_events:
+            assert task.chunk()
+            # The next page is fetched while the first one is deleted
+            assert fetch_events.call_args_list == [mock.call(None), mock.call(self.event)]
+            assert task.chunk()
+            assert not task.chunk()
+
+        assert nodestore_delete_multi.call_args_list == [
+            mock.call([self.node_id]),
+            mock.call([Event.generate_node_id(self.project.id, other_event.event_id)]),
+        ]
+        assert not UserReport.objects.filter(event_id=self.event.event_id).exists()
+        assert not EventAttachment.objects.filter(event_id=self.event.event_id).exists()
+
+    @mock.patch("sentry.deletions.defaults.group.connections")
+    @mock.patch("sentry.nodestore.delete_multi")
+    def test_event_data_concurrent_error(self, nodestore_delete_multi, connections):
+        nodestore_delete_multi.side_effect = ValueError("nodestore is down")
+        task = deletions.get(
+            task=EventDataDeletionTask, group_id=self.event.group_id, project_id=self.project.id
+        )
+
+        with override_options({"deletions.event-data.concurrency": 3}), mock.patch.object(
+            task, "fetch_events", side_effect=[[self.event], []]
+        ), self.assertRaises(ValueError):
+            task.chunk()
+
+        assert task._executor is None
+        assert task._next_events is None
+        # The failed delete closed its thread's connections
+        assert connections.close_all.called
+
     @mock.patch("os.environ.get")
     @mock.patch("sentry.nodestore.delete_multi")
     def test_cleanup(self, nodestore_delete_multi, os_environ):
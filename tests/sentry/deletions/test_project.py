@@ -9,6 +9,7 @@ from sentry.models import (
     GroupAssignee,
     GroupMeta,
     GroupResolution,
+    GroupSnooze,
     Project,
     ProjectDebugFile,
     Release,
@@ -20,6 +21,7 @@ from sentry.models import (
 from sentry.tasks.deletion import run_deletion
 from sentry.testutils import TransactionTestCase
 from sentry.testutils.silo import region_silo_test
+from sentry.utils.cache import cache
 
 
 @region_silo_test
@@ -33,6 +35,7 @@ class DeleteProjectTest(TransactionTestCase):
         release = Release.objects.create(version="a" * 32, organization_id=project.organization_id)
         release.add_project(project)
         GroupResolution.objects.create(group=group, release=release)
+        GroupSnooze.objects.create(group=group, count=100)
         env = Environment.objects.create(
             organization_id=project.organization_id, project_id=project.id, name="foo"
         )
@@ -97,3 +100,6 @@ class DeleteProjectTest(TransactionTestCase):
         assert not ProjectDebugFile.objects.filter(id=dif.id).exists()
         assert not File.objects.filter(id=file.id).exists()
         assert not ServiceHook.objects.filter(id=hook.id).exists()
+        assert not GroupSnooze.objects.filter(group_id=group.id).exists()
+        # The snooze cache is cleared by its post_delete signal
+        assert cache.get(GroupSnooze.get_cache_key(group.id)) is False
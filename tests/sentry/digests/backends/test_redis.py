@@ -151,3 +151,22 @@ class RedisBackendTestCase(TestCase):
 
         with backend.digest("timeline", 0) as records:
             assert len(set(records)) == n
+
+    def test_schedule_batches(self):
+        backend = RedisBackend(schedule_batch_size=2)
+
+        timelines = {f"timeline:{i}" for i in range(5)}
+        for timeline in timelines:
+            backend.add(timeline, Record("record:1", "value", time.time()))
+
+        # Maintenance moves every ready timeline back to the waiting state,
+        # two timelines per script invocation, ...
+        backend.maintenance(time.time())
+
+        # ...and scheduling moves them all to the ready state again.
+        assert {entry.key for entry in backend.schedule(time.time())} == timelines
+        assert set(backend.schedule(time.time())) == set()
+
+        for timeline in timelines:
+            with backend.digest(timeline, 0) as records:
+                assert {record.key for record in records} == {"record:1"}
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import Iterable, Mapping, Sequence
+from unittest import mock
 
 from sentry.digests import Digest
 from sentry.digests.notifications import build_digest, event_to_record
@@ -13,6 +14,7 @@ from sentry.digests.utils import (
 from sentry.eventstore.models import Event
 from sentry.models import Project, ProjectOwnership
 from sentry.notifications.types import ActionTargetType
+from sentry.notifications.utils.participants import get_recipients_by_provider
 from sentry.ownership.grammar import Matcher, Owner, Rule, dump_schema
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
@@ -262,5 +264,30 @@ class GetPersonalizedDigestsTestCase(TestCase, SnubaTestCase):
         with self.feature("organizations:notification-all-recipients"):
             assert_get_personalized_digests(self.project, digest, expected_result)
 
+    def test_shares_recipients_between_events(self):
+        rule = self.project.rule_set.all()[0]
+        records = [event_to_record(event, (rule,)) for event in self.team1_events]
+        digest = build_digest(self.project, sort_records(records))[0]
+
+        with mock.patch(
+            "sentry.digests.utils.get_recipients_by_provider",
+            wraps=get_recipients_by_provider,
+        ) as get_recipients:
+            participants_by_provider_by_event = get_participants_by_event(digest, self.project)
+
+        # All events are owned by the same team and user
+        assert get_recipients.call_count == 1
+        assert len(participants_by_provider_by_event) == len(self.team1_events)
+
+    def test_personalized_digest_order(self):
+        rule = self.project.rule_set.all()[0]
+        records = [event_to_record(event, (rule,)) for event in self.team1_events]
+        digest = build_digest(self.project, sort_records(records))[0]
+
+        with self.feature("organizations:notification-all-recipients"):
+            participants_by_provider_by_event = get_participants_by_event(digest, self.project)
+        personalized_digests = get_personalized_digests(digest, participants_by_provider_by_event)
+        assert list(personalized_digests[self.user1.actor_id][rule]) == list(digest[rule])
+
     def test_empty_records(self):
         assert build_digest(self.project, []) == (None, [])
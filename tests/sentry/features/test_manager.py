@@ -239,3 +239,84 @@ class FeatureManagerTest(TestCase):
             NotImplementedError, "User flags not allowed with entity_feature=True"
         ):
             manager.add("users:feature-2", features.UserFeature, True)
+
+    def test_has_many(self):
+        manager = features.FeatureManager()
+        manager.add("organizations:feature", features.OrganizationFeature)
+        manager.add("organizations:settings-feature", features.OrganizationFeature)
+        manager.add_handler(MockBatchHandler())
+
+        with self.settings(SENTRY_FEATURES={"organizations:settings-feature": True}):
+            assert manager.has_many(
+                ["organizations:feature", "organizations:settings-feature", "organizations:nope"],
+                self.organization,
+                actor=self.user,
+            ) == {
+                "organizations:feature": True,
+                "organizations:settings-feature": True,
+                "organizations:nope": False,
+            }
+
+    def test_has_many_entity_handler(self):
+        manager = features.FeatureManager()
+        names = ["organizations:a", "organizations:b", "organizations:c"]
+        for name in names:
+            manager.add(name, features.OrganizationFeature)
+        entity_handler = mock.Mock()
+        entity_handler.batch_has.return_value = {
+            f"organization:{self.organization.id}": {
+                "organizations:a": True,
+                "organizations:b": False,
+            }
+        }
+        entity_handler.has.return_value = True
+        manager.add_entity_handler(entity_handler)
+
+        assert manager.has_many(names, self.organization, actor=self.user) == {
+            "organizations:a": True,
+            "organizations:b": False,
+            "organizations:c": True,
+        }
+        # All features are checked in one batch, the one it couldn't answer
+        # is checked on its own
+        entity_handler.batch_has.assert_called_once_with(
+            names, self.user, projects=None, organization=self.organization
+        )
+        assert len(entity_handler.has.mock_calls) == 1
+
+    def test_static_features(self):
+        manager = features.FeatureManager()
+        manager.add("organizations:feature", features.OrganizationFeature)
+
+        with self.settings(SENTRY_FEATURES={"organizations:feature": True}):
+            assert manager.has("organizations:feature", self.organization)
+
+        # Registering a handler for the feature replaces its default
+        handler = mock.Mock(features=["organizations:feature"], return_value=False)
+        manager.add_handler(handler)
+        with self.settings(SENTRY_FEATURES={"organizations:feature": True}):
+            assert not manager.has("organizations:feature", self.organization)
+        assert len(handler.mock_calls) == 1
+
+    def test_local_cache(self):
+        manager = features.FeatureManager()
+        manager.add("organizations:feature", features.OrganizationFeature)
+        handler = mock.Mock(features=["organizations:feature"], return_value=True)
+        manager.add_handler(handler)
+        other_org = self.create_organization()
+
+        with manager.local_cache():
+            assert manager.has("organizations:feature", self.organization)
+            assert manager.has("organizations:feature", self.organization)
+            assert manager.has_many(["organizations:feature"], self.organization) == {
+                "organizations:feature": True
+            }
+            assert len(handler.mock_calls) == 1
+
+            # Other entities and actors are checked separately
+            assert manager.has("organizations:feature", other_org)
+            assert manager.has("organizations:feature", self.organization, actor=self.user)
+            assert len(handler.mock_calls) == 3
+
+        assert manager.has("organizations:feature", self.organization)
+        assert len(handler.mock_calls) == 4
@@ -0,0 +1,67 @@
+from sentry.incidents.alert_rule_cache import AlertRuleDefinitionCache, get_alert_rule_versions
+from sentry.incidents.logic import delete_alert_rule
+from sentry.testutils import TestCase
+
+
+class AlertRuleDefinitionCacheTest(TestCase):
+    def setUp(self):
+        self.cache = AlertRuleDefinitionCache()
+        self.alert_rule = self.create_alert_rule()
+        self.subscription = self.alert_rule.snuba_query.subscriptions.get()
+        self.warning = self.create_alert_rule_trigger(self.alert_rule, "warning", 50)
+        self.critical = self.create_alert_rule_trigger(self.alert_rule, "critical", 10)
+
+    def test_get(self):
+        definition = self.cache.get(self.subscription)
+        assert definition.alert_rule == self.alert_rule
+        assert definition.triggers == [self.critical, self.warning]
+
+        with self.assertNumQueries(0):
+            assert self.cache.get(self.subscription) is definition
+
+    def test_trigger_changed(self):
+        definition = self.cache.get(self.subscription)
+        self.warning.update(alert_threshold=5)
+
+        new_definition = self.cache.get(self.subscription)
+        assert new_definition is not definition
+        assert new_definition.version > definition.version
+        assert [trigger.alert_threshold for trigger in new_definition.triggers] == [5, 10]
+
+    def test_alert_rule_changed(self):
+        self.cache.get(self.subscription)
+        self.alert_rule.update(threshold_period=5)
+        assert self.cache.get(self.subscription).alert_rule.threshold_period == 5
+
+    def test_snuba_query_changed(self):
+        definition = self.cache.get(self.subscription)
+        self.alert_rule.snuba_query.update(time_window=600)
+        assert self.cache.get(self.subscription) is not definition
+
+    def test_alert_rule_deleted(self):
+        self.cache.get(self.subscription)
+        delete_alert_rule(self.alert_rule)
+        assert self.cache.get(self.subscription) is None
+
+    def test_get_many(self):
+        other_rule = self.create_alert_rule()
+        other_subscription = other_rule.snuba_query.subscriptions.get()
+
+        definitions = self.cache.get_many([self.subscription, other_subscription])
+        assert definitions[self.subscription.id].alert_rule == self.alert_rule
+        assert definitions[other_subscription.id].alert_rule == other_rule
+        assert definitions[other_subscription.id].triggers == []
+
+        other_rule.update(threshold_period=5)
+        with self.assertNumQueries(2):
+            # Only the changed rule and its triggers are loaded again
+            new_definitions = self.cache.get_many([self.subscription, other_subscription])
+        assert new_definitions[self.subscription.id] is definitions[self.subscription.id]
+        assert new_definitions[other_subscription.id].alert_rule.threshold_period == 5
+
+    def test_get_alert_rule_versions(self):
+        snuba_query_id = self.alert_rule.snuba_query_id
+        version = get_alert_rule_versions([snuba_query_id])[snuba_query_id]
+        self.alert_rule.update(threshold_period=5)
+        assert get_alert_rule_versions([snuba_query_id])[snuba_query_id] > version
+        assert get_alert_rule_versions([]) == {}
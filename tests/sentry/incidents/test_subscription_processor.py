@@ -35,8 +35,10 @@ from sentry.incidents.subscription_processor import (
     build_alert_rule_trigger_stat_key,
     build_trigger_stat_keys,
     get_alert_rule_stats,
+    get_alert_rule_stats_many,
     get_redis_client,
     partition,
+    process_updates,
     update_alert_rule_stats,
 )
 from sentry.models import Integration
@@ -830,6 +832,71 @@ class ProcessUpdateTest(ProcessUpdateBaseClass):
         self.assert_trigger_exists_with_status(other_incident, self.trigger, TriggerStatus.RESOLVED)
         self.assert_action_handler_called_with_actions(other_incident, [])
 
+    def test_process_updates_batch(self):
+        rule = self.rule
+        rule.update(threshold_period=2)
+        trigger = self.trigger
+
+        updates = [
+            (
+                self.build_subscription_update(
+                    self.sub, value=trigger.alert_threshold + 1, time_delta=timedelta(minutes=-2)
+                ),
+                self.sub,
+            ),
+            (
+                self.build_subscription_update(
+                    self.other_sub,
+                    value=trigger.alert_threshold + 1,
+                    time_delta=timedelta(minutes=-2),
+                ),
+                self.other_sub,
+            ),
+            (
+                self.build_subscription_update(
+                    self.sub, value=trigger.alert_threshold + 1, time_delta=timedelta(minutes=-1)
+                ),
+                self.sub,
+            ),
+        ]
+        with self.feature(
+            ["organizations:incidents", "organizations:performance-view"]
+        ), self.capture_on_commit_callbacks(execute=True):
+            process_updates(updates)
+
+        # Both updates of the first subscription are applied in order and trigger
+        # an incident, while the other subscription only counts one update.
+        incident = self.assert_active_incident(rule, self.sub)
+        self.assert_trigger_exists_with_status(incident, trigger, TriggerStatus.ACTIVE)
+        self.assert_actions_fired_for_incident(
+            incident, [self.action], [(trigger.alert_threshold + 1, IncidentStatus.CRITICAL)]
+        )
+        self.assert_no_active_incident(rule, self.other_sub)
+
+        _, alert_counts, _ = get_alert_rule_stats(rule, self.sub, [trigger])
+        assert alert_counts == {trigger.id: 0}
+        last_update, alert_counts, _ = get_alert_rule_stats(rule, self.other_sub, [trigger])
+        assert alert_counts == {trigger.id: 1}
+        assert last_update == updates[1][0]["timestamp"]
+
+        # The next batch resolves the incident, starting from the stored stats
+        updates = [
+            (
+                self.build_subscription_update(
+                    self.sub, value=rule.resolve_threshold - 1, time_delta=time_delta
+                ),
+                self.sub,
+            )
+            for time_delta in (timedelta(), timedelta(minutes=1))
+        ]
+        with self.feature(
+            ["organizations:incidents", "organizations:performance-view"]
+        ), self.capture_on_commit_callbacks(execute=True):
+            process_updates(updates)
+
+        self.assert_no_active_incident(rule, self.sub)
+        self.assert_trigger_exists_with_status(incident, trigger, TriggerStatus.RESOLVED)
+
     def test_multiple_triggers(self):
         rule = self.rule
         rule.update(threshold_period=1)
@@ -2301,6 +2368,23 @@ class TestGetAlertRuleStats(TestCase):
         assert resolve_counts == {3: 2, 4: 4}
 
 
+class TestGetAlertRuleStatsMany(TestCase):
+    def test(self):
+        alert_rule = AlertRule(id=1)
+        sub = QuerySubscription(id=5, project_id=2)
+        other_sub = QuerySubscription(id=6, project_id=7)
+        triggers = [AlertRuleTrigger(id=3), AlertRuleTrigger(id=4)]
+        timestamp = datetime.now().replace(tzinfo=pytz.utc, microsecond=0)
+        update_alert_rule_stats(alert_rule, sub, timestamp, {3: 1, 4: 3}, {3: 2, 4: 4})
+
+        stats = get_alert_rule_stats_many(
+            [(alert_rule, sub, triggers), (alert_rule, other_sub, triggers[:1])]
+        )
+        assert stats[sub.id] == (timestamp, {3: 1, 4: 3}, {3: 2, 4: 4})
+        assert stats[other_sub.id] == (datetime.fromtimestamp(0, tz=pytz.utc), {3: 0}, {3: 0})
+        assert get_alert_rule_stats_many([]) == {}
+
+
 class TestUpdateAlertRuleStats(TestCase):
     def test(self):
         alert_rule = AlertRule(id=1)
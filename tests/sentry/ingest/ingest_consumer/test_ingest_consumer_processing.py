@@ -371,3 +371,45 @@ def test_individual_attachments_missing_chunks(default_project, factories, monke
     attachments = list(EventAttachment.objects.filter(project_id=project_id, event_id=event_id))
 
     assert not attachments
+
+
+@pytest.mark.django_db
+def test_individual_attachments_partial_chunks(default_project, factories, monkeypatch):
+    monkeypatch.setattr("sentry.features.has", lambda *a, **kw: True)
+
+    event_id = "515539018c9b4260a6f999572f1661ee"
+    attachment_id = "ca90fb45-6dd9-40a0-a18f-8693aa621abb"
+    project_id = default_project.id
+
+    process_attachment_chunk(
+        {
+            "payload": b"Hello ",
+            "event_id": event_id,
+            "project_id": project_id,
+            "id": attachment_id,
+            "chunk_index": 0,
+        },
+        projects={default_project.id: default_project},
+    )
+
+    process_individual_attachment(
+        {
+            "type": "attachment",
+            "attachment": {
+                "attachment_type": "event.attachment",
+                "chunks": 2,
+                "content_type": "application/octet-stream",
+                "id": attachment_id,
+                "name": "foo.txt",
+            },
+            "event_id": event_id,
+            "project_id": project_id,
+        },
+        projects={default_project.id: default_project},
+    )
+
+    attachments = list(EventAttachment.objects.filter(project_id=project_id, event_id=event_id))
+
+    assert not attachments
+    # The file that was partially written while streaming the chunks is removed
+    assert not File.objects.filter(name="foo.txt").exists()
@@ -19,6 +19,7 @@ from sentry.ingest.transaction_clusterer.tasks import cluster_projects, spawn_cl
 from sentry.ingest.transaction_clusterer.tree import TreeClusterer
 from sentry.models.project import Project
 from sentry.testutils.helpers import Feature
+from sentry.testutils.skips import requires_benchmark
 
 
 def test_multi_fanout():
@@ -188,3 +189,32 @@ def test_run_clusterer_task(cluster_projects_delay, default_organization):
             "/test/path/*/**",
             "/users/trans/*/**",
         }
+
+
+def test_deep_tree():
+    """Trees deeper than the recursion limit can be merged"""
+    clusterer = TreeClusterer(merge_threshold=2)
+    depth = 2000
+    clusterer.add_input(
+        ["/a" * depth + "/b1", "/a" * depth + "/b2"],
+    )
+    assert clusterer.get_rules() == ["/a" * depth + "/*/**"]
+
+
+@requires_benchmark
+def test_benchmark_high_cardinality(benchmark):
+    transaction_names = [
+        f"/organizations/org-{i % 5000}/projects/project-{i}/events/{i * 7919 % 100000}/"
+        for i in range(100000)
+    ]
+
+    def run():
+        clusterer = TreeClusterer(merge_threshold=100)
+        clusterer.add_input(iter(transaction_names))
+        return clusterer.get_rules()
+
+    assert benchmark(run) == [
+        "/organizations/*/projects/*/events/*/**",
+        "/organizations/*/projects/*/**",
+        "/organizations/*/**",
+    ]
@@ -1,5 +1,6 @@
 import errno
 import re
+import threading
 import unittest
 import zipfile
 from copy import deepcopy
@@ -18,6 +19,8 @@ from sentry.lang.javascript.processor import (
     CACHE_CONTROL_MIN,
     JavaScriptStacktraceProcessor,
     UnparseableSourcemap,
+    _fetch_concurrently,
+    _sourcemap_view_cache,
     cache,
     discover_sourcemap,
     fetch_file,
@@ -1188,6 +1191,42 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap("http://example.com")
 
+    @patch("sentry.lang.javascript.processor.SmCache")
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_release_sourcemap_view_cache(self, mock_fetch_file, mock_smcache):
+        _sourcemap_view_cache.clear()
+        release = Release.objects.create(
+            version="abc", organization_id=self.project.organization_id
+        )
+        other_release = Release.objects.create(
+            version="def", organization_id=self.project.organization_id
+        )
+        url = "http://example.com/file.min.js.map"
+        mock_fetch_file.return_value = http.UrlResult(url, {}, b"{}", 200, None)
+
+        view = fetch_sourcemap(url, b"source", release=release)
+        assert fetch_sourcemap(url, b"source", release=release) is view
+        assert mock_smcache.from_bytes.call_count == 1
+
+        # Different release, minified source or map contents are parsed again
+        fetch_sourcemap(url, b"source", release=other_release)
+        fetch_sourcemap(url, b"other source", release=release)
+        mock_fetch_file.return_value = http.UrlResult(url, {}, b"{ }", 200, None)
+        fetch_sourcemap(url, b"source", release=release)
+        assert mock_smcache.from_bytes.call_count == 4
+
+        # Sourcemaps fetched without a release are never shared
+        fetch_sourcemap(url, b"source")
+        fetch_sourcemap(url, b"source")
+        assert mock_smcache.from_bytes.call_count == 6
+
+        # Moving bytes between the minified source and the map is a change
+        mock_fetch_file.return_value = http.UrlResult(url, {}, b"e{}", 200, None)
+        fetch_sourcemap(url, b"sourc", release=release)
+        mock_fetch_file.return_value = http.UrlResult(url, {}, b"{}", 200, None)
+        fetch_sourcemap(url, b"source", release=release)
+        assert mock_smcache.from_bytes.call_count == 7
+
 
 class TrimLineTest(unittest.TestCase):
     long_line = "The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring."
@@ -1537,3 +1576,117 @@ class CacheSourceTest(TestCase):
         # now we have an error
         assert len(processor.cache.get_errors(abs_path)) == 1
         assert processor.cache.get_errors(abs_path)[0] == {"url": map_url, "type": "js_no_source"}
+
+
+class PopulateSourceCacheTest(TestCase):
+    def _get_processor(self):
+        project = self.create_project()
+        processor = JavaScriptStacktraceProcessor(data={}, stacktrace_infos=None, project=project)
+        processor.max_fetches = 3
+        return processor
+
+    @override_options({"processing.javascript.fetch-concurrency": 4})
+    @patch("sentry.lang.javascript.processor.fetch_sourcemap")
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_concurrent_fetch(self, mock_fetch_file, mock_fetch_sourcemap):
+        def fetch_file(url, **kwargs):
+            if url.endswith("missing.js"):
+                raise http.BadSource({"type": EventError.JS_MISSING_SOURCE, "url": url})
+            return http.UrlResult(
+                url, {"sourcemap": "app:///bundle.js.map"}, b"console.log(1)", 200, None
+            )
+
+        mock_fetch_file.side_effect = fetch_file
+        mock_fetch_sourcemap.return_value = MagicMock()
+
+        processor = self._get_processor()
+        processor.populate_source_cache(
+            [
+                {"abs_path": "app:///a.js"},
+                {"abs_path": "app:///b.js"},
+                {"abs_path": "app:///missing.js"},
+                {"abs_path": "app:///a.js"},
+            ]
+        )
+
+        assert mock_fetch_file.call_count == 3
+        # both bundles link to the same sourcemap, which is only fetched once
+        assert mock_fetch_sourcemap.call_count == 1
+        assert processor.cache.get("app:///a.js")
+        assert processor.cache.get("app:///b.js")
+        assert processor.sourcemaps.get_link("app:///a.js")[0] == "app:///bundle.js.map"
+        assert processor.sourcemaps.get_link("app:///b.js")[0] == "app:///bundle.js.map"
+        assert processor.cache.get_errors("app:///missing.js") == [
+            {"type": EventError.JS_MISSING_SOURCE, "url": "app:///missing.js"}
+        ]
+
+    @override_options({"processing.javascript.fetch-concurrency": 4})
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_concurrent_fetch_respects_max_fetches(self, mock_fetch_file):
+        mock_fetch_file.side_effect = lambda url, **kwargs: http.UrlResult(
+            url, {}, b"console.log(1)", 200, None
+        )
+
+        processor = self._get_processor()
+        processor.populate_source_cache([{"abs_path": f"app:///{i}.js"} for i in range(5)])
+
+        assert mock_fetch_file.call_count == 3
+        too_many_errors = [
+            i
+            for i in range(5)
+            if processor.cache.get_errors(f"app:///{i}.js")
+            == [{"type": EventError.JS_TOO_MANY_REMOTE_SOURCES}]
+        ]
+        assert len(too_many_errors) == 2
+
+    @override_options({"processing.javascript.fetch-concurrency": 4})
+    @patch("sentry.lang.javascript.processor.fetch_sourcemap")
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_concurrent_sourcemap_error(self, mock_fetch_file, mock_fetch_sourcemap):
+        mock_fetch_file.side_effect = lambda url, **kwargs: http.UrlResult(
+            url, {"sourcemap": "app:///bundle.js.map"}, b"console.log(1)", 200, None
+        )
+        mock_fetch_sourcemap.side_effect = http.BadSource(
+            {"type": EventError.JS_MISSING_SOURCE, "url": "app:///bundle.js.map"}
+        )
+
+        processor = self._get_processor()
+        processor.populate_source_cache([{"abs_path": "app:///a.js"}, {"abs_path": "app:///b.js"}])
+
+        for abs_path in ("app:///a.js", "app:///b.js"):
+            assert processor.cache.get_errors(abs_path) == [
+                {"type": EventError.JS_MISSING_SOURCE, "url": "app:///bundle.js.map"}
+            ]
+
+
+class FetchConcurrentlyTest(unittest.TestCase):
+    def test_fetch_concurrently(self):
+        def fetch(item):
+            if item == 3:
+                raise http.BadSource({"type": EventError.JS_MISSING_SOURCE})
+            return item * 2
+
+        results = _fetch_concurrently(fetch, list(range(10)), 4)
+
+        assert results[:3] == [0, 2, 4]
+        assert isinstance(results[3], http.BadSource)
+        assert results[4:] == [8, 10, 12, 14, 16, 18]
+
+    def test_reuses_threads(self):
+        def fetch(item):
+            return threading.current_thread()
+
+        threads = set(_fetch_concurrently(fetch, list(range(10)), 4))
+        threads.update(_fetch_concurrently(fetch, list(range(10)), 4))
+
+        assert len(threads) <= 4
+        assert threading.current_thread() not in threads
+
+    def test_raises_errors(self):
+        def fetch(item):
+            if item == 3:
+                raise ValueError(item)
+            return item
+
+        with pytest.raises(ValueError):
+            _fetch_concurrently(fetch, list(range(10)), 4)
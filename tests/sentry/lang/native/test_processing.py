@@ -8,12 +8,21 @@ from unittest import mock
 
 import pytest
 
+from sentry.lang.native.cache import get_symbolication_cache
 from sentry.lang.native.processing import (
+    PayloadBatcher,
     _merge_image,
     get_frames_for_symbolication,
     process_payload,
 )
+from sentry.lang.native.symbolicator import (
+    _task_id_cache_key_for_event,
+    _task_state_cache_key_for_event,
+)
 from sentry.models.eventerror import EventError
+from sentry.tasks.symbolication import RetrySymbolication
+from sentry.testutils.helpers.options import override_options
+from sentry.utils.cache import default_cache
 from sentry.utils.safe import get_path
 
 
@@ -324,3 +333,216 @@ def test_il2cpp_symbolication(mock_symbolicator, default_project):
         == "/Users/swatinem/Coding/sentry-unity/samples/unity-of-bugs/Assets/Scripts/BugFarmButtons.cs"
     )
     assert frame["lineno"] == 51
+
+
+def _native_event(project, event_id, image_addr="0x1000"):
+    return {
+        "platform": "native",
+        "project": project.id,
+        "event_id": event_id,
+        "debug_meta": {
+            "images": [
+                {
+                    "type": "macho",
+                    "debug_id": "b7c1e9a2-3c59-4f10-8a5b-ae1a4c3e0e11",
+                    "image_addr": image_addr,
+                    "image_size": 4096,
+                }
+            ]
+        },
+        "exception": {
+            "values": [{"stacktrace": {"frames": [{"instruction_addr": "0x1010"}]}}],
+        },
+    }
+
+
+def _fake_symbolicate(stacktraces, modules, signal=None):
+    return {
+        "status": "completed",
+        "stacktraces": [
+            {"frames": [{"original_index": 0, "function": f"function_{i}"}]}
+            for i in range(len(stacktraces))
+        ],
+        "modules": [dict(module, debug_status="found") for module in modules],
+    }
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_payload_batcher(mock_symbolicator, default_project):
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.side_effect = _fake_symbolicate
+
+    batcher = PayloadBatcher(max_batch_size=3, max_wait=60)
+    events = [_native_event(default_project, str(i)) for i in range(3)]
+    other = _native_event(default_project, "other", image_addr="0x2000")
+
+    assert batcher.add(events[0]) == []
+    assert batcher.add(other) == []
+    assert batcher.add(events[1]) == []
+    assert len(batcher) == 3
+
+    # The third event with the same images completes the batch
+    assert batcher.add(events[2]) == events
+    assert mock_symbolicator.process_payload.call_count == 1
+    assert len(mock_symbolicator.process_payload.call_args[1]["stacktraces"]) == 3
+
+    for data in events:
+        assert get_path(data, "debug_meta", "images", 0, "debug_status") == "found"
+    # Every event gets its own part of the response
+    functions = [
+        get_path(data, "exception", "values", 0, "stacktrace", "frames", 0, "function")
+        for data in events
+    ]
+    assert functions == ["function_0", "function_1", "function_2"]
+
+    assert batcher.flush() == [other]
+    assert mock_symbolicator.process_payload.call_count == 2
+    assert len(batcher) == 0
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_payload_batcher_max_wait(mock_symbolicator, default_project):
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.side_effect = _fake_symbolicate
+
+    now = [0.0]
+    batcher = PayloadBatcher(max_batch_size=10, max_wait=1, clock=lambda: now[0])
+    first = _native_event(default_project, "1")
+    second = _native_event(default_project, "2")
+
+    assert batcher.add(first) == []
+    now[0] = 0.5
+    assert batcher.add(second) == []
+    assert batcher.flush_expired() == []
+
+    now[0] = 1.0
+    assert batcher.flush_expired() == [first, second]
+    assert mock_symbolicator.process_payload.call_count == 1
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_payload_batcher_failed(mock_symbolicator, default_project):
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.return_value = {"status": "failed", "message": "boom"}
+
+    batcher = PayloadBatcher(max_batch_size=2, max_wait=60)
+    events = [_native_event(default_project, str(i)) for i in range(2)]
+    batcher.add(events[0])
+
+    assert batcher.add(events[1]) == events
+    for data in events:
+        assert data["errors"][0]["type"] == EventError.NATIVE_SYMBOLICATOR_FAILED
+
+
+def _symbolicate_addresses(stacktraces, modules, signal=None, task_state=None):
+    return {
+        "status": "completed",
+        "stacktraces": [
+            {
+                "frames": [
+                    {
+                        "original_index": i,
+                        "status": "symbolicated",
+                        "instruction_addr": frame["instruction_addr"],
+                        "function": "function_%x" % (int(frame["instruction_addr"], 16) & 0xFFF),
+                    }
+                    for i, frame in enumerate(stacktrace["frames"])
+                ]
+            }
+            for stacktrace in stacktraces
+        ],
+        "modules": [dict(module, debug_status="found", arch="x86_64") for module in modules],
+    }
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_symbolication_cache(mock_symbolicator, default_project):
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.side_effect = _symbolicate_addresses
+    get_symbolication_cache().clear()
+
+    def event(image_addr):
+        base = int(image_addr, 16)
+        data = _native_event(default_project, image_addr, image_addr=image_addr)
+        data["exception"]["values"][0]["stacktrace"]["frames"] = [
+            {"instruction_addr": hex(base + 0x20)},
+            {"instruction_addr": hex(base + 0x10)},
+        ]
+        return data
+
+    with override_options({"symbolicator.cache.enabled": True}):
+        first = event("0x1000")
+        process_payload(first)
+        stacktraces = mock_symbolicator.process_payload.call_args[1]["stacktraces"]
+        assert len(stacktraces[0]["frames"]) == 2
+
+        # The same image loaded elsewhere only needs the crashing frame
+        second = event("0x5000")
+        process_payload(second)
+        stacktraces = mock_symbolicator.process_payload.call_args[1]["stacktraces"]
+        assert stacktraces[0]["frames"] == [{"instruction_addr": "0x5010"}]
+
+    assert mock_symbolicator.process_payload.call_count == 2
+    frames = get_path(second, "exception", "values", 0, "stacktrace", "frames")
+    assert [frame["instruction_addr"] for frame in frames] == ["0x5020", "0x5010"]
+    assert [frame["function"] for frame in frames] == ["function_20", "function_10"]
+    assert get_path(second, "debug_meta", "images", 0, "debug_status") == "found"
+
+    get_symbolication_cache().clear()
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_symbolication_cache_pending_task(mock_symbolicator, default_project):
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.side_effect = _symbolicate_addresses
+    get_symbolication_cache().clear()
+
+    def event(image_addr):
+        base = int(image_addr, 16)
+        data = _native_event(default_project, image_addr, image_addr=image_addr)
+        data["exception"]["values"][0]["stacktrace"]["frames"] = [
+            {"instruction_addr": hex(base + 0x20)},
+            {"instruction_addr": hex(base + 0x10)},
+        ]
+        return data
+
+    requests = []
+
+    def symbolicate_pending(stacktraces, modules, signal=None, task_state=None):
+        # Like `Symbolicator._process`, remember the request while it is
+        # pending, and answer it when polled again.
+        if not requests:
+            requests.append((stacktraces, modules))
+            default_cache.set(task_id_key, "request-id", 60)
+            default_cache.set(task_state_key, task_state, 60)
+            raise RetrySymbolication(retry_after=1)
+        default_cache.delete(task_id_key)
+        default_cache.delete(task_state_key)
+        return _symbolicate_addresses(*requests[0])
+
+    with override_options({"symbolicator.cache.enabled": True}):
+        process_payload(event("0x1000"))
+
+        second = event("0x5000")
+        task_id_key = _task_id_cache_key_for_event(default_project.id, second["event_id"])
+        task_state_key = _task_state_cache_key_for_event(default_project.id, second["event_id"])
+        mock_symbolicator.process_payload.side_effect = symbolicate_pending
+
+        with pytest.raises(RetrySymbolication):
+            process_payload(second)
+        assert requests[0][0][0]["frames"] == [{"instruction_addr": "0x5010"}]
+
+        # The cached frame is evicted while the request is pending, but the
+        # response still has to be merged with the frames it was sent with.
+        get_symbolication_cache().clear()
+        process_payload(second)
+
+    frames = get_path(second, "exception", "values", 0, "stacktrace", "frames")
+    assert [frame["function"] for frame in frames] == ["function_20", "function_10"]
+
+    get_symbolication_cache().clear()
@@ -1,4 +1,5 @@
 import os
+import zipfile
 from io import BytesIO
 from unittest.mock import patch
 
@@ -157,6 +158,39 @@ class FileTest(TestCase):
             with pytest.raises(ValueError):
                 fp.seek(0, 666)
 
+    def test_readinto(self):
+        file1 = File.objects.create(name="baz.js", type="default", size=26)
+        file1.putfile(BytesIO(b"abcdefghijklmnopqrstuvwxyz"), 5)
+
+        with file1.getfile() as fp:
+            buf = bytearray(8)
+            fp.seek(3)
+            assert fp.readinto(buf) == 8
+            assert buf == b"defghijk"
+            assert fp.tell() == 11
+
+            fp.seek(22)
+            assert fp.readinto(buf) == 4
+            assert buf[:4] == b"wxyz"
+            assert fp.readinto(buf) == 0
+
+    def test_range_read_zip(self):
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, mode="w") as zf:
+            for i in range(20):
+                zf.writestr(f"file{i}.txt", os.urandom(1000))
+
+        file1 = File.objects.create(name="archive.zip", type="default")
+        blobs = file1.putfile(BytesIO(buffer.getvalue()), 1000)
+
+        with patch.object(
+            FileBlob, "getfile", autospec=True, side_effect=FileBlob.getfile
+        ) as getfile, zipfile.ZipFile(file1.getfile()) as zf:
+            assert zf.read("file10.txt") == zipfile.ZipFile(buffer).read("file10.txt")
+
+        # Only the central directory and the entry itself are read
+        assert getfile.call_count < len(blobs) / 2
+
     def test_multi_chunk_prefetch(self):
         random_data = os.urandom(1 << 25)
 
@@ -89,6 +89,28 @@ class ReleaseFileCacheTest(TestCase):
         # Check that the file was cached
         os.stat(expected_path)
 
+    def test_getfile_fs_cache_eviction(self):
+        release_files = []
+        for content in (b"first file", b"second file"):
+            file = self.create_file(name="dummy.txt")
+            file.putfile(BytesIO(content))
+            release_files.append(self.create_release_file(file=file))
+
+        options.set("releasefile.cache-limit", 0)
+        options.set("releasefile.cache-max-size", 15)
+        ReleaseFile.cache.clear_old_entries()
+
+        first, second = release_files
+        with ReleaseFile.cache.getfile(first) as f:
+            first_path = f.name
+        with ReleaseFile.cache.getfile(second) as f:
+            assert f.read() == b"second file"
+
+        # Caching the second file pushed the first one out of the cache
+        assert not os.path.exists(first_path)
+        with ReleaseFile.cache.getfile(first) as f:
+            assert f.read() == b"first file"
+
     def test_getfile_streaming(self):
         file_content = b"this is a test"
 
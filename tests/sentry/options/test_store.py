@@ -156,3 +156,54 @@ class OptionsStoreTest(TestCase):
         mocked_time.return_value = 26
         store.clean_local_cache()
         assert not store._local_cache
+
+    @patch("sentry.options.store.time")
+    def test_refresh_local_cache(self, mocked_time):
+        store = self.store
+        keys = [self.make_key(10, 0) for _ in range(3)]
+
+        mocked_time.return_value = 0
+        store.set(keys[0], "foo")
+        # Only in the database
+        store.set_store(keys[1], "bar")
+        store.flush_local_cache()
+
+        store.refresh_local_cache(keys)
+        assert store.cache.get(keys[1].cache_key) == "bar"
+
+        with patch.object(Option.objects, "get_queryset", side_effect=RuntimeError()):
+            with patch.object(store.cache, "get", side_effect=RuntimeError()):
+                assert store.get(keys[0]) == "foo"
+                assert store.get(keys[1]) == "bar"
+                assert store.get(keys[2]) is None
+
+        # Without changes, only the version is read and the values stay fresh
+        mocked_time.return_value = 8
+        with patch.object(store.cache, "get_many", side_effect=RuntimeError()):
+            store.refresh_local_cache(keys)
+
+        mocked_time.return_value = 15
+        with patch.object(Option.objects, "get_queryset", side_effect=RuntimeError()):
+            with patch.object(store.cache, "get", side_effect=RuntimeError()):
+                assert store.get(keys[0]) == "foo"
+
+        # Changes from other processes are loaded with the next refresh
+        OptionsStore(cache=store.cache).set(keys[0], "baz")
+        store.refresh_local_cache(keys)
+        with patch.object(store.cache, "get", side_effect=RuntimeError()):
+            assert store.get(keys[0]) == "baz"
+
+    def test_refresh_local_cache_unset(self):
+        store, key = self.store, self.key
+
+        store.refresh_local_cache([key])
+
+        with patch.object(Option.objects, "get_queryset", side_effect=RuntimeError()) as get_qs:
+            with patch.object(store.cache, "get", side_effect=RuntimeError()) as cache_get:
+                assert store.get(key) is None
+        assert not get_qs.called
+        assert not cache_get.called
+
+        # Setting the option replaces the unset marker
+        store.set(key, "foo")
+        assert store.get(key) == "foo"
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from sentry.profiles.task import _process_symbolicator_results_for_sample
+from sentry.testutils.skips import requires_benchmark
+
+
+def make_profile(num_frames, num_stacks, num_samples, stack_depth, inline_every):
+    rng = random.Random(0)
+    profile = {
+        "platform": "cocoa",
+        "profile": {
+            "frames": [{"instruction_addr": hex(i)} for i in range(num_frames)],
+            "stacks": [
+                [rng.randrange(num_frames) for _ in range(stack_depth)] for _ in range(num_stacks)
+            ],
+            "samples": [{"stack_id": rng.randrange(num_stacks)} for _ in range(num_samples)],
+        },
+    }
+
+    symbolicated_frames = []
+    for i in range(num_frames):
+        if inline_every and i % inline_every == 0:
+            symbolicated_frames.append({"function": f"inlined_{i}", "original_index": i})
+        symbolicated_frames.append({"function": f"function_{i}", "original_index": i})
+    return profile, [{"frames": symbolicated_frames}]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("inline_every", [0, 10], ids=["no-inlines", "inlines"])
+def test_benchmark_process_symbolicator_results_for_sample(inline_every, benchmark):
+    def setup():
+        profile, stacktraces = make_profile(
+            num_frames=5000,
+            num_stacks=20000,
+            num_samples=100000,
+            stack_depth=50,
+            inline_every=inline_every,
+        )
+        return (profile, stacktraces), {}
+
+    benchmark.pedantic(_process_symbolicator_results_for_sample, setup=setup, rounds=5)
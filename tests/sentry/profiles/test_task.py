@@ -1,13 +1,20 @@
 from functools import cached_property
 from io import BytesIO
 from os.path import join
+from unittest.mock import patch
 from zipfile import ZipFile
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from symbolic import ProguardMapper
 
 from sentry.models import Project
-from sentry.profiles.task import _deobfuscate, _normalize, _process_symbolicator_results_for_sample
+from sentry.profiles.task import (
+    _deobfuscate,
+    _normalize,
+    _process_symbolicator_results_for_sample,
+    _proguard_mapper_cache,
+)
 from sentry.testutils import TestCase
 from sentry.testutils.factories import get_fixture_path
 from sentry.utils import json
@@ -152,6 +159,54 @@ class ProfilesProcessTaskTest(TestCase):
         assert frames[1]["name"] == "getExtraClassContext"
         assert frames[1]["class_name"] == "org.slf4j.helpers.Util$ClassContextSecurityManager"
 
+    def test_deobfuscation_mapper_cache(self):
+        out = BytesIO()
+        with ZipFile(out, "w") as f:
+            f.writestr(f"proguard/{PROGUARD_UUID}.txt", PROGUARD_SOURCE)
+
+        response = self.client.post(
+            self.upload_dsym_files_url,
+            {
+                "file": SimpleUploadedFile(
+                    "symbols.zip", out.getvalue(), content_type="application/zip"
+                )
+            },
+            format="multipart",
+        )
+        assert response.status_code == 201, response.content
+
+        _proguard_mapper_cache.clear()
+        project = Project.objects.get_from_cache(id=self.project.id)
+        with patch("sentry.profiles.task.ProguardMapper.open", wraps=ProguardMapper.open) as open_:
+            for _ in range(3):
+                profile = dict(self.android_profile)
+                profile.update(
+                    {
+                        "build_id": PROGUARD_UUID,
+                        "project_id": self.project.id,
+                        "profile": {
+                            "methods": [
+                                {
+                                    "name": "a",
+                                    "abs_path": None,
+                                    "class_name": "org.a.b.g$a",
+                                    "source_file": None,
+                                    "source_line": 67,
+                                },
+                            ],
+                        },
+                    }
+                )
+                _deobfuscate(profile, project)
+                frame = profile["profile"]["methods"][0]
+                assert frame["name"] == "getClassContext"
+                assert frame["class_name"] == "org.slf4j.helpers.Util$ClassContextSecurityManager"
+
+        assert open_.call_count == 1
+        mapper = _proguard_mapper_cache.get((project.id, PROGUARD_UUID))
+        assert mapper is not None
+        assert mapper.remap_count == 1
+
     def test_inline_deobfuscation(self):
         out = BytesIO()
         with ZipFile(out, "w") as f:
@@ -344,3 +399,35 @@ class ProfilesProcessTaskTest(TestCase):
         _process_symbolicator_results_for_sample(profile, stacktraces)
 
         assert profile["profile"]["stacks"][0] == [0, 1, 2, 3, 4, 5]
+
+    def test_process_symbolicator_results_for_sample_shared_stacks(self):
+        profile = {
+            "platform": "rust",
+            "profile": {
+                "frames": [
+                    {"instruction_addr": "0x1", "lang": "rust"},
+                    {"instruction_addr": "0x2", "lang": "rust"},
+                    {"instruction_addr": "0x3", "lang": "rust"},
+                ],
+                "samples": [{"stack_id": 0}, {"stack_id": 0}, {"stack_id": 1}, {"stack_id": 2}],
+                "stacks": [[0, 1], [0, 1], [2, 1]],
+            },
+        }
+
+        # returned from symbolicator
+        stacktraces = [
+            {
+                "frames": [
+                    {"function": "A_inline", "original_index": 0},
+                    {"function": "A", "original_index": 0},
+                    {"function": "B", "original_index": 1},
+                    {"function": "C", "original_index": 2},
+                ],
+            },
+        ]
+
+        _process_symbolicator_results_for_sample(profile, stacktraces)
+
+        # every stack is remapped once and identical stacks are merged
+        assert profile["profile"]["stacks"] == [[0, 1, 2], [3, 2]]
+        assert [s["stack_id"] for s in profile["profile"]["samples"]] == [0, 0, 0, 1]
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 from sentry.ratelimits.sliding_windows import (
@@ -121,3 +123,131 @@ def test_conflicting_quotas(limiter):
         GrantedQuota(prefix="foo", granted=6, reached_quotas=[]),
         GrantedQuota(prefix="bar", granted=4, reached_quotas=quotas),
     ]
+
+
+def test_leasing(limiter):
+    leasing_limiter = RedisSlidingWindowRateLimiter(lease_fraction=0.5)
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=10)]
+
+    # The first request reserves a lease of 1 + 5 units in Redis...
+    resp = leasing_limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=1, reached_quotas=[])]
+
+    # ...which the next one is granted from without going to Redis.
+    with mock.patch.object(
+        leasing_limiter,
+        "_check_within_redis_quotas",
+        wraps=leasing_limiter._check_within_redis_quotas,
+    ) as check_within_redis_quotas:
+        resp = leasing_limiter.check_and_use_quotas(
+            [RequestedQuota(prefix="foo", requested=4, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+        )
+    assert resp == [GrantedQuota(prefix="foo", granted=4, reached_quotas=[])]
+    assert check_within_redis_quotas.call_count == 0
+
+    # The whole lease counts towards the quota until it is returned.
+    _, resp = limiter.check_within_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=4, reached_quotas=quotas)]
+
+    leasing_limiter.release_leases(timestamp=TIMESTAMP_OFFSET)
+    assert not leasing_limiter.leases
+
+    _, resp = limiter.check_within_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=5, reached_quotas=quotas)]
+
+
+def test_leasing_same_prefix(limiter):
+    leasing_limiter = RedisSlidingWindowRateLimiter(lease_fraction=0.5)
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=10)]
+
+    # Reserves a lease of 1 + 5 units, of which 5 remain.
+    leasing_limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+
+    # Only the first request fits into the remainder of the lease, the second
+    # one replaces it with a new lease of the 5 units left in Redis.
+    resp = leasing_limiter.check_and_use_quotas(
+        [
+            RequestedQuota(prefix="foo", requested=4, quotas=quotas),
+            RequestedQuota(prefix="foo", requested=4, quotas=quotas),
+        ],
+        timestamp=TIMESTAMP_OFFSET,
+    )
+    assert resp == [
+        GrantedQuota(prefix="foo", granted=4, reached_quotas=[]),
+        GrantedQuota(prefix="foo", granted=4, reached_quotas=[]),
+    ]
+    assert leasing_limiter.leases[("foo", tuple(quotas))].remaining == 1
+
+    leasing_limiter.release_leases(timestamp=TIMESTAMP_OFFSET)
+    _, resp = limiter.check_within_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=1, reached_quotas=quotas)]
+
+
+def test_leasing_expiry(limiter):
+    leasing_limiter = RedisSlidingWindowRateLimiter(lease_fraction=0.5, lease_seconds=5)
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=10)]
+
+    leasing_limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+
+    # The lease lasts no longer than the granularity of the quota, after
+    # which its unused units are returned and a new lease is reserved.
+    leasing_limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET + 1
+    )
+    assert leasing_limiter.leases[("foo", tuple(quotas))].timestamp == TIMESTAMP_OFFSET + 1
+
+    _, resp = limiter.check_within_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET + 1,
+    )
+    # 1 unit used in the first lease, 1 + 5 units in the current one
+    assert resp == [GrantedQuota(prefix="foo", granted=3, reached_quotas=quotas)]
+
+
+@pytest.mark.parametrize("lease_fraction", [0.1, 0.25, 0.5])
+def test_leasing_bounded_overshoot(lease_fraction):
+    quota = Quota(window_seconds=10, granularity_seconds=5, limit=20)
+    lease_size = int(quota.limit * lease_fraction)
+    workers = [
+        RedisSlidingWindowRateLimiter(lease_fraction=lease_fraction, lease_seconds=5)
+        for _ in range(3)
+    ]
+
+    used_by_timestamp = {}
+    for timestamp in range(TIMESTAMP_OFFSET, TIMESTAMP_OFFSET + 60):
+        used = 0
+        for worker in workers:
+            for _ in range(2):
+                grants = worker.check_and_use_quotas(
+                    [RequestedQuota(prefix="foo", requested=1, quotas=[quota])],
+                    timestamp=timestamp,
+                )
+                used += grants[0].granted
+        used_by_timestamp[timestamp] = used
+
+    # Units of a lease are counted when it is reserved, but can be used after
+    # the granule they are counted in has left the window. That is bounded by
+    # one lease per worker.
+    for timestamp in used_by_timestamp:
+        window_start = (timestamp // quota.granularity_seconds - 1) * quota.granularity_seconds
+        used_in_window = sum(
+            used
+            for used_timestamp, used in used_by_timestamp.items()
+            if window_start <= used_timestamp <= timestamp
+        )
+        assert used_in_window <= quota.limit + len(workers) * (1 + lease_size)
+
+    # Leases only hold back quota, so it is still used up over time.
+    assert sum(used_by_timestamp.values()) >= quota.limit * 5
@@ -15,6 +15,8 @@ from sentry.snuba.query_subscription_consumer import (
     InvalidMessageError,
     InvalidSchemaError,
     QuerySubscriptionConsumer,
+    batch_subscriber_registry,
+    register_batch_subscriber,
     register_subscriber,
     subscriber_registry,
 )
@@ -129,6 +131,48 @@ class HandleMessageTest(BaseQuerySubscriptionTest, TestCase):
         mock_callback.assert_called_once_with(data["payload"], sub)
 
 
+    @mock.patch.dict(subscriber_registry)
+    @mock.patch.dict(batch_subscriber_registry)
+    def test_batch_subscription_registered(self):
+        registration_key = "registered_batch_test"
+        mock_callback = mock.Mock()
+        mock_batch_callback = mock.Mock()
+        register_subscriber(registration_key)(mock_callback)
+        register_batch_subscriber(registration_key)(mock_batch_callback)
+        with self.tasks():
+            snuba_query = create_snuba_query(
+                SnubaQuery.Type.ERROR,
+                Dataset.Events,
+                "hello",
+                "count()",
+                timedelta(minutes=10),
+                timedelta(minutes=1),
+                None,
+            )
+            subs = [
+                create_snuba_subscription(project, registration_key, snuba_query)
+                for project in (self.project, self.create_project())
+            ]
+        messages = []
+        payloads = []
+        for sub in subs:
+            sub.refresh_from_db()
+            data = deepcopy(self.valid_wrapper)
+            data["payload"]["subscription_id"] = sub.subscription_id
+            messages.append(self.build_mock_message(data))
+            payload = deepcopy(data["payload"])
+            payload["values"] = payload["result"]
+            payload["timestamp"] = parse_date(payload["timestamp"]).replace(tzinfo=pytz.utc)
+            payloads.append(payload)
+        # Invalid messages are skipped without failing the batch
+        messages.insert(1, self.build_mock_message({"version": 3}))
+
+        self.consumer.handle_messages(messages)
+
+        mock_batch_callback.assert_called_once_with(list(zip(payloads, subs)))
+        assert not mock_callback.called
+
+
 class ParseMessageValueTest(BaseQuerySubscriptionTest, unittest.TestCase):
     def run_test(self, message):
         self.consumer.parse_message_value(json.dumps(message))
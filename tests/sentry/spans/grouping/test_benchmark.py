@@ -0,0 +1,24 @@
+import pytest
+
+from sentry.spans.grouping.strategy.base import _span_group_cache
+from sentry.spans.grouping.strategy.config import CONFIGURATIONS, DEFAULT_CONFIG_ID
+from sentry.testutils.performance_issues.event_generators import EVENTS
+from sentry.testutils.skips import requires_benchmark
+
+
+@requires_benchmark
+@pytest.mark.parametrize("cached", [False, True], ids=["cold", "warm"])
+def test_benchmark_span_grouping(cached, benchmark):
+    strategy = CONFIGURATIONS[DEFAULT_CONFIG_ID].strategy
+    events = [event for event in EVENTS.values() if event.get("spans")]
+
+    def setup():
+        if not cached:
+            _span_group_cache.clear()
+        return (), {}
+
+    def run():
+        for event in events:
+            strategy.execute(event)
+
+    benchmark.pedantic(run, setup=setup, rounds=50)
@@ -5,6 +5,7 @@ import pytest
 from sentry.spans.grouping.strategy.base import (
     Span,
     SpanGroupingStrategy,
+    _span_group_cache,
     loose_normalized_db_span_in_condition_strategy,
     normalized_db_span_in_condition_strategy,
     parametrize_db_span_strategy,
@@ -570,3 +571,50 @@ def test_default_2022_10_27_strategy(spans: List[Span], expected: Mapping[str, L
         key: hash_values(values)
         for key, values in {**expected, "a" * 16: ["transaction name"]}.items()
     }
+
+
+def test_span_group_cache() -> None:
+    _span_group_cache.clear()
+    strategy = CONFIGURATIONS["default:2022-10-27"].strategy
+
+    first = (
+        SpanBuilder()
+        .with_span_id("b" * 16)
+        .with_op("db.sql.query")
+        .with_description("SELECT * FROM table WHERE id = 1")
+        .build()
+    )
+    second = (
+        SpanBuilder()
+        .with_span_id("c" * 16)
+        .with_op("db.sql.query")
+        .with_description("SELECT * FROM table WHERE id = 1")
+        .build()
+    )
+    fingerprinted = (
+        SpanBuilder()
+        .with_span_id("d" * 16)
+        .with_op("db.sql.query")
+        .with_description("SELECT * FROM table WHERE id = 1")
+        .with_fingerprint("a")
+        .build()
+    )
+
+    assert strategy._get_span_group(first) == (
+        hash_values(["SELECT * FROM table WHERE id = %s"]),
+        False,
+    )
+    assert strategy._get_span_group(second) == (
+        hash_values(["SELECT * FROM table WHERE id = %s"]),
+        True,
+    )
+    # spans with custom fingerprints are never served from the cache
+    assert strategy._get_span_group(fingerprinted) == (hash_values(["a"]), False)
+    assert len(_span_group_cache) == 1
+
+    # the cache is keyed by strategy name as well
+    other = CONFIGURATIONS["default:2021-08-25"].strategy
+    assert other._get_span_group(second) == (
+        hash_values(["SELECT * FROM table WHERE id = 1"]),
+        False,
+    )
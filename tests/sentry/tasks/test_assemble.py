@@ -3,6 +3,7 @@ import os
 from hashlib import sha1
 from unittest.mock import patch
 
+import pytest
 from django.core.files.base import ContentFile
 
 from sentry.models import FileBlob, FileBlobOwner, ReleaseFile
@@ -163,6 +164,65 @@ class AssembleDifTest(BaseAssembleTest):
         assert f.checksum == file_checksum.hexdigest()
         assert f.type == "dummy.type"
 
+    def test_from_files_without_checksums(self):
+        existing = FileBlob.from_file(ContentFile(b"foo"))
+        files = [ContentFile(b"foo"), ContentFile(b"bar"), ContentFile(b"bar")]
+
+        FileBlob.from_files(files, organization=self.organization)
+
+        blobs = FileBlob.objects.filter(
+            checksum__in=[sha1(b"foo").hexdigest(), sha1(b"bar").hexdigest()]
+        )
+        assert len(blobs) == 2
+        assert existing in blobs
+        for blob in blobs:
+            FileBlobOwner.objects.filter(blob=blob, organization_id=self.organization.id).get()
+
+    def test_from_files_checksum_mismatch(self):
+        files = [
+            (ContentFile(b"foo"), sha1(b"foo").hexdigest()),
+            (ContentFile(b"bar"), sha1(b"baz").hexdigest()),
+        ]
+
+        with pytest.raises(OSError):
+            FileBlob.from_files(files, organization=self.organization)
+
+        assert not FileBlob.objects.filter(checksum=sha1(b"baz").hexdigest()).exists()
+        assert not FileBlob.objects.filter(checksum=sha1(b"bar").hexdigest()).exists()
+        assert not FileBlobOwner.objects.exists()
+
+    def test_from_files_hashes_while_uploading(self):
+        files = [
+            (ContentFile(b"foo"), sha1(b"foo").hexdigest()),
+            (ContentFile(b"bar"), sha1(b"bar").hexdigest()),
+        ]
+
+        with patch("sentry.models.file._get_size_and_checksum") as get_size_and_checksum:
+            FileBlob.from_files(files, organization=self.organization)
+
+        assert not get_size_and_checksum.called
+        for contents in (b"foo", b"bar"):
+            blob = FileBlob.objects.get(checksum=sha1(contents).hexdigest())
+            assert blob.size == len(contents)
+            assert blob.getfile().read() == contents
+            FileBlobOwner.objects.filter(blob=blob, organization_id=self.organization.id).get()
+
+    def test_from_files_existing_blob_checksum_mismatch(self):
+        other_organization = self.create_organization()
+        FileBlob.from_files(
+            [(ContentFile(b"foo"), sha1(b"foo").hexdigest())], organization=other_organization
+        )
+
+        # Claiming the checksum of an existing blob doesn't grant ownership of
+        # it without the matching contents.
+        with pytest.raises(OSError):
+            FileBlob.from_files(
+                [(ContentFile(b"garbage"), sha1(b"foo").hexdigest())],
+                organization=self.organization,
+            )
+
+        assert not FileBlobOwner.objects.filter(organization_id=self.organization.id).exists()
+
     def test_assemble_debug_id_override(self):
         sym_file = self.load_fixture("crash.sym")
         blob1 = FileBlob.from_file(ContentFile(sym_file))
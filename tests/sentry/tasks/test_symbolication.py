@@ -6,9 +6,11 @@ import pytest
 from sentry.plugins.base.v2 import Plugin2
 from sentry.tasks.store import preprocess_event
 from sentry.tasks.symbolication import (
+    batched_symbolication,
     should_demote_symbolication,
     submit_symbolicate,
     symbolicate_event,
+    symbolicate_event_batch_from_reprocessing,
 )
 from sentry.testutils.helpers.options import override_options
 from sentry.testutils.helpers.task_runner import TaskRunner
@@ -252,3 +254,118 @@ def test_submit_symbolicate_queue_switch(
             start_time=0,
         )
     assert mock_submit_symbolicate.call_count == 4
+
+
+def _native_event(project, event_id):
+    return {
+        "project": project.id,
+        "platform": "native",
+        "event_id": event_id,
+        "debug_meta": {
+            "images": [
+                {
+                    "type": "macho",
+                    "debug_id": "b7c1e9a2-3c59-4f10-8a5b-ae1a4c3e0e11",
+                    "image_addr": "0x1000",
+                    "image_size": 4096,
+                }
+            ]
+        },
+        "exception": {
+            "values": [{"stacktrace": {"frames": [{"instruction_addr": "0x1010"}]}}],
+        },
+    }
+
+
+@pytest.mark.django_db
+def test_batched_symbolication(default_project, mock_symbolicate_event):
+    now = [0.0]
+    events = [_native_event(default_project, f"{i:032x}") for i in range(5)]
+
+    def submit(i, is_low_priority=False, from_reprocessing=True):
+        submit_symbolicate(
+            is_low_priority=is_low_priority,
+            from_reprocessing=from_reprocessing,
+            cache_key=f"e:{i}",
+            event_id=events[i]["event_id"],
+            start_time=1,
+            data=events[i],
+        )
+
+    with mock.patch(
+        "sentry.tasks.symbolication.symbolicate_event_batch_from_reprocessing"
+    ) as mock_batch_task, mock.patch(
+        "sentry.tasks.symbolication.symbolicate_event_batch_from_reprocessing_low_priority"
+    ) as mock_low_priority_batch_task:
+        with batched_symbolication(max_size=3, max_wait=1, clock=lambda: now[0]):
+            for i in range(4):
+                submit(i)
+            # Full batches are submitted right away
+            assert mock_batch_task.delay.call_count == 1
+
+            # Batches are submitted once their oldest event waited long enough
+            now[0] = 1.0
+            submit(4, is_low_priority=True)
+            assert mock_batch_task.delay.call_count == 2
+            assert mock_low_priority_batch_task.delay.call_count == 0
+
+            # Events that are not reprocessed are not batched
+            submit(0, from_reprocessing=False)
+            assert mock_symbolicate_event.delay.call_count == 1
+
+        # Leaving the block submits the remaining batches
+        assert mock_low_priority_batch_task.delay.call_count == 1
+
+    assert [
+        [event["cache_key"] for event in call.kwargs["events"]]
+        for call in mock_batch_task.delay.call_args_list
+    ] == [["e:0", "e:1", "e:2"], ["e:3"]]
+    assert mock_low_priority_batch_task.delay.call_args.kwargs["events"][0]["cache_key"] == "e:4"
+
+
+@pytest.mark.django_db
+@mock.patch("sentry.lang.native.processing.Symbolicator")
+def test_symbolicate_event_batch(mock_symbolicator, default_project, mock_event_processing_store):
+    def symbolicate(stacktraces, modules, signal=None):
+        return {
+            "status": "completed",
+            "stacktraces": [
+                {"frames": [{"original_index": 0, "function": f"function_{i}"}]}
+                for i in range(len(stacktraces))
+            ],
+            "modules": [dict(module, debug_status="found") for module in modules],
+        }
+
+    mock_symbolicator.return_value = mock_symbolicator
+    mock_symbolicator.process_payload.side_effect = symbolicate
+
+    stored = {f"e:{i}": _native_event(default_project, f"{i:032x}") for i in range(3)}
+    mock_event_processing_store.get.side_effect = stored.get
+    mock_event_processing_store.store.side_effect = lambda data: f"symbolicated:{data['event_id']}"
+
+    with mock.patch("sentry.tasks.store.do_process_event") as mock_do_process_event:
+        symbolicate_event_batch_from_reprocessing(
+            events=[
+                {
+                    "cache_key": cache_key,
+                    "start_time": 1,
+                    "event_id": data["event_id"],
+                    "has_attachments": False,
+                }
+                for cache_key, data in stored.items()
+            ]
+        )
+
+    # All three events share one symbolicator request
+    assert mock_symbolicator.process_payload.call_count == 1
+    assert len(mock_symbolicator.process_payload.call_args.kwargs["stacktraces"]) == 3
+
+    assert mock_do_process_event.call_count == 3
+    functions = {}
+    for call in mock_do_process_event.call_args_list:
+        data = call.kwargs["data"]
+        assert call.kwargs["cache_key"] == f"symbolicated:{data['event_id']}"
+        assert call.kwargs["data_has_changed"]
+        frame = data["exception"]["values"][0]["stacktrace"]["frames"][0]
+        functions[data["event_id"]] = frame["function"]
+    assert functions == {f"{i:032x}": f"function_{i}" for i in range(3)}
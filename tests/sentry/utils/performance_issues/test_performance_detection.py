@@ -3,8 +3,9 @@ from unittest.mock import Mock, call, patch
 
 import pytest
 
-from sentry import projectoptions
+from sentry import options, projectoptions
 from sentry.eventstore.models import Event
+from sentry.models import ProjectOption
 from sentry.testutils import TestCase
 from sentry.testutils.helpers import override_options
 from sentry.testutils.performance_issues.event_generators import (
@@ -16,14 +17,31 @@ from sentry.testutils.performance_issues.event_generators import (
 )
 from sentry.testutils.silo import region_silo_test
 from sentry.types.issues import GroupType
+from sentry.utils.cache import cache
 from sentry.utils.performance_issues.performance_detection import (
     DETECTOR_TYPE_TO_GROUP_TYPE,
+    ConsecutiveDBSpanDetector,
     DetectorType,
     EventPerformanceProblem,
+    MNPlusOneDBSpanDetector,
+    NPlusOneAPICallsDetector,
+    NPlusOneDBSpanDetector,
     PerformanceProblem,
+    RenderBlockingAssetSpanDetector,
+    SlowSpanDetector,
+    SpanFeature,
+    SpanFeatures,
     _detect_performance_problems,
     detect_performance_problems,
+    fingerprint_span,
+    get_allowed_issue_creation_detectors,
+    get_cached_detection_config,
+    get_detection_settings,
+    get_span_duration,
+    invalidate_detection_config,
     prepare_problem_for_grouping,
+    run_detector_on_data,
+    run_detectors_on_data,
     total_span_time,
 )
 from sentry.utils.performance_issues.performance_span_issue import PerformanceSpanProblem
@@ -89,6 +107,15 @@ class PerformanceDetectionTest(unittest.TestCase):
         self.features_mock.side_effect = has_feature
         self.addCleanup(patch_features.stop)
 
+        # These tests change options and flags between detections, so compiled
+        # detection settings must not be reused.
+        patch_cache_ttl = patch(
+            "sentry.utils.performance_issues.performance_detection.DETECTION_SETTINGS_CACHE_TTL",
+            0,
+        )
+        patch_cache_ttl.start()
+        self.addCleanup(patch_cache_ttl.stop)
+
     @patch("sentry.utils.performance_issues.performance_detection._detect_performance_problems")
     def test_options_disabled(self, mock):
         event = {}
@@ -792,6 +819,93 @@ class PerformanceDetectionTest(unittest.TestCase):
         assert sdk_span_mock.containing_transaction.set_tag.call_count == 0
 
 
+@region_silo_test
+class CachedDetectionConfigTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        invalidate_detection_config()
+        self.addCleanup(invalidate_detection_config)
+
+    def test_settings_are_cached(self):
+        config = get_cached_detection_config(self.project.id)
+        assert get_cached_detection_config(self.project.id) is config
+        assert config.settings == get_detection_settings(self.project.id)
+
+    @patch("sentry.utils.performance_issues.performance_detection.get_detection_settings")
+    def test_settings_expire(self, get_detection_settings_mock):
+        get_detection_settings_mock.return_value = {}
+        with patch(
+            "sentry.utils.performance_issues.performance_detection.DETECTION_SETTINGS_CACHE_TTL",
+            0,
+        ):
+            get_cached_detection_config(self.project.id)
+            get_cached_detection_config(self.project.id)
+
+        assert get_detection_settings_mock.call_count == 2
+
+    def test_project_option_change_invalidates(self):
+        config = get_cached_detection_config(self.project.id)
+
+        self.project.update_option(
+            "sentry:performance_issue_settings", {"n_plus_one_db_count": 100}
+        )
+        new_config = get_cached_detection_config(self.project.id)
+        assert new_config is not config
+        assert new_config.settings[DetectorType.N_PLUS_ONE_DB_QUERIES]["count"] == 100
+
+        # updating an existing option does not send `post_save`
+        self.project.update_option(
+            "sentry:performance_issue_settings", {"n_plus_one_db_count": 200}
+        )
+        updated_config = get_cached_detection_config(self.project.id)
+        assert updated_config is not new_config
+        assert updated_config.settings[DetectorType.N_PLUS_ONE_DB_QUERIES]["count"] == 200
+
+        self.project.delete_option("sentry:performance_issue_settings")
+        assert get_cached_detection_config(self.project.id).settings == config.settings
+
+    def test_project_option_change_in_other_process_invalidates(self):
+        config = get_cached_detection_config(self.project.id)
+
+        # Another process updates the option and refreshes the shared option
+        # cache, this process sees it once its local option cache is cleared.
+        cache.set(
+            ProjectOption.objects._make_key(self.project.id),
+            {"sentry:performance_issue_settings": {"n_plus_one_db_count": 100}},
+        )
+        ProjectOption.objects.clear_local_cache()
+
+        new_config = get_cached_detection_config(self.project.id)
+        assert new_config is not config
+        assert new_config.settings[DetectorType.N_PLUS_ONE_DB_QUERIES]["count"] == 100
+
+    def test_options_version_change_invalidates(self):
+        with patch.object(options.default_store, "get_version", return_value="a"):
+            config = get_cached_detection_config(self.project.id)
+            assert get_cached_detection_config(self.project.id) is config
+
+        # Another process set a system option, which this process saw when
+        # refreshing its options.
+        with patch.object(options.default_store, "get_version", return_value="b"):
+            assert get_cached_detection_config(self.project.id) is not config
+
+    @override_options(BASE_DETECTOR_OPTIONS)
+    def test_allowed_issue_creation_detectors(self):
+        with self.feature("organizations:performance-issues-ingest"):
+            assert get_allowed_issue_creation_detectors(self.project.id) == {
+                DetectorType.N_PLUS_ONE_DB_QUERIES,
+                DetectorType.N_PLUS_ONE_DB_QUERIES_EXTENDED,
+            }
+
+        # the flag is compiled into the cached config until it is invalidated
+        assert get_allowed_issue_creation_detectors(self.project.id) == {
+            DetectorType.N_PLUS_ONE_DB_QUERIES,
+            DetectorType.N_PLUS_ONE_DB_QUERIES_EXTENDED,
+        }
+        invalidate_detection_config(self.project.id)
+        assert get_allowed_issue_creation_detectors(self.project.id) == set()
+
+
 class PrepareProblemForGroupingTest(unittest.TestCase):
     def test(self):
         n_plus_one_event = EVENTS["n-plus-one-in-django-index-view"]
@@ -1026,3 +1140,62 @@ class EventPerformanceProblemTest(TestCase):
 )
 def test_total_span_time(spans, duration):
     assert total_span_time(spans) == pytest.approx(duration, 0.01)
+
+
+@pytest.mark.parametrize("event_name", sorted(EVENTS.keys()))
+def test_span_features_match_span_helpers(event_name):
+    spans = EVENTS[event_name]["spans"]
+    features = SpanFeatures(spans, frozenset(SpanFeature))
+
+    for span in spans:
+        assert features.duration(span) == get_span_duration(span)
+        assert features.upper_description(span) == (span.get("description") or "").upper()
+
+    # spans outside of the event are computed on the fly
+    other_span = create_span("db", 100.0, "SELECT 1")
+    assert features.duration(other_span) == get_span_duration(other_span)
+
+
+@patch(
+    "sentry.utils.performance_issues.performance_detection.fingerprint_span",
+    wraps=fingerprint_span,
+)
+def test_span_features_fingerprints_are_lazy(fingerprint_span_mock):
+    spans = [create_span("db", 100.0, f"SELECT {i}") for i in range(3)]
+    features = SpanFeatures(spans, frozenset(SpanFeature))
+    assert fingerprint_span_mock.call_count == 0
+
+    assert features.fingerprint(spans[1]) == fingerprint_span(spans[1])
+    assert features.fingerprint(spans[1]) == fingerprint_span(spans[1])
+    assert fingerprint_span_mock.call_count == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("event_name", sorted(EVENTS.keys()))
+def test_run_detectors_on_data_matches_individual_runs(event_name):
+    event = EVENTS[event_name]
+    settings = get_detection_settings()
+    detector_classes = [
+        ConsecutiveDBSpanDetector,
+        SlowSpanDetector,
+        RenderBlockingAssetSpanDetector,
+        NPlusOneDBSpanDetector,
+        NPlusOneAPICallsDetector,
+        MNPlusOneDBSpanDetector,
+    ]
+
+    individual_detectors = [cls(settings, event) for cls in detector_classes]
+    for detector in individual_detectors:
+        run_detector_on_data(detector, event)
+
+    multiplexed_detectors = [cls(settings, event) for cls in detector_classes]
+    run_detectors_on_data(multiplexed_detectors, event)
+
+    for individual, multiplexed in zip(individual_detectors, multiplexed_detectors):
+        assert individual.stored_problems.keys() == multiplexed.stored_problems.keys()
+        for fingerprint, problem in individual.stored_problems.items():
+            other = multiplexed.stored_problems[fingerprint]
+            if isinstance(problem, PerformanceSpanProblem):
+                assert problem.spans_involved == other.spans_involved
+            else:
+                assert problem == other
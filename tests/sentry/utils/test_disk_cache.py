@@ -0,0 +1,189 @@
+import os
+import time
+from unittest import mock
+
+import pytest
+
+from sentry.utils.disk_cache import INDEX_FILENAME, DiskCache
+
+
+def _writer(content):
+    def write(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    return write
+
+
+def test_get_or_put(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+
+    path, hit = cache.get_or_put("1/a", _writer(b"hello"))
+    assert not hit
+    assert path == os.path.join(str(tmp_path), "1", "a")
+
+    path, hit = cache.get_or_put("1/a", _writer(b"other"))
+    assert hit
+    with open(path, "rb") as f:
+        assert f.read() == b"hello"
+
+    assert cache.total_size() == 5
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=25, access_update_interval=0)
+
+    cache.put("a", _writer(b"x" * 10))
+    cache.put("b", _writer(b"x" * 10))
+    # Reading `a` makes `b` the least recently used file
+    assert cache.get("a") is not None
+    cache.put("c", _writer(b"x" * 10))
+
+    assert cache.get("b") is None
+    assert not os.path.exists(cache.get_path("b"))
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_size() == 20
+
+
+def test_keeps_file_larger_than_budget(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=5)
+
+    cache.put("a", _writer(b"x" * 3))
+    path = cache.put("b", _writer(b"x" * 10))
+
+    assert cache.get("a") is None
+    assert cache.get("b") == path
+
+
+def test_adopts_untracked_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    _writer(b"legacy")(cache.get_path("1/legacy"))
+
+    assert cache.get("1/legacy") is not None
+    assert cache.total_size() == 6
+
+
+def test_forgets_removed_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    cache.put("a", _writer(b"x" * 10))
+    os.remove(cache.get_path("a"))
+
+    assert cache.get("a") is None
+    assert cache.total_size() == 0
+
+
+def test_clear_old_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    cache.put("old", _writer(b"x" * 10))
+    time.sleep(0.01)
+    cache.put("new", _writer(b"x" * 10))
+
+    cache.max_size = 15
+    cache.clear_old_entries()
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+
+    cache.clear_old_entries(max_age=0)
+    assert cache.get("new") is None
+    assert cache.total_size() == 0
+
+
+def test_throttles_access_updates(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=25)
+
+    cache.put("a", _writer(b"x" * 10))
+    cache.put("b", _writer(b"x" * 10))
+    # `a` was written moments ago, so reading it does not update the index
+    assert cache.get("a") is not None
+    cache.put("c", _writer(b"x" * 10))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_clear_old_untracked_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    cache.put("tracked", _writer(b"x" * 10))
+    _writer(b"legacy")(cache.get_path("1/old"))
+    os.utime(cache.get_path("1/old"), (0, 0))
+    _writer(b"legacy")(cache.get_path("1/recent"))
+
+    cache.clear_old_entries(max_age=3600)
+
+    assert not os.path.exists(cache.get_path("1/old"))
+    assert os.path.exists(cache.get_path("1/recent"))
+    assert os.path.exists(cache.get_path("tracked"))
+    assert os.path.exists(os.path.join(str(tmp_path), INDEX_FILENAME))
+
+
+def test_open_treats_evicted_file_as_miss(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    cache.put("a", _writer(b"old"))
+
+    fileobj, hit = cache.open("a", _writer(b"new"))
+    with fileobj:
+        assert hit
+        assert fileobj.read() == b"old"
+
+    get_or_put = cache.get_or_put
+
+    def get_or_put_and_evict(key, write):
+        path, hit = get_or_put(key, write)
+        os.remove(path)
+        return path, hit
+
+    with mock.patch.object(cache, "get_or_put", get_or_put_and_evict):
+        fileobj, hit = cache.open("a", _writer(b"new"))
+
+    with fileobj:
+        assert not hit
+        assert fileobj.read() == b"new"
+
+
+def test_writes_through_temp_dir(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+
+    def write_and_fail(path):
+        _writer(b"partial")(path)
+        raise OSError()
+
+    with pytest.raises(OSError):
+        cache.put("a", write_and_fail)
+
+    assert not os.path.exists(cache.get_path("a"))
+    assert os.listdir(cache.temp_path) == []
+
+    # Partial files of interrupted processes are swept from the temp dir
+    _writer(b"partial")(os.path.join(cache.temp_path, "partial"))
+    os.utime(os.path.join(cache.temp_path, "partial"), (0, 0))
+    cache.clear_old_entries(max_age=3600)
+    assert os.listdir(cache.temp_path) == []
+
+
+def test_tracks_total_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    cache.put("a", _writer(b"x" * 10))
+    cache.put("b", _writer(b"x" * 20))
+    os.remove(cache.get_path("a"))
+    cache.put("a", _writer(b"x" * 5))
+    assert cache.total_size() == 25
+
+    os.remove(cache.get_path("b"))
+    assert cache.get("b") is None
+    assert cache.total_size() == 5
+
+
+def test_walks_untracked_files_once(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=100)
+    _writer(b"legacy")(cache.get_path("1/recent"))
+
+    with mock.patch("os.walk", wraps=os.walk) as walk:
+        cache.clear_old_entries(max_age=3600)
+        os.utime(cache.get_path("1/recent"), (0, 0))
+        cache.clear_old_entries(max_age=3600)
+        cache.clear_old_entries(max_age=3600)
+
+    assert walk.call_count == 2
+    assert not os.path.exists(cache.get_path("1/recent"))
@@ -0,0 +1,76 @@
+import pytest
+
+from sentry.utils.lru import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_lru_cache_stats():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("b", 5) == 5
+    assert cache.reset_stats() == (1, 2)
+    assert cache.reset_stats() == (0, 0)
+
+
+def test_lru_cache_weight():
+    cache = LRUCache(maxsize=10, max_weight=10, weigher=len)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.weight == 8
+
+    cache.set("c", b"cccc")
+    assert "a" not in cache
+    assert cache.weight == 8
+
+    # values heavier than the whole budget are not stored
+    cache.set("d", b"d" * 11)
+    assert "d" not in cache
+    assert cache.weight == 8
+
+    cache.set("b", b"b")
+    assert cache.weight == 5
+
+    cache.delete("b")
+    assert cache.weight == 4
+
+    cache.clear()
+    assert cache.weight == 0
+    assert len(cache) == 0
+
+
+def test_lru_cache_get_or_set():
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_set("a", factory) == "value"
+    assert cache.get_or_set("a", factory) == "value"
+    assert len(calls) == 1
+
+
+def test_lru_cache_invalid_arguments():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=1, max_weight=10)